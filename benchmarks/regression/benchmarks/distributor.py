@@ -0,0 +1,55 @@
+from itertools import product
+
+from cached_property import cached_property
+import numpy as np
+
+from devito.data import Decomposition
+from devito.mpi.distributed import Distributor
+from devito.types import Dimension
+
+
+# ASV config
+repeat = 3
+timeout = 600.0
+
+
+class EmulatedDistributor(Distributor):
+
+    """
+    A Distributor emulating a topology with an arbitrary number of MPI ranks
+    from within a single process, so that the point-to-rank lookup can be
+    benchmarked at realistic scales.
+    """
+
+    def __init__(self, shape, dimensions, topology):
+        super(Distributor, self).__init__(shape, dimensions)
+        self._topology = topology
+        self._decomposition = [Decomposition(np.array_split(range(i), j), 0)
+                               for i, j in zip(shape, topology)]
+
+    @cached_property
+    def all_coords(self):
+        return tuple(product(*[range(i) for i in self.topology]))
+
+
+class GlbToRank(object):
+
+    params = ([(10, 10, 10), (16, 8, 8)], [10**5, 10**6])
+    param_names = ['topology', 'npoint']
+
+    def setup(self, topology, npoint):
+        shape = (1000, 1000, 1000)
+        dimensions = tuple(Dimension(name=i) for i in 'xyz')
+        self.distributor = EmulatedDistributor(shape, dimensions, topology)
+
+        # The support of a linear interpolator, that is the 8 grid points
+        # surrounding each randomly placed sparse point
+        gridpoints = np.random.randint(0, shape[0] - 1, size=(npoint, 3))
+        offsets = np.array(tuple(product(range(2), repeat=3)))
+        self.support = np.stack([gridpoints + i for i in offsets], axis=2)
+
+        # Populate cached properties
+        self.distributor.glb_to_rank(self.support[:1])
+
+    def time_glb_to_rank(self, topology, npoint):
+        self.distributor.glb_to_rank(self.support)
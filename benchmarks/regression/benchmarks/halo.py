@@ -0,0 +1,32 @@
+from devito import Grid, TimeFunction, Eq, Operator, switchconfig
+
+
+# ASV config
+repeat = 3
+timeout = 600.0
+
+
+class HaloExchange(object):
+
+    """
+    Halo exchange through explicit pack/unpack kernels (`basic`, `diag`) versus
+    MPI subarray datatypes (`datatype`), for various halo widths. Meaningful
+    only when the benchmarks are run with MPI, e.g. through `mpirun`.
+    """
+
+    params = (['basic', 'diag', 'datatype'], [2, 8, 16])
+    param_names = ['mode', 'space_order']
+
+    def setup(self, mode, space_order):
+        grid = Grid(shape=(200, 200, 200))
+
+        f = TimeFunction(name='f', grid=grid, space_order=space_order)
+
+        with switchconfig(mpi=mode):
+            self.op = Operator(Eq(f.forward, 1e-8*(f.laplace + 1)))
+
+        # Trigger JIT compilation
+        self.op.apply(time_M=0)
+
+    def time_halo_exchange(self, mode, space_order):
+        self.op.apply(time_M=50)
@@ -0,0 +1,35 @@
+import numpy as np
+import scipy.sparse
+
+from devito import Grid, MatrixSparseTimeFunction
+
+
+# ASV config
+repeat = 3
+timeout = 600.0
+
+
+class MatrixSparseSetup(object):
+
+    params = [10**5, 10**6, 10**7]
+    param_names = ['nnz']
+
+    def setup(self, nnz):
+        grid = Grid(shape=(400, 400, 400))
+
+        # One location per nonzero, spread over 100 sources/receivers
+        npoint = 100
+        rows = np.arange(nnz, dtype=np.int32)
+        cols = np.random.randint(0, npoint, size=nnz).astype(np.int32)
+        vals = np.random.rand(nnz).astype(np.float32)
+        matrix = scipy.sparse.coo_matrix((vals, (rows, cols)), shape=(nnz, npoint))
+
+        self.sf = MatrixSparseTimeFunction(name='s', grid=grid, r=2, matrix=matrix,
+                                           nt=10)
+        self.sf.gridpoints.data[:] = np.random.randint(0, 399, size=(nnz, 3))
+
+    def time_rank_to_points(self, nnz):
+        self.sf._rank_to_points()
+
+    def time_build_par_dim_to_nnz(self, nnz):
+        self.sf._build_par_dim_to_nnz(self.sf.gridpoints.data, self.sf.mrow.data)
@@ -0,0 +1,70 @@
+"""
+Time the distributed indexing of Data, that is setting a Function from a global
+NumPy array, extracting a (possibly flipped) slab and gathering onto a rank.
+
+Run it at several rank counts to assess the scalability of the exchanges, e.g.
+
+    for n in 1 2 4 8; do
+        DEVITO_MPI=1 mpirun -n $n python data_indexing.py -s 256 256 256
+    done
+"""
+
+from timeit import default_timer as timer
+
+import click
+import numpy as np
+
+from devito import Function, Grid, configuration, info
+from devito.mpi import MPI
+
+
+def timeit(comm, func, repeat):
+    timings = []
+    for _ in range(repeat):
+        comm.Barrier()
+        tic = timer()
+        func()
+        comm.Barrier()
+        timings.append(timer() - tic)
+    return min(timings)
+
+
+@click.command()
+@click.option('-s', '--shape', default=(128, 128, 128), type=(int, int, int),
+              help='Global shape of the Function')
+@click.option('-r', '--repeat', default=5, help='Number of repetitions')
+def run(shape, repeat):
+    grid = Grid(shape=shape)
+    f = Function(name='f', grid=grid)
+    comm = grid.distributor.comm if grid.distributor.is_parallel else MPI.COMM_SELF
+
+    glb = np.arange(np.prod(shape), dtype=f.dtype).reshape(shape)
+    slab = tuple(slice(None, None, -1) if i == 0 else slice(None) for i in shape)
+    half = tuple(slice(i//4, 3*i//4) for i in shape)
+
+    def setitem():
+        f.data[:] = glb
+
+    def getitem_flipped():
+        f.data[slab]
+
+    def setitem_slab():
+        f.data[half] = f.data[slab][half]
+
+    def gather():
+        f.data_gather(rank=0)
+
+    if comm.rank == 0:
+        info("Distributed Data indexing, shape=%s, nranks=%d, mpi=%s"
+             % (str(shape), comm.size, configuration['mpi']))
+    for name, func in [('setitem (global array)', setitem),
+                       ('getitem (flipped)', getitem_flipped),
+                       ('setitem (slab)', setitem_slab),
+                       ('gather', gather)]:
+        elapsed = timeit(comm, func, repeat)
+        if comm.rank == 0:
+            info("%s: %.4f s" % (name, elapsed))
+
+
+if __name__ == "__main__":
+    run()
@@ -16,6 +16,7 @@ from devito.types.sparse import *  # noqa
 from devito.types.tensor import *  # noqa
 from devito.finite_differences import *  # noqa
 from devito.operations.solve import *
+from devito.operations.streaming import *  # noqa
 from devito.operator import Operator  # noqa
 
 # Other stuff exposed to the user
@@ -1,10 +1,11 @@
 import numpy as np
 
 import devito as dv
-from devito.builtins.utils import MPIReduction
+from devito.builtins.utils import (MPIPackedReduction, MPIReduction, ReductionFuture,
+                                   cached_operator)
 
 
-__all__ = ['norm', 'sumall', 'sum', 'inner', 'mmin', 'mmax']
+__all__ = ['norm', 'sumall', 'sum', 'inner', 'mmin', 'mmax', 'reduce_many']
 
 accumulator_mapper = {
     # Integer accumulates on Float64
@@ -34,29 +35,36 @@ def norm(f, order=2):
     order : int, optional
         The order of the norm. Defaults to 2.
     """
-    Pow = dv.finite_differences.differentiable.Pow
     kwargs = {}
     if f.is_TimeFunction and f._time_buffering:
         kwargs[f.time_dim.max_name] = f._time_size - 1
 
-    # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
-    # otherwise we would eventually be summing more than expected
-    p, eqns = f.guard() if f.is_SparseFunction else (f, [])
-
     dtype = accumulator_mapper[f.dtype]
-    s = dv.types.Symbol(name='sum', dtype=dtype)
 
     with MPIReduction(f, dtype=dtype) as mr:
-        op = dv.Operator([dv.Eq(s, 0.0)] + eqns +
-                         [dv.Inc(s, dv.Abs(Pow(p, order))), dv.Eq(mr.n[0], s)],
-                         name='norm%d' % order)
-        op.apply(**kwargs)
+        op, args = _norm(f, mr.n, order)
+        op.apply(**args, **kwargs)
 
     v = np.power(mr.v, 1/order)
 
     return f.dtype(v)
 
 
+@cached_operator
+def _norm(f, n, order):
+    Pow = dv.finite_differences.differentiable.Pow
+
+    # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
+    # otherwise we would eventually be summing more than expected
+    p, eqns = f.guard() if f.is_SparseFunction else (f, [])
+
+    s = dv.types.Symbol(name='sum', dtype=n.dtype)
+
+    return dv.Operator([dv.Eq(s, 0.0)] + eqns +
+                       [dv.Inc(s, dv.Abs(Pow(p, order))), dv.Eq(n[0], s)],
+                       name='norm%d' % order)
+
+
 @dv.switchconfig(log_level='ERROR')
 def sum(f, dims=None):
     """
@@ -101,11 +109,17 @@ def sum(f, dims=None):
     if f.is_TimeFunction and f._time_buffering:
         kwargs[f.time_dim.max_name] = f._time_size - 1
 
+    op, args = _sum(f, out)
+    op(**args, **kwargs)
+    return out
+
+
+@cached_operator
+def _sum(f, out):
     # Only need one guard as they have the same coordinates and Dimension
     p, eqns = f.guard() if f.is_SparseFunction else (f, [])
-    op = dv.Operator(eqns + [dv.Eq(out, out + p)])
-    op(**kwargs)
-    return out
+
+    return dv.Operator(eqns + [dv.Eq(out, out + p)])
 
 
 @dv.switchconfig(log_level='ERROR')
@@ -122,22 +136,27 @@ def sumall(f):
     if f.is_TimeFunction and f._time_buffering:
         kwargs[f.time_dim.max_name] = f._time_size - 1
 
-    # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
-    # otherwise we would eventually be summing more than expected
-    p, eqns = f.guard() if f.is_SparseFunction else (f, [])
-
     dtype = accumulator_mapper[f.dtype]
-    s = dv.types.Symbol(name='sum', dtype=dtype)
 
     with MPIReduction(f, dtype=dtype) as mr:
-        op = dv.Operator([dv.Eq(s, 0.0)] + eqns +
-                         [dv.Inc(s, p), dv.Eq(mr.n[0], s)],
-                         name='sum')
-        op.apply(**kwargs)
+        op, args = _sumall(f, mr.n)
+        op.apply(**args, **kwargs)
 
     return f.dtype(mr.v)
 
 
+@cached_operator
+def _sumall(f, n):
+    # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
+    # otherwise we would eventually be summing more than expected
+    p, eqns = f.guard() if f.is_SparseFunction else (f, [])
+
+    s = dv.types.Symbol(name='sum', dtype=n.dtype)
+
+    return dv.Operator([dv.Eq(s, 0.0)] + eqns + [dv.Inc(s, p), dv.Eq(n[0], s)],
+                       name='sum')
+
+
 @dv.switchconfig(log_level='ERROR')
 def inner(f, g):
     """
@@ -163,34 +182,42 @@ def inner(f, g):
     The inner product is the sum of all dimension-wise products. For 1D Functions,
     the inner product corresponds to the dot product.
     """
-    # Input check
-    if f.is_TimeFunction and f._time_buffering != g._time_buffering:
-        raise ValueError("Cannot compute `inner` between save/nosave TimeFunctions")
-    if f.shape != g.shape:
-        raise ValueError("`f` and `g` must have same shape")
-    if f._data is None or g._data is None:
-        raise ValueError("Uninitialized input")
-    if f.is_SparseFunction and not np.all(f.coordinates_data == g.coordinates_data):
-        raise ValueError("Non-matching coordinates")
+    _check_inner(f, g)
 
     kwargs = {}
     if f.is_TimeFunction and f._time_buffering:
         kwargs[f.time_dim.max_name] = f._time_size - 1
 
+    dtype = accumulator_mapper[f.dtype]
+
+    with MPIReduction(f, g, dtype=dtype) as mr:
+        op, args = _inner(f, g, mr.n)
+        op.apply(**args, **kwargs)
+
+    return f.dtype(mr.v)
+
+
+@cached_operator
+def _inner(f, g, n):
     # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
     # otherwise we would eventually be summing more than expected
     rhs, eqns = f.guard(f*g) if f.is_SparseFunction else (f*g, [])
 
-    dtype = accumulator_mapper[f.dtype]
-    s = dv.types.Symbol(name='sum', dtype=dtype)
+    s = dv.types.Symbol(name='sum', dtype=n.dtype)
 
-    with MPIReduction(f, g, dtype=dtype) as mr:
-        op = dv.Operator([dv.Eq(s, 0.0)] + eqns +
-                         [dv.Inc(s, rhs), dv.Eq(mr.n[0], s)],
-                         name='inner')
-        op.apply(**kwargs)
+    return dv.Operator([dv.Eq(s, 0.0)] + eqns + [dv.Inc(s, rhs), dv.Eq(n[0], s)],
+                       name='inner')
 
-    return f.dtype(mr.v)
+
+def _check_inner(f, g):
+    if f.is_TimeFunction and f._time_buffering != g._time_buffering:
+        raise ValueError("Cannot compute `inner` between save/nosave TimeFunctions")
+    if f.shape != g.shape:
+        raise ValueError("`f` and `g` must have same shape")
+    if f._data is None or g._data is None:
+        raise ValueError("Uninitialized input")
+    if f.is_SparseFunction and not np.all(f.coordinates_data == g.coordinates_data):
+        raise ValueError("Non-matching coordinates")
 
 
 @dv.switchconfig(log_level='ERROR')
@@ -231,3 +258,150 @@ def mmax(f):
         return mr.v.item()
     else:
         raise ValueError("Expected Function, not `%s`" % type(f))
+
+
+@dv.switchconfig(log_level='ERROR')
+def reduce_many(reductions, asynchronous=False):
+    """
+    Compute several reductions at once.
+
+    All sums, such as norms and inner products, are computed by a single
+    Operator per time range -- buffered TimeFunctions are reduced over their
+    buffer only, while all other Functions over their entire time range. With
+    MPI, the local results of all reductions are then combined through a single
+    allreduce of a packed vector.
+
+    Parameters
+    ----------
+    reductions : list of tuple
+        The reductions, each of them in the form ``(name, *operands)``, with
+        ``name`` in 'norm', 'sumall', 'inner', 'mmin', 'mmax'. The order of a
+        norm may be supplied as an additional operand, e.g. ``('norm', f, 1)``.
+    asynchronous : bool, optional
+        If True, the allreduce is non-blocking, so that it may progress while,
+        for example, another Operator runs. Defaults to False.
+
+    Returns
+    -------
+    The results of the reductions, in the same order as in ``reductions``. If
+    ``asynchronous=True``, ReductionFutures instead, the ``result`` method of
+    which waits for and returns a result.
+
+    Raises
+    ------
+    ValueError
+        If the reductions are over Functions defined on different Grids, or an
+        unknown reduction is requested. See also ``inner``.
+
+    Examples
+    --------
+    >>> from devito import Grid, Function
+    >>> grid = Grid(shape=(4, 4))
+    >>> f = Function(name='f', grid=grid)
+    >>> g = Function(name='g', grid=grid)
+    >>> f.data[:] = 1.
+    >>> g.data[:] = 2.
+    >>> reduce_many([('norm', f), ('inner', f, g), ('mmax', g)])
+    [4.0, 32.0, 2.0]
+    """
+    Pow = dv.finite_differences.differentiable.Pow
+
+    grids = set()
+    sums = []
+    extrema = []
+    for k, (name, *operands) in enumerate(reductions):
+        f = operands[0]
+
+        if getattr(f, 'grid', None) is not None:
+            grids.add(f.grid)
+
+        if name in ('mmin', 'mmax'):
+            if isinstance(f, dv.Constant):
+                v = f.data
+            elif isinstance(f, dv.types.dense.DiscreteFunction):
+                data = f.data_ro_domain
+                if data.size == 0:
+                    v = np.inf if name == 'mmin' else -np.inf
+                else:
+                    v = np.min(data) if name == 'mmin' else np.max(data)
+            else:
+                raise ValueError("Expected Function, not `%s`" % type(f))
+
+            # Minima are packed as maxima, so that they may be reduced together
+            if name == 'mmin':
+                extrema.append((k, -v, lambda v, f=f: f.dtype(-v).item()))
+            else:
+                extrema.append((k, v, lambda v, f=f: f.dtype(v).item()))
+            continue
+
+        # Protect SparseFunctions from accessing duplicated (out-of-domain) data,
+        # otherwise we would eventually be summing more than expected
+        if name == 'norm':
+            order = operands[1] if len(operands) > 1 else 2
+            p, guards = f.guard() if f.is_SparseFunction else (f, [])
+            expr = dv.Abs(Pow(p, order))
+            callback = lambda v, f=f, order=order: f.dtype(np.power(v, 1/order))
+        elif name == 'sumall':
+            expr, guards = f.guard() if f.is_SparseFunction else (f, [])
+            callback = lambda v, f=f: f.dtype(v)
+        elif name == 'inner':
+            g = operands[1]
+            _check_inner(f, g)
+            expr, guards = f.guard(f*g) if f.is_SparseFunction else (f*g, [])
+            callback = lambda v, f=f: f.dtype(v)
+        else:
+            raise ValueError("Unknown reduction `%s`" % name)
+
+        # The time range, if any, to which the reduction must be restricted
+        if f.is_TimeFunction and f._time_buffering:
+            time_range = ((f.time_dim.max_name, f._time_size - 1),)
+        else:
+            time_range = ()
+
+        sums.append((k, expr, tuple(guards), time_range,
+                     accumulator_mapper[f.dtype], callback))
+
+    if len(grids) > 1:
+        raise ValueError("Multiple Grids found")
+    grid = grids.pop() if grids else None
+
+    # Sums over different time ranges are computed by different Operators
+    mapper = {}
+    for j, (_, _, guards, time_range, _, _) in enumerate(sums):
+        mapper.setdefault(time_range, {}).setdefault(guards, []).append(j)
+
+    values = np.zeros(len(sums), dtype=np.float64)
+    for time_range, groups in mapper.items():
+        indices = [j for v in groups.values() for j in v]
+
+        i = dv.Dimension(name='i')
+        n = dv.Function(name='n', shape=(len(indices),), dimensions=(i,), grid=grid,
+                        dtype=np.float64)
+        symbols = {j: dv.types.Symbol(name='sum%d' % j, dtype=sums[j][4])
+                   for j in indices}
+
+        # Each group of Incs right after the guards (if any) it depends upon,
+        # so that the temporaries they share are defined within the same scope
+        eqns = [dv.Eq(symbols[j], 0.0) for j in indices]
+        for guards, v in groups.items():
+            eqns.extend(guards)
+            eqns.extend(dv.Inc(symbols[j], sums[j][1]) for j in v)
+        eqns.extend(dv.Eq(n[m], symbols[j]) for m, j in enumerate(indices))
+
+        op = dv.Operator(eqns, name='reduce_many')
+        op.apply(**dict(time_range))
+        values[indices] = n.data
+    values = list(values) + [v for _, v, _ in extrema]
+
+    reduction = MPIPackedReduction(grid, values, len(sums),
+                                   blocking=not asynchronous)
+
+    # The packed vector holds the sums first, then the extrema
+    futures = [None]*len(reductions)
+    for j, (k, *_, callback) in enumerate(sums + extrema):
+        futures[k] = ReductionFuture(reduction, j, callback)
+
+    if asynchronous:
+        return futures
+    else:
+        return [i.result() for i in futures]
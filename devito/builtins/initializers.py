@@ -2,7 +2,8 @@ import numpy as np
 
 import devito as dv
 from devito.tools import as_tuple, as_list
-from devito.builtins.utils import nbl_to_padsize, pad_outhalo
+from devito.builtins.utils import (builtins_cache, cached_operator, nbl_to_padsize,
+                                   pad_outhalo)
 
 __all__ = ['assign', 'smooth', 'gaussian_smooth', 'initialize_function']
 
@@ -53,21 +54,35 @@ def assign(f, rhs=0, options=None, name='assign', assign_halo=False, **kwargs):
           [3, 3, 3, 3],
           [3, 3, 3, 3]], dtype=int32)
     """
+    lhs = as_list(f)
     if not isinstance(rhs, list):
-        rhs = len(as_list(f))*[rhs, ]
+        rhs = len(lhs)*[rhs, ]
 
+    op, args = _assign(*lhs, *rhs, nlhs=len(lhs), options=options, name=name,
+                       assign_halo=assign_halo, **kwargs)
+    op.apply(**args)
+
+
+@cached_operator
+def _assign(*args, nlhs=1, options=None, name='assign', assign_halo=False, **kwargs):
+    return _assign_operator(args[:nlhs], args[nlhs:], options, name, assign_halo,
+                            **kwargs)
+
+
+def _assign_operator(lhs, rhs, options, name, assign_halo, **kwargs):
     eqs = []
     if options:
-        for i, j, k in zip(as_list(f), rhs, options):
+        for i, j, k in zip(lhs, rhs, options):
             if k is not None:
                 eqs.append(dv.Eq(i, j, **k))
             else:
                 eqs.append(dv.Eq(i, j))
     else:
-        for i, j in zip(as_list(f), rhs):
+        for i, j in zip(lhs, rhs):
             eqs.append(dv.Eq(i, j))
 
     if assign_halo:
+        f = lhs[0]
         subs = {}
         for d, h in zip(f.dimensions, f._size_halo):
             if sum(h) == 0:
@@ -77,7 +92,7 @@ def assign(f, rhs=0, options=None, name='assign', assign_halo=False, **kwargs):
                                          symbolic_max=d.symbolic_max + h.right)
         eqs = [eq.xreplace(subs) for eq in eqs]
 
-    dv.Operator(eqs, name=name, **kwargs)()
+    return dv.Operator(eqs, name=name, **kwargs)
 
 
 def smooth(f, g, axis=None):
@@ -106,7 +121,13 @@ def smooth(f, g, axis=None):
     else:
         if axis is None:
             axis = g.dimensions[-1]
-        dv.Operator(dv.Eq(f, g.avg(dims=axis)), name='smoother')()
+        op, args = _smooth(f, g, as_tuple(axis))
+        op.apply(**args)
+
+
+@cached_operator
+def _smooth(f, g, axis):
+    return dv.Operator(dv.Eq(f, g.avg(dims=axis)), name='smoother')
 
 
 def gaussian_smooth(f, sigma=1, truncate=4.0, mode='reflect'):
@@ -178,39 +199,51 @@ def gaussian_smooth(f, sigma=1, truncate=4.0, mode='reflect'):
         raise ValueError("`sigma` must be an integer or a tuple of length" +
                          " `f.ndim`.")
 
-    # Create the padded grid:
-    objective_domain = ObjectiveDomain(lw)
-    shape_padded = tuple([np.array(s) + 2*l for s, l in zip(shape, lw)])
-    grid = dv.Grid(shape=shape_padded, subdomains=objective_domain)
+    def build():
+        # Create the padded grid:
+        objective_domain = ObjectiveDomain(lw)
+        shape_padded = tuple([np.array(s) + 2*l for s, l in zip(shape, lw)])
+        grid = dv.Grid(shape=shape_padded, subdomains=objective_domain)
+
+        f_c = dv.Function(name='f_c', grid=grid, space_order=2*max(lw),
+                          coefficients='symbolic', dtype=dtype)
+        f_o = dv.Function(name='f_o', grid=grid, dtype=dtype)
 
-    f_c = dv.Function(name='f_c', grid=grid, space_order=2*max(lw),
-                      coefficients='symbolic', dtype=dtype)
-    f_o = dv.Function(name='f_o', grid=grid, dtype=dtype)
+        weights = create_gaussian_weights(sigma, lw)
 
-    weights = create_gaussian_weights(sigma, lw)
+        mapper = {}
+        for d, l, w in zip(f_c.dimensions, lw, weights):
+            lhs = []
+            rhs = []
+            options = []
 
-    mapper = {}
-    for d, l, w in zip(f_c.dimensions, lw, weights):
-        lhs = []
-        rhs = []
-        options = []
+            lhs.append(f_o)
+            rhs.append(dv.generic_derivative(f_c, d, 2*l, 1))
+            coeffs = dv.Coefficient(1, f_c, d, w)
+            options.append({'coefficients': dv.Substitutions(coeffs),
+                            'subdomain': grid.subdomains['objective_domain']})
 
-        lhs.append(f_o)
-        rhs.append(dv.generic_derivative(f_c, d, 2*l, 1))
-        coeffs = dv.Coefficient(1, f_c, d, w)
-        options.append({'coefficients': dv.Substitutions(coeffs),
-                        'subdomain': grid.subdomains['objective_domain']})
+            lhs.append(f_c)
+            rhs.append(f_o)
+            options.append({'subdomain': grid.subdomains['objective_domain']})
 
-        lhs.append(f_c)
-        rhs.append(f_o)
-        options.append({'subdomain': grid.subdomains['objective_domain']})
+            mapper[d] = {'lhs': lhs, 'rhs': rhs, 'options': options}
 
-        mapper[d] = {'lhs': lhs, 'rhs': rhs, 'options': options}
+        # Note: generally not enough parallelism to be performant on a gpu device
+        # TODO: Add openacc support for CPUs and set platform = 'cpu64'
 
-    # Note: generally not enough parallelism to be performant on a gpu device
-    # TODO: Add openacc support for CPUs and set platform = 'cpu64'
+        nbl, slices = nbl_to_padsize(lw, f_c.ndim)
+        op, _ = _pad(f_c, nbl, 'reflect', 'smooth', mapper=mapper)
 
-    initialize_function(f_c, f, lw, mapper=mapper, mode='reflect', name='smooth')
+        return f_c, nbl, slices, op
+
+    # The padded Function and the smoothing Operator only depend on the
+    # shape, type and smoothing parameters, so they can be reused
+    key = ('gaussian_smooth', dv.configuration._signature_items(), shape, dtype,
+           sigma, lw)
+    f_c, nbl, slices, op = builtins_cache.fetch(key, build)
+
+    _initialize(f_c, f, nbl, slices, 'reflect', op, {}, True)
 
     fset(f, f_c)
     return f
@@ -300,13 +333,16 @@ def initialize_function(function, data, nbl, mapper=None, mode='constant',
         return
 
     nbl, slices = nbl_to_padsize(nbl, function.ndim)
+    op, args = _pad(function, nbl, mode, name, mapper=mapper, **kwargs)
+
+    _initialize(function, data, nbl, slices, mode, op, args, pad_halo)
+
+
+def _initialize(function, data, nbl, slices, mode, op, args, pad_halo):
     if isinstance(data, dv.Function):
         function.data[slices] = data.data[:]
     else:
         function.data[slices] = data
-    lhs = []
-    rhs = []
-    options = []
 
     if mode == 'reflect' and function.grid.distributor.is_parallel:
         # Check that HALO size is appropriate
@@ -320,6 +356,18 @@ def initialize_function(function, data, nbl, mapper=None, mode='constant',
         if any(np.array(b) < 0):
             raise ValueError("Function `%s` halo is not sufficiently thick." % function)
 
+    op.apply(**args)
+
+    if pad_halo:
+        pad_outhalo(function)
+
+
+@cached_operator
+def _pad(function, nbl, mode, name, mapper=None, **kwargs):
+    lhs = []
+    rhs = []
+    options = []
+
     for d, (nl, nr) in zip(function.space_dimensions, as_tuple(nbl)):
         dim_l = dv.SubDimension.left(name='abc_%s_l' % d.name, parent=d, thickness=nl)
         dim_r = dv.SubDimension.right(name='abc_%s_r' % d.name, parent=d, thickness=nr)
@@ -352,7 +400,4 @@ def initialize_function(function, data, nbl, mapper=None, mode='constant',
     if all(options is None for i in options):
         options = None
 
-    assign(lhs, rhs, options=options, name=name, **kwargs)
-
-    if pad_halo:
-        pad_outhalo(function)
+    return _assign_operator(lhs, rhs, options, name, False, **kwargs)
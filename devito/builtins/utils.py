@@ -1,12 +1,14 @@
-from functools import wraps
+from collections import OrderedDict
+from functools import partial, wraps
 
 import numpy as np
 
 import devito as dv
-from devito.symbolics import uxreplace
 from devito.tools import as_tuple
 
-__all__ = ['MPIReduction', 'nbl_to_padsize', 'pad_outhalo', 'abstract_args']
+__all__ = ['MPIReduction', 'MPIPackedReduction', 'ReductionFuture', 'nbl_to_padsize',
+           'pad_outhalo', 'abstract_args', 'OperatorCache', 'builtins_cache',
+           'cached_operator']
 
 
 class MPIReduction(object):
@@ -49,6 +51,91 @@ class MPIReduction(object):
             self.v = comm.allreduce(np.asarray(self.n.data), self.op)[0]
 
 
+class MPIPackedReduction(object):
+    """
+    A single, possibly non-blocking, MPI allreduce of a vector packing the
+    local results of several reductions. The first `nsum` entries are summed,
+    while the maximum is taken of the others.
+    """
+
+    def __init__(self, grid, values, nsum, blocking=True):
+        self.v = None
+
+        values = np.asarray(values, dtype=np.float64)
+        if grid is None or not dv.configuration['mpi']:
+            self.v = values
+            self._request = None
+            return
+
+        if nsum == values.size:
+            self._op = None
+            op = dv.mpi.MPI.SUM
+        elif nsum == 0:
+            self._op = None
+            op = dv.mpi.MPI.MAX
+        else:
+            # Mixed sums and maxima -- still a single collective, though with a
+            # user-defined operation
+            op = self._op = dv.mpi.MPI.Op.Create(partial(_sum_max, nsum),
+                                                 commute=True)
+
+        comm = grid.distributor.comm
+        self._sendbuf = values
+        self._recvbuf = np.empty_like(values)
+        if blocking:
+            comm.Allreduce(self._sendbuf, self._recvbuf, op)
+            self._request = None
+            self._finalize()
+        else:
+            self._request = comm.Iallreduce(self._sendbuf, self._recvbuf, op)
+
+    def _finalize(self):
+        if self._op is not None:
+            self._op.Free()
+            self._op = None
+        self.v = self._recvbuf
+
+    def test(self):
+        """True if the reduction has completed, False otherwise."""
+        if self.v is None and self._request.Test():
+            self._finalize()
+        return self.v is not None
+
+    def wait(self):
+        """Wait for the reduction to complete."""
+        if self.v is None:
+            self._request.Wait()
+            self._finalize()
+
+
+def _sum_max(nsum, inbuf, inoutbuf, datatype):
+    a = np.frombuffer(inbuf, dtype=np.float64)
+    b = np.frombuffer(inoutbuf, dtype=np.float64)
+    b[:nsum] += a[:nsum]
+    np.maximum(b[nsum:], a[nsum:], out=b[nsum:])
+
+
+class ReductionFuture(object):
+    """
+    The eventual result of one of the reductions performed by an
+    MPIPackedReduction.
+    """
+
+    def __init__(self, reduction, index, callback):
+        self._reduction = reduction
+        self._index = index
+        self._callback = callback
+
+    def done(self):
+        """True if the result is available, False otherwise."""
+        return self._reduction.test()
+
+    def result(self):
+        """Wait for and return the result."""
+        self._reduction.wait()
+        return self._callback(self._reduction.v[self._index])
+
+
 def nbl_to_padsize(nbl, ndim):
     """
     Creates the pad sizes from `nbl`. The output is a tuple of tuple
@@ -113,15 +200,23 @@ def abstract_args(func):
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        abstract_objects = dv.passes.iet.engine.abstract_objects
-        mapper = abstract_objects(args)
+        sregistry = dv.ir.support.SymbolRegistry()
 
+        mapper = {}
         processed = []
         argmap = {}
         for a in args:
             try:
                 if a.is_DiscreteFunction:
-                    v = uxreplace(a, mapper)
+                    try:
+                        v = mapper[a]
+                    except KeyError:
+                        # Unlike `abstract_objects`, `alias=True` rather than
+                        # `alias=a`, as the Operators built out of the abstract
+                        # DiscreteFunctions may be cached, and thus outlive `a`
+                        name = sregistry.make_name(prefix='f')
+                        v = mapper[a] = a._rebuild(name=name, initializer=None,
+                                                   alias=True)
                     processed.append(v)
                     argmap[v.name] = a
                     continue
@@ -132,3 +227,122 @@ def abstract_args(func):
         return func(*processed, argmap=argmap, **kwargs)
 
     return wrapper
+
+
+class OperatorCache(object):
+    """
+    A least-recently-used cache for the Operators built by the builtins.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        The maximum number of cached entries. Once exceeded, the least recently
+        used entry is evicted. Zero disables caching. Defaults to 32.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._mapper = OrderedDict()
+
+    def __len__(self):
+        return len(self._mapper)
+
+    def __contains__(self, key):
+        return key in self._mapper
+
+    def fetch(self, key, build):
+        """
+        Retrieve the entry cached under `key`, or create it through `build()`.
+        """
+        try:
+            v = self._mapper.pop(key)
+        except KeyError:
+            v = build()
+
+        if self.maxsize > 0:
+            self._mapper[key] = v
+            while len(self._mapper) > self.maxsize:
+                self._mapper.popitem(last=False)
+
+        return v
+
+    def clear(self):
+        """Drop all cached entries."""
+        self._mapper.clear()
+
+
+builtins_cache = OperatorCache()
+
+
+def signature(a):
+    """
+    The abstract signature of a builtin's argument, that is everything affecting
+    the code generated for it. For a DiscreteFunction, this includes its class,
+    data type, shape, Dimensions, Grid, as well as its halo and padding layout,
+    but not its name or its data.
+    """
+    try:
+        if not a.is_DiscreteFunction:
+            return a
+    except AttributeError:
+        return a
+
+    # Each DiscreteFunction is an instance of its own, dynamically created,
+    # subclass of the user-facing class (e.g., Function, TimeFunction)
+    sig = (type(a).__base__, a.dtype, a.shape, a.dimensions, a.grid, a._halo,
+           a._padding, getattr(a, 'staggered', None),
+           getattr(a, 'coefficients', None))
+
+    # The modulo-buffered time indices are hardcoded in the generated code
+    if getattr(a, '_time_buffering', False):
+        sig += (a._time_size,)
+
+    return sig
+
+
+def cached_operator(func):
+    """
+    Cache the Operators built by `func` in `builtins_cache`.
+
+    `func` builds an Operator out of DiscreteFunctions as well as hashable
+    parameters. Upon a cache miss, it is called with abstract DiscreteFunctions
+    (see `abstract_args`), so that the Operator may be reused for any other
+    DiscreteFunctions with the same signature. The decorated function returns
+    the Operator along with the arguments binding the actual DiscreteFunctions
+    to it, to be passed to `apply`.
+    """
+
+    @abstract_args
+    def build(*args, argmap=None, **kwargs):
+        return func(*args, **kwargs), argmap
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        # Aliasing matters, e.g. `inner(f, f)` only has one Function to bind
+        aliases = tuple(next(i for i, b in enumerate(args) if b is a) for a in args)
+
+        # SparseFunctions share their Dimension and SubFunctions with other
+        # objects (e.g., the output of `sum`), which would no longer be the case
+        # once abstracted, so they are never cached
+        if any(getattr(a, 'is_SparseFunction', False) for a in args):
+            return func(*args, **kwargs), {}
+
+        key = ((func.__name__, dv.configuration._signature_items(), aliases) +
+               tuple(signature(a) for a in args) + tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # E.g., user-provided equation options
+            return func(*args, **kwargs), {}
+
+        def _build():
+            op, argmap = build(*args, **kwargs)
+            names = tuple(next((k for k, v in argmap.items() if v is a), None)
+                          for a in args)
+            return op, names
+
+        op, names = builtins_cache.fetch(key, _build)
+
+        return op, {k: a for k, a in zip(names, args) if k is not None}
+
+    return wrapper
@@ -326,7 +326,15 @@ class ExternalAllocator(MemoryAllocator):
     Parameters
     ----------
     array : array-like
-        Any object exposing the buffer interface, such as a numpy.ndarray.
+        Any object exposing the buffer interface, such as a numpy.ndarray, or
+        the DLPack interface, such as a PyTorch CPU tensor. The data is never
+        copied, so it must be C-contiguous.
+    writeable : bool, optional
+        DLPack can't tell whether the producer's memory may be written to, so
+        NumPy may import it as read-only. Such a buffer is rejected, as writing
+        to, e.g., an immutable JAX array would silently corrupt it, unless
+        ``writeable=True``, which is an assertion that the memory is mutable.
+        Defaults to False.
 
     Notes
     -------
@@ -336,6 +344,13 @@ class ExternalAllocator(MemoryAllocator):
     * If the data present in this external memory is valuable, provide a noop
       initialiser, or else Devito will reset it to 0.
 
+    * A reference to the external object is retained for as long as the Function
+      data is alive, so the external memory can't be released under the hood.
+
+    * The generated code assumes the alignment of the external buffer, that is
+      the largest power of two, up to the default alignment, dividing its
+      address.
+
     Example
     --------
     >>> from devito import Grid, Function
@@ -353,9 +368,20 @@ class ExternalAllocator(MemoryAllocator):
            [1., 1.]], dtype=float32)
     """
 
-    def __init__(self, numpy_array):
+    def __init__(self, numpy_array, writeable=False):
+        if not isinstance(numpy_array, np.ndarray) and hasattr(numpy_array, '__dlpack__'):
+            numpy_array = _from_dlpack(numpy_array, writeable)
+        else:
+            numpy_array = np.asarray(numpy_array)
+        if not numpy_array.flags.c_contiguous:
+            raise ValueError("Cannot adopt a non C-contiguous buffer")
         self.numpy_array = numpy_array
 
+        address = numpy_array.ctypes.data
+        if address:
+            self.guaranteed_alignment = min(address & -address,
+                                            MemoryAllocator.guaranteed_alignment)
+
     def alloc(self, shape, dtype):
         assert shape == self.numpy_array.shape, \
             "Provided array has shape %s. Expected %s" %\
@@ -367,6 +393,36 @@ class ExternalAllocator(MemoryAllocator):
         return (self.numpy_array, None)
 
 
+class _BufferOwner(object):
+
+    """
+    Expose, through the NumPy array interface, a writeable view of a read-only
+    array while retaining a reference to it, and thus to its producer.
+    """
+
+    def __init__(self, array):
+        self.array = array
+        self.__array_interface__ = dict(array.__array_interface__)
+        self.__array_interface__['data'] = (array.ctypes.data, False)
+
+
+def _from_dlpack(obj, writeable=False):
+    """
+    Zero-copy view of an object implementing the DLPack interface. A view
+    imported as read-only is made writeable only if `writeable` is True.
+    """
+    array = np.from_dlpack(obj)
+    if array.flags.writeable:
+        return array
+    if not writeable:
+        raise ValueError("Cannot adopt a buffer imported as read-only through "
+                         "DLPack; use `writeable=True` if the producer's memory "
+                         "may be written to")
+    # NumPy marks the imported data as read-only whenever the producer can't
+    # signal otherwise, but the caller vouched for it being mutable
+    return np.asarray(_BufferOwner(array))
+
+
 ALLOC_GUARD = GuardAllocator(1048576)
 ALLOC_FLAT = PosixAllocator()
 ALLOC_KNL_DRAM = NumaAllocator(0)
@@ -1,5 +1,9 @@
+from collections import OrderedDict
 from collections.abc import Iterable
 from functools import wraps
+import json
+import mmap
+import os
 
 import numpy as np
 
@@ -42,8 +46,19 @@ class Data(np.ndarray):
     Any view or copy created from ``self``, for instance via a slice operation
     or a universal function ("ufunc" in NumPy jargon), will still be of type
     Data.
+
+    A Data and all of the views created from it share a modification counter,
+    which is incremented upon each ``__setitem__``. This allows derived values,
+    such as the MPI scatter plan of a SparseFunction's coordinates, to be
+    cached until the data is written. Writes bypassing ``__setitem__``, e.g.
+    via ``np.copyto``, go undetected.
     """
 
+    _index_maps_cache = OrderedDict()
+    """The most recently used MPI index maps, see ``_index_maps``."""
+
+    _index_maps_cache_size = 64
+
     def __new__(cls, shape, dtype, decomposition=None, modulo=None, allocator=ALLOC_FLAT,
                 distributor=None):
         assert len(shape) == len(modulo)
@@ -64,6 +79,9 @@ class Data(np.ndarray):
         # to reconstruct information about the computed view (e.g., `decomposition`)
         obj._index_stash = None
 
+        # Modification counter, shared with all views
+        obj._version = DataVersion()
+
         # Sanity check -- A Dimension can't be at the same time modulo-iterated
         # and MPI-distributed
         assert all(i is None for i, j in zip(obj._decomposition, obj._modulo)
@@ -104,6 +122,9 @@ class Data(np.ndarray):
         # that only one object (the "root" Data) will free the C-allocated memory
         self._memfree_args = None
 
+        # Writes to a view are writes to `obj` too
+        self._version = getattr(obj, '_version', None) or DataVersion()
+
         if not issubclass(type(obj), Data):
             # Definitely from view casting
             self._is_distributed = False
@@ -249,54 +270,35 @@ class Data(np.ndarray):
             comm = self._distributor.comm
             rank = comm.Get_rank()
 
-            owners, send, global_si, local_si = \
-                mpi_index_maps(loc_idx, local_val.shape, self._distributor.topology,
-                               self._distributor.all_coords, comm)
-
-            it = np.nditer(owners, flags=['refs_ok', 'multi_index'])
-            if not is_gather:
+            glb_shape, sendmap, recvmap = self._index_maps(glb_idx, loc_idx,
+                                                           local_val.shape,
+                                                           gather_rank)
+
+            if is_gather:
+                sendbuf = np.ascontiguousarray(local_val._local, dtype=self.dtype)
+                counts = [0]*comm.size
+                for i, (_, shape) in recvmap.items():
+                    counts[i] = int(np.prod(shape))
+                recvbuf = np.empty(sum(counts), dtype=self.dtype)
+                comm.Gatherv(sendbuf=sendbuf.ravel(),
+                             recvbuf=[recvbuf, counts] if rank == gather_rank else None,
+                             root=gather_rank)
+                if rank != gather_rank:
+                    return None
+                retval = np.zeros(glb_shape, dtype=self.dtype)
+                offset = 0
+                for i, n in enumerate(counts):
+                    if n > 0:
+                        box, shape = recvmap[i]
+                        retval[box] = recvbuf[offset:offset+n].reshape(shape)
+                        offset += n
+            else:
                 retval = Data(local_val.shape, local_val.dtype.type,
                               decomposition=local_val._decomposition,
                               modulo=(False,)*len(local_val.shape),
                               distributor=local_val._distributor)
-            elif rank == gather_rank:
-                retval = np.zeros(it.shape)
-            else:
-                retval = None
-            # Iterate over each element of data
-            while not it.finished:
-                index = it.multi_index
-                send_rank = gather_rank if is_gather else send[index]
-                if rank == owners[index] and rank == send_rank:
-                    # Current index and destination index are on the same rank
-                    loc_ind = local_si[index]
-                    if is_gather:
-                        loc_ind = local_si[index]
-                        retval[global_si[index]] = local_val.data[loc_ind]
-                    else:
-                        send_ind = local_si[global_si[index]]
-                        retval.data[send_ind] = local_val.data[loc_ind]
-                elif rank == owners[index]:
-                    # Current index is on this rank and hence need to send
-                    # the data to the appropriate rank
-                    loc_ind = local_si[index]
-                    send_rank = gather_rank if is_gather else send[index]
-                    send_ind = global_si[index]
-                    send_val = local_val.data[loc_ind]
-                    reqs = comm.isend([send_ind, send_val], dest=send_rank)
-                    reqs.wait()
-                elif rank == send_rank:
-                    # Current rank is required to receive data from this index
-                    recval = comm.irecv(source=owners[index])
-                    local_dat = recval.wait()
-                    if is_gather:
-                        retval[local_dat[0]] = local_dat[1]
-                    else:
-                        loc_ind = local_si[local_dat[0]]
-                        retval.data[loc_ind] = local_dat[1]
-                else:
-                    pass
-                it.iternext()
+                _alltoallv(comm, local_val._local, sendmap, retval._local, recvmap)
+
             # Check if dimensions of the view should now be reduced to
             # be consistent with those of an equivalent NumPy serial view
             if not is_gather:
@@ -320,6 +322,10 @@ class Data(np.ndarray):
 
     @_check_idx
     def __setitem__(self, glb_idx, val, comm_type):
+        # Bumped even if `glb_idx` isn't local, as all ranks are expected to
+        # agree on whether the data has been modified
+        self._version.bump()
+
         loc_idx = self._index_glb_to_loc(glb_idx)
         if loc_idx is NONLOCAL:
             # no-op
@@ -338,19 +344,26 @@ class Data(np.ndarray):
                                     i in val._decomposition])
                 idx = self._set_global_idx(val, glb_idx, val_idx)
                 comm = self._distributor.comm
-                nprocs = self._distributor.nprocs
-                # Prepare global lists:
-                data_global = []
-                idx_global = []
-                for j in range(nprocs):
-                    data_global.append(comm.bcast(np.array(val), root=j))
-                    idx_global.append(comm.bcast(idx, root=j))
-                # Set the data:
-                for j in range(nprocs):
-                    skip = any(i is None for i in idx_global[j]) \
-                        or data_global[j].size == 0
-                    if not skip:
-                        self.__setitem__(idx_global[j], data_global[j])
+
+                # Tell every rank where each block of `val` goes and what
+                # portion of `self` each rank holds
+                idx = self._normalize_setitem_idx(idx, val.shape)
+                metadata = comm.allgather((idx, val.shape, self._glb_ranges))
+                idxs, shapes, ranges = zip(*metadata)
+
+                if all(i is not NotImplemented for i in idxs):
+                    sendmap, recvmap = mpi_setitem_maps(idxs, shapes, ranges,
+                                                        comm.rank)
+                    _alltoallv(comm, val._local, sendmap, self._local, recvmap)
+                else:
+                    # Fallback: replicate all blocks of `val` on all ranks
+                    data_global = comm.allgather(np.array(val))
+                    idx_global = comm.allgather(self._set_global_idx(val, glb_idx,
+                                                                     val_idx))
+                    for i, v in zip(idx_global, data_global):
+                        if any(j is None for j in i) or v.size == 0:
+                            continue
+                        self.__setitem__(i, v)
             elif self._is_distributed:
                 # `val` is decomposed, `self` is decomposed -> local set
                 super(Data, self).__setitem__(glb_idx, val)
@@ -399,6 +412,29 @@ class Data(np.ndarray):
         else:
             raise ValueError("Cannot insert obj of type `%s` into a Data" % type(val))
 
+    def _normalize_setitem_idx(self, idx, shape):
+        """
+        Normalize an index produced by ``_set_global_idx`` for use in
+        ``mpi_setitem_maps``. None is returned if the index denotes an empty
+        block, while NotImplemented is returned if the index isn't supported.
+        """
+        if any(i is None for i in idx):
+            return None
+        glb_shape = self._glb_shape
+        processed = []
+        for i, n, modulo in zip(idx, glb_shape, self._modulo):
+            if is_integer(i):
+                processed.append(int(i % n if (modulo or i < 0) else i))
+            elif isinstance(i, slice) and i.start is not None and not modulo \
+                    and (i.step is None or i.step > 0):
+                processed.append(slice(int(i.start), i.stop, i.step or 1))
+            else:
+                return NotImplemented
+        if len(processed) != self.ndim or \
+                len([i for i in processed if isinstance(i, slice)]) != len(shape):
+            return NotImplemented
+        return tuple(processed)
+
     def _normalize_index(self, idx):
         if isinstance(idx, np.ndarray):
             # Advanced indexing mode
@@ -557,6 +593,54 @@ class Data(np.ndarray):
                 mapped_idx.append(None)
         return as_tuple(mapped_idx)
 
+    def _index_maps(self, glb_idx, loc_idx, shape, gather_rank=None):
+        """
+        Memoized ``mpi_index_maps``.
+
+        The maps depend on the index and on the data decomposition only, both
+        of which are identical across all MPI ranks. This ensures that either
+        all ranks or none of them find the maps in the cache, and thus that
+        either all ranks or none of them engage in the collectives required
+        to compute them.
+        """
+        distributor = self._distributor
+
+        key = []
+        for i in as_tuple(glb_idx):
+            if isinstance(i, slice):
+                key.append((i.start, i.stop, i.step))
+            elif is_integer(i):
+                key.append(int(i))
+            else:
+                # E.g., advanced indexing; can't be memoized
+                key = None
+                break
+        if key is not None:
+            for i, dec in zip(self.shape, self._decomposition):
+                if dec is None:
+                    key.append(i)
+                else:
+                    key.append(tuple((int(j[0]), int(j[-1])) if len(j) else ()
+                                     for j in dec))
+            key = (tuple(distributor.topology), tuple(distributor.all_coords),
+                   gather_rank, tuple(key))
+            try:
+                self._index_maps_cache.move_to_end(key)
+                return self._index_maps_cache[key]
+            except KeyError:
+                pass
+
+        maps = mpi_index_maps(loc_idx, shape, distributor.topology,
+                              distributor.all_coords, distributor.comm,
+                              gather_rank=gather_rank)
+
+        if key is not None:
+            self._index_maps_cache[key] = maps
+            if len(self._index_maps_cache) > self._index_maps_cache_size:
+                self._index_maps_cache.popitem(last=False)
+
+        return maps
+
     def _gather(self, start=None, stop=None, step=1, rank=0):
         """
         Method for gathering distributed data into a NumPy array
@@ -582,13 +666,230 @@ class Data(np.ndarray):
             gather_rank = None
         return np.array(self.__getitem__(idx, gather_rank=gather_rank))
 
+    @property
+    def _glb_ranges(self):
+        """
+        The global index range, as a ``(start, stop)`` pair, covered by the
+        calling MPI rank along each dimension.
+        """
+        ranges = []
+        for s, dec in zip(self.shape, self._decomposition):
+            if dec is None:
+                ranges.append((0, s))
+            elif dec.loc_empty:
+                ranges.append((0, 0))
+            else:
+                ranges.append((int(dec.loc_abs_min - dec.glb_min),
+                               int(dec.loc_abs_max - dec.glb_min + 1)))
+        return tuple(ranges)
+
+    @property
+    def _glb_shape(self):
+        return tuple(s if dec is None else int(dec.glb_max - dec.glb_min + 1)
+                     for s, dec in zip(self.shape, self._decomposition))
+
+    @property
+    def _comm(self):
+        if self._distributor is not None and self._distributor.is_parallel:
+            return self._distributor.comm
+        else:
+            return None
+
+    def _save(self, path, direct=False):
+        """
+        Method for writing distributed data to disk, one shard per rank.
+        See the public ``data_save`` method of `Function`.
+        """
+        comm = self._comm
+        rank = comm.rank if comm is not None else 0
+        ranges = self._glb_ranges
+        all_ranges = comm.allgather(ranges) if comm is not None else [ranges]
+
+        if rank == 0:
+            os.makedirs(path, exist_ok=True)
+            metadata = {'shape': self._glb_shape,
+                        'dtype': np.dtype(self.dtype).str,
+                        'ranges': all_ranges}
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump(metadata, f)
+        if comm is not None:
+            comm.Barrier()
+
+        _write_shard(os.path.join(path, 'shard.%d' % rank), self._local, direct)
+
+        if comm is not None:
+            comm.Barrier()
+
+    def _load(self, path):
+        """
+        Method for reading distributed data written by ``_save``, possibly
+        with a different number of ranks. See the public ``data_load`` method
+        of `Function`.
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            metadata = json.load(f)
+
+        if tuple(metadata['shape']) != self._glb_shape:
+            raise ValueError("Cannot load data of shape `%s` into an array of "
+                             "shape `%s`" % (tuple(metadata['shape']), self._glb_shape))
+        dtype = np.dtype(metadata['dtype'])
+
+        # Each rank reads the portion of each shard overlapping its own
+        # subdomain; with an unchanged decomposition, that's exactly one shard
+        ranges = self._glb_ranges
+        for rank, shard_ranges in enumerate(metadata['ranges']):
+            overlap = [(max(a0, b0), min(a1, b1))
+                       for (a0, a1), (b0, b1) in zip(shard_ranges, ranges)]
+            if any(lo >= hi for lo, hi in overlap):
+                continue
+
+            shape = tuple(hi - lo for lo, hi in shard_ranges)
+            shard = np.memmap(os.path.join(path, 'shard.%d' % rank), dtype=dtype,
+                              mode='r', shape=shape)
+            src = tuple(slice(lo - a, hi - a)
+                        for (lo, hi), (a, _) in zip(overlap, shard_ranges))
+            dst = tuple(slice(lo - a, hi - a)
+                        for (lo, hi), (a, _) in zip(overlap, ranges))
+            self._local[dst] = shard[src]
+            del shard
+
+        if self._comm is not None:
+            self._comm.Barrier()
+
     def reset(self):
         """Set all Data entries to 0."""
         self[:] = 0.0
 
 
+def _alltoallv(comm, src, sendmap, dst, recvmap):
+    """
+    Exchange boxes of ``src`` across all MPI ranks and store them into ``dst``,
+    as prescribed by ``sendmap`` and ``recvmap`` (see ``mpi_index_maps``).
+    """
+    rank = comm.rank
+
+    # Boxes staying on the calling rank are copied straight away
+    if rank in sendmap:
+        box, shape = recvmap[rank]
+        dst[box] = np.reshape(src[sendmap[rank][0]], shape)
+
+    scounts = [0]*comm.size
+    rcounts = [0]*comm.size
+    for i, (_, shape) in sendmap.items():
+        if i != rank:
+            scounts[i] = int(np.prod(shape))
+    for i, (_, shape) in recvmap.items():
+        if i != rank:
+            rcounts[i] = int(np.prod(shape))
+
+    sendbuf = [np.ravel(src[sendmap[i][0]]) for i in sorted(sendmap) if i != rank]
+    sendbuf = np.concatenate(sendbuf).astype(dst.dtype, copy=False) if sendbuf \
+        else np.empty(0, dtype=dst.dtype)
+    recvbuf = np.empty(sum(rcounts), dtype=dst.dtype)
+    comm.Alltoallv([sendbuf, scounts], [recvbuf, rcounts])
+
+    offset = 0
+    for i, n in enumerate(rcounts):
+        if n > 0:
+            box, shape = recvmap[i]
+            dst[box] = recvbuf[offset:offset+n].reshape(shape)
+            offset += n
+
+
+class DataVersion(object):
+
+    """
+    A modification counter, shared by a Data and all of its views.
+    """
+
+    def __init__(self):
+        self.value = 0
+
+    def __repr__(self):
+        return "DataVersion(%d)" % self.value
+
+    def bump(self):
+        self.value += 1
+
+
 class CommType(Tag):
     pass
 index_by_index = CommType('index_by_index')  # noqa
 serial = CommType('serial')  # noqa
 gather = CommType('gather')  # noqa
+
+
+IO_BLOCKSIZE = 1 << 26
+"""The size, in bytes, of each write issued by `_write_shard`."""
+
+IO_ALIGNMENT = mmap.PAGESIZE
+"""The alignment, in bytes, of each write issued by `_write_shard`."""
+
+
+def _iter_chunks(array, blocksize):
+    """
+    Yield contiguous copies of consecutive portions, in row-major order, of
+    ``array``, each one of at most ``blocksize`` bytes unless a single
+    innermost row is larger.
+    """
+    if array.ndim <= 1 or array.nbytes <= blocksize:
+        yield np.ascontiguousarray(array)
+    elif array[0].nbytes > blocksize:
+        for i in array:
+            yield from _iter_chunks(i, blocksize)
+    else:
+        step = blocksize // array[0].nbytes
+        for i in range(0, array.shape[0], step):
+            yield np.ascontiguousarray(array[i:i+step])
+
+
+def _write_shard(filename, array, direct=False, blocksize=IO_BLOCKSIZE):
+    """
+    Write ``array``, in row-major order, to a raw binary file.
+
+    The values are staged into a page-aligned buffer and written out in blocks
+    of ``blocksize`` bytes. With ``direct=True``, the file is opened with
+    ``O_DIRECT``, thus bypassing the OS page cache.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if direct:
+        if not hasattr(os, 'O_DIRECT'):
+            raise ValueError("`O_DIRECT` is not supported on this platform")
+        flags |= os.O_DIRECT
+    blocksize = max(blocksize // IO_ALIGNMENT, 1) * IO_ALIGNMENT
+
+    # An anonymous mmap is guaranteed to be page-aligned, as required by O_DIRECT
+    buf = mmap.mmap(-1, blocksize)
+    staging = np.frombuffer(buf, dtype=np.uint8)
+
+    def flush(nbytes):
+        view = memoryview(buf)[:nbytes]
+        while view:
+            view = view[os.write(fd, view):]
+
+    fd = os.open(filename, flags, 0o644)
+    try:
+        size = 0
+        nbytes = 0
+        for chunk in _iter_chunks(array, blocksize):
+            chunk = chunk.reshape(-1).view(np.uint8)
+            while chunk.size > 0:
+                n = min(chunk.size, blocksize - nbytes)
+                staging[nbytes:nbytes+n] = chunk[:n]
+                chunk = chunk[n:]
+                nbytes += n
+                if nbytes == blocksize:
+                    flush(blocksize)
+                    size += blocksize
+                    nbytes = 0
+        if nbytes > 0:
+            size += nbytes
+            if direct:
+                # With O_DIRECT, write sizes must be multiples of the alignment,
+                # so the trailing padding is truncated away
+                flush(-(-nbytes // IO_ALIGNMENT) * IO_ALIGNMENT)
+                os.ftruncate(fd, size)
+            else:
+                flush(nbytes)
+    finally:
+        os.close(fd)
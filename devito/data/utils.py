@@ -1,10 +1,12 @@
+from itertools import product
+
 import numpy as np
 
-from devito.tools import Tag, as_tuple, as_list, is_integer
+from devito.tools import Tag, as_tuple, is_integer
 
 __all__ = ['Index', 'NONLOCAL', 'PROJECTED', 'index_is_basic', 'index_apply_modulo',
            'index_dist_to_repl', 'convert_index', 'index_handle_oob',
-           'loc_data_idx', 'mpi_index_maps', 'flip_idx']
+           'loc_data_idx', 'mpi_index_maps', 'mpi_setitem_maps', 'flip_idx']
 
 
 class Index(Tag):
@@ -140,10 +142,9 @@ def loc_data_idx(loc_idx):
                 retval.append(slice(i.stop+1, i.start+1, -i.step))
         elif isinstance(i, slice) and i.step is not None and i.step < -1:
             if i.stop is None:
-                lmin = i.start
-                while lmin >= 0:
-                    lmin += i.step
-                retval.append(slice(lmin-i.step, i.start+1, -i.step))
+                # The smallest non-negative index reached by the slice
+                lmin = i.start % -i.step
+                retval.append(slice(lmin, i.start+1, -i.step))
             else:
                 retval.append(slice(i.stop+1, i.start+1, -i.step))
         elif is_integer(i):
@@ -153,35 +154,46 @@ def loc_data_idx(loc_idx):
     return as_tuple(retval)
 
 
-def mpi_index_maps(loc_idx, shape, topology, coords, comm):
+def mpi_index_maps(loc_idx, shape, topology, coords, comm, gather_rank=None):
     """
-    Generate various data structures used to determine what MPI communication
-    is required. The function creates the following:
-
-    owners: An array of shape ``shape`` where each index signifies the rank on which
-    that data is stored.
-
-    send: An array of shape ``shape`` where each index signifies the rank to which
-    data beloning to that index should be sent.
+    Determine the MPI communication required to reorder, or to gather onto a
+    single rank, a distributed array after it has been indexed with ``loc_idx``.
 
-    global_si: An array of ``shape`` shape where each index contains the global index
-    to which that index should be sent.
-
-    local_si: An array of shape ``shape`` where each index contains the local index
-    (on the destination rank) to which that index should be sent.
+    Each rank holds a (possibly empty) block of the array, and the blocks are
+    arranged according to ``topology``. Along a Dimension indexed by a slice
+    with negative step, the i-th element of the array ends up at position
+    ``n-1-i``, which is in general owned by a different rank. Since the
+    ownership is a cartesian product of per-Dimension ranges, the elements
+    exchanged between any two ranks always form a box, so the communication
+    is entirely described by a set of slices.
 
     Parameters
     ----------
     loc_idx : tuple of slices
         The coordinates of interest to the current MPI rank.
-    shape: np.array of tuples
-        Array containing the local shape of data to each rank.
-    topology: tuple
+    shape : tuple of ints
+        The shape of the block held by the current MPI rank.
+    topology : tuple
         Topology of the decomposed domain.
-    coords: tuple of tuples
+    coords : tuple of tuples
         The coordinates of each MPI rank in the decomposed domain, ordered
         based on the MPI rank.
     comm : MPI communicator
+    gather_rank : int, optional
+        If supplied, the whole array is to be gathered onto ``gather_rank``.
+
+    Returns
+    -------
+    glb_shape : tuple of ints
+        The shape of the whole array.
+    sendmap : dict
+        Map from destination ranks to ``(box, shape)``, meaning that the values
+        ``block[box]`` are to be sent to that rank, in row-major order.
+    recvmap : dict
+        Map from source ranks to ``(box, shape)``, meaning that the values
+        received from that rank are to be stored into ``retval[box]``, where
+        ``retval`` is either the reordered block or, if gathering, the whole
+        array.
 
     Examples
     --------
@@ -189,153 +201,163 @@ def mpi_index_maps(loc_idx, shape, topology, coords, comm):
                               [  4,  5,  6,  7],
                               [  8,  9, 10, 11],
                               [ 12, 13, 14, 15]],
-    which is then distributed over four ranks such that on rank 0:
-
-    A = [[ 0, 1],
-         [ 4, 5]],
-
-    on rank 1:
-
-    A = [[ 2, 3],
-         [ 6, 7]],
-
-    on rank 2:
-
-    A = [[  8,  9],
-         [ 12, 13]],
-
-    on rank 3:
-
-    A = [[ 10, 11],
-         [ 14, 15]].
+    which is then distributed over four ranks such that rank 0 holds
+    ``[[0, 1], [4, 5]]``, rank 1 holds ``[[2, 3], [6, 7]]``, and so on.
 
-    Taking the slice A[2:0:-1, 2:0:-1] the expected output (in serial) is
+    Taking the slice ``A[2:0:-1, 2:0:-1]``, each rank holds a block of shape
+    ``(1, 1)``, namely ``5`` on rank 0, ``6`` on rank 1, ``9`` on rank 2 and
+    ``10`` on rank 3, while the expected output is ``[[10, 9], [6, 5]]``. Hence,
+    on rank 0
 
-    [[  0,  1,  2,  3],
-     [  4, 10,  9,  7],
-     [  8,  6,  5, 11],
-     [ 12, 13, 14, 15]],
+    sendmap = {3: ((slice(0, 1, 1), slice(0, 1, 1)), (1, 1))},
 
-    Hence, in this case the following would be generated:
-
-    owners = [[0, 1],
-              [2, 3]],
-
-    send = [[3, 2],
-            [1, 0]],
-
-    global_si = [[(2, 2), (2, 1)],
-                 [(1, 2), (1, 1)]],
-
-    local_si = [[(0, 0), (0, 1)],
-                [(1, 0), (1, 1)]].
+    recvmap = {3: ((slice(0, None, -1), slice(0, None, -1)), (1, 1))}.
     """
-
-    nprocs = comm.Get_size()
-
-    # Gather data structures from all ranks in order to produce the
-    # relevant mappings.
-    dat_len = np.zeros(topology, dtype=tuple)
-    for j in range(nprocs):
-        dat_len[coords[j]] = comm.bcast(shape, root=j)
-        if any(k == 0 for k in dat_len[coords[j]]):
-            dat_len[coords[j]] = as_tuple([0]*len(dat_len[coords[j]]))
-
-    # If necessary, add the time index to the `topology` as this will
-    # be required to correctly construct various maps.
-    if len(np.amax(dat_len)) > len(topology):
-        topology = as_list(topology)
-        coords = [as_list(l) for l in coords]
-        for _ in range(len(np.amax(dat_len)) - len(topology)):
-            topology.insert(0, 1)
-            for e in coords:
-                e.insert(0, 0)
-        topology = as_tuple(topology)
-        coords = as_tuple([as_tuple(i) for i in coords])
-    dat_len = dat_len.reshape(topology)
-    dat_len_cum = distributed_data_size(dat_len, coords, topology)
-
-    # This 'transform' will be required to produce the required maps
-    transform = []
-    for i in as_tuple(loc_idx):
-        if isinstance(i, slice):
-            if i.step is not None:
-                transform.append(slice(None, None, np.sign(i.step)))
-            else:
-                transform.append(slice(None, None, None))
+    shapes = comm.allgather(tuple(shape))
+    ndim = len(shape)
+
+    # Any leading, non-distributed Dimension (e.g., time) is added to the
+    # topology as a Dimension with a single MPI rank
+    nextra = ndim - len(topology)
+    topology = (1,)*nextra + as_tuple(topology)
+    coords = [(0,)*nextra + as_tuple(i) for i in coords]
+    ranks = np.empty(topology, dtype=np.int64)
+    for rank, c in enumerate(coords):
+        ranks[c] = rank
+
+    # Along a given Dimension, all ranks with the same coordinate hold the same
+    # number of elements, unless their block is empty
+    offsets = []
+    for d in range(ndim):
+        sizes = np.zeros(topology[d], dtype=np.int64)
+        for c, s in zip(coords, shapes):
+            sizes[c[d]] = max(sizes[c[d]], s[d])
+        offsets.append(np.concatenate([[0], np.cumsum(sizes)]))
+    glb_shape = tuple(int(i[-1]) for i in offsets)
+
+    flips = [isinstance(i, slice) and i.step is not None and i.step < 0
+             for i in as_tuple(loc_idx)]
+    flips.extend([False]*(ndim - len(flips)))
+
+    def split(d, lo, hi):
+        # The elements `[lo, hi)` along `d` are mapped, by the (optional) flip,
+        # onto a contiguous range of positions. Return the pieces of `[lo, hi)`
+        # falling within each rank's range, as `(coordinate, start, stop)`
+        positions = np.arange(lo, hi)
+        if flips[d]:
+            positions = glb_shape[d] - 1 - positions
+        owners = np.searchsorted(offsets[d][1:], positions, side='right')
+        values, starts, counts = np.unique(owners, return_index=True,
+                                           return_counts=True)
+        return [(int(v), int(i), int(i + n)) for v, i, n in zip(values, starts, counts)]
+
+    def as_slice(d, start, stop):
+        if flips[d]:
+            return slice(stop - 1, start - 1 if start > 0 else None, -1)
         else:
-            transform.append(slice(0, 1, None))
-    transform = as_tuple(transform)
-
-    global_size = dat_len_cum[coords[-1]]
-
-    indices = np.zeros(global_size, dtype=tuple)
-    global_si = np.zeros(global_size, dtype=tuple)
-    it = np.nditer(indices, flags=['refs_ok', 'multi_index'])
-    while not it.finished:
-        index = it.multi_index
-        indices[index] = index
-        it.iternext()
-    global_si[:] = indices[transform]
-
-    # Create the 'rank' slices
-    rank_slice = []
-    for j in coords:
-        this_rank = []
-        for k in dat_len[j]:
-            this_rank.append(slice(0, k, 1))
-        rank_slice.append(this_rank)
-    # Normalize the slices:
-    n_rank_slice = []
-    for i in range(len(rank_slice)):
-        my_coords = coords[i]
-        if any([j.stop == j.start for j in rank_slice[i]]):
-            n_rank_slice.append(as_tuple([None]*len(rank_slice[i])))
-            continue
-        if i == 0:
-            n_rank_slice.append(as_tuple(rank_slice[i]))
-            continue
-        left_neighbours = []
-        for j in range(len(my_coords)):
-            left_coord = list(my_coords)
-            left_coord[j] -= 1
-            left_neighbours.append(as_tuple(left_coord))
-        left_neighbours = as_tuple(left_neighbours)
-        n_slice = []
-        for j in range(len(my_coords)):
-            if left_neighbours[j][j] < 0:
-                start = 0
-                stop = dat_len_cum[my_coords][j]
-            else:
-                start = dat_len_cum[left_neighbours[j]][j]
-                stop = dat_len_cum[my_coords][j]
-            n_slice.append(slice(start, stop, 1))
-        n_rank_slice.append(as_tuple(n_slice))
-    n_rank_slice = as_tuple(n_rank_slice)
-
-    # Now fill each elements owner:
-    owners = np.zeros(global_size, dtype=np.int32)
-    send = np.zeros(global_size, dtype=np.int32)
-    for i in range(len(n_rank_slice)):
-        if any([j is None for j in n_rank_slice[i]]):
-            continue
-        else:
-            owners[n_rank_slice[i]] = i
-    send[:] = owners[transform]
-
-    # Construct local_si
-    local_si = np.zeros(global_size, dtype=tuple)
-    it = np.nditer(local_si, flags=['refs_ok', 'multi_index'])
-    while not it.finished:
-        index = it.multi_index
-        owner = owners[index]
-        my_slice = n_rank_slice[owner]
-        rnorm_index = []
-        for j, k in zip(my_slice, index):
-            rnorm_index.append(k-j.start)
-        local_si[index] = as_tuple(rnorm_index)
-        it.iternext()
-    return owners, send, global_si, local_si
+            return slice(start, stop, 1)
+
+    myrank = comm.Get_rank()
+    mycoords = coords[myrank]
+    sendmap = {}
+    recvmap = {}
+
+    if gather_rank is None:
+        # The block resulting from the reordering has the same shape, hence
+        # global offsets, as the original block, so the same per-Dimension
+        # split describes what this rank sends and what it receives
+        if all(i > 0 for i in shape):
+            pieces = [split(d, offsets[d][c], offsets[d][c] + s)
+                      for d, (c, s) in enumerate(zip(mycoords, shape))]
+            for box in product(*pieces):
+                peer = int(ranks[tuple(i for i, _, _ in box)])
+                bshape = tuple(j - i for _, i, j in box)
+                sendmap[peer] = (tuple(slice(i, j, 1) for _, i, j in box), bshape)
+                recvmap[peer] = (tuple(as_slice(d, i, j)
+                                       for d, (_, i, j) in enumerate(box)), bshape)
+    else:
+        if all(i > 0 for i in shape):
+            sendmap[gather_rank] = (tuple(slice(0, i, 1) for i in shape), tuple(shape))
+        if myrank == gather_rank:
+            for rank, (c, s) in enumerate(zip(coords, shapes)):
+                if any(i == 0 for i in s):
+                    continue
+                box = []
+                for d in range(ndim):
+                    start = offsets[d][c[d]]
+                    stop = start + s[d]
+                    if flips[d]:
+                        start, stop = glb_shape[d] - stop, glb_shape[d] - start
+                    box.append(as_slice(d, int(start), int(stop)))
+                recvmap[rank] = (tuple(box), tuple(s))
+
+    return glb_shape, sendmap, recvmap
+
+
+def mpi_setitem_maps(idxs, shapes, ranges, rank):
+    """
+    Determine the MPI communication required to store a distributed array,
+    the source, into another distributed array, the target.
+
+    Parameters
+    ----------
+    idxs : list of tuples
+        For each MPI rank, the global index of the target at which the block
+        of the source held by that rank is to be stored, or None if such block
+        is empty. The entries must be integers or slices with explicit start
+        and positive step, the slices being as many as the source Dimensions.
+    shapes : list of tuples
+        For each MPI rank, the shape of the block of the source.
+    ranges : list of tuples
+        For each MPI rank, the global index range, as ``(start, stop)`` pairs,
+        of the block of the target.
+    rank : int
+        The calling MPI rank.
+
+    Returns
+    -------
+    sendmap : dict
+        Map from destination ranks to ``(box, shape)``, meaning that the values
+        ``source[box]`` are to be sent to that rank, in row-major order.
+    recvmap : dict
+        Map from source ranks to ``(box, shape)``, meaning that the values
+        received from that rank are to be stored into ``target[box]``.
+    """
+    def plan(sender, receiver):
+        idx = idxs[sender]
+        if idx is None:
+            return None
+        src = []
+        dst = []
+        shape = iter(shapes[sender])
+        for i, (lo, hi) in zip(idx, ranges[receiver]):
+            if is_integer(i):
+                if not lo <= i < hi:
+                    return None
+                dst.append(i - lo)
+                continue
+            positions = i.start + i.step*np.arange(next(shape))
+            k = np.flatnonzero((positions >= lo) & (positions < hi))
+            if k.size == 0:
+                return None
+            k0, k1 = int(k[0]), int(k[-1]) + 1
+            src.append(slice(k0, k1, 1))
+            dst.append(slice(int(positions[k0]) - lo, int(positions[k1-1]) - lo + 1,
+                             i.step))
+        bshape = tuple(i.stop - i.start for i in src)
+        return tuple(src), tuple(dst), bshape
+
+    sendmap = {}
+    recvmap = {}
+    for peer in range(len(idxs)):
+        v = plan(rank, peer)
+        if v is not None:
+            sendmap[peer] = (v[0], v[2])
+        v = plan(peer, rank)
+        if v is not None:
+            recvmap[peer] = (v[1], v[2])
+
+    return sendmap, recvmap
 
 
 def flip_idx(idx, decomposition):
@@ -405,68 +427,3 @@ def flip_idx(idx, decomposition):
         else:
             processed.append(slice(i, i+1, 1))
     return as_tuple(processed)
-
-
-def distributed_data_size(shape, coords, topology):
-    """
-    Compute the cumulative shape of the distributed data (cshape).
-
-    Parameters
-    -----------
-    shape: np.array of tuples
-        Array containing the local shape of data to each rank.
-    coords: tuple of tuples
-        The coordinates of each MPI rank in the decomposed domain, ordered
-        based on the MPI rank.
-    topology: tuple
-        Topology of the decomposed domain.
-
-    Examples
-    --------
-    Given a set of distributed data such that:
-
-    shape = [[ (2, 2), (2, 2)],
-             [ (2, 2), (2, 2)]],
-
-    (that is, there are 4 ranks and the data on each rank has shape (2, 2)).
-    cshape will be returned as
-
-    cshape = [[ (2, 2), (2, 4)],
-              [ (4, 2), (4, 4)]].
-    """
-    cshape = np.zeros(topology, dtype=tuple)
-    for i in range(len(coords)):
-        my_coords = coords[i]
-        if i == 0:
-            cshape[my_coords] = shape[my_coords]
-            continue
-        left_neighbours = []
-        for j in range(len(my_coords)):
-            left_coord = list(my_coords)
-            left_coord[j] -= 1
-            left_neighbours.append(as_tuple(left_coord))
-        left_neighbours = as_tuple(left_neighbours)
-        n_dat = []  # Normalised data size
-        if sum(shape[my_coords]) == 0:
-            prev_dat_len = []
-            for j in left_neighbours:
-                if any(d < 0 for d in j):
-                    pass
-                else:
-                    prev_dat_len.append(cshape[j])
-            func = lambda a, b: max([d[b] for d in a])
-            max_dat_len = []
-            for j in range(len(my_coords)):
-                max_dat_len.append(func(prev_dat_len, j))
-            cshape[my_coords] = as_tuple(max_dat_len)
-        else:
-            for j in range(len(my_coords)):
-                if left_neighbours[j][j] < 0:
-                    c_dat = shape[my_coords][j]
-                    n_dat.append(c_dat)
-                else:
-                    c_dat = shape[my_coords][j]  # Current length
-                    p_dat = cshape[left_neighbours[j]][j]  # Previous length
-                    n_dat.append(c_dat+p_dat)
-            cshape[my_coords] = as_tuple(n_dat)
-    return cshape
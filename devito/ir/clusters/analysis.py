@@ -71,6 +71,9 @@ class Parallelism(Detector):
             (d_1, ..., d_i) = 0, OR
             (d_1, ..., d_{i-1}) > 0, OR
             the 'write' is known to be an associative and commutative increment
+
+    A reduction along a ColorDimension is known to be conflict-free, so it
+    does not prevent the ColorDimension from being PARALLEL.
     """
 
     def _callback(self, clusters, d, prefix):
@@ -101,6 +104,14 @@ class Parallelism(Detector):
                 continue
 
             if dep.is_reduction:
+                if d.is_Color:
+                    # The increments are known to be conflict-free along `d`
+                    is_parallel_indep = False
+                    continue
+                elif any(i.dim.is_Color for i in dep.source.ispace):
+                    # ... but only within a color, so the colors themselves
+                    # must be processed one after the other
+                    return SEQUENTIAL
                 is_parallel_atomic = True
                 continue
 
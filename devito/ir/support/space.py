@@ -455,8 +455,9 @@ class IntervalGroup(PartialOrderTuple):
             dims = set().union(*[i._defines for i in as_tuple(d)])
             intervals = [i._rebuild() for i in self if not i.dim._defines & dims]
 
-        # Clean up relations
+        # Clean up relations, retaining the ordering of the surviving Intervals
         relations = [tuple(i for i in r if i not in dims) for r in self.relations]
+        relations.append(tuple(i.dim for i in intervals))
 
         return IntervalGroup(intervals, relations=relations)
 
@@ -10,7 +10,7 @@ from cgen import Struct, Value
 
 from devito.data import LEFT, CENTER, RIGHT, Decomposition
 from devito.parameters import configuration
-from devito.tools import EnrichedTuple, as_tuple, ctypes_to_cstr, filter_ordered
+from devito.tools import EnrichedTuple, as_tuple, ctypes_to_cstr
 from devito.types import CompositeObject, Object
 
 
@@ -55,7 +55,8 @@ except ImportError:
             return None
 
 
-__all__ = ['Distributor', 'SparseDistributor', 'MPI']
+__all__ = ['Distributor', 'SparseDistributor', 'MPI', 'compute_partitions',
+           'compute_topology']
 
 
 class AbstractDistributor(ABC):
@@ -178,15 +179,46 @@ class Distributor(AbstractDistributor):
     comm : MPI communicator, optional
         The set of processes over which the domain is distributed. Defaults to
         MPI.COMM_WORLD.
+    topology : tuple of ints or str, optional
+        The number of processes along each Dimension. See ``CustomTopology``.
+        With ``'auto'``, the topology minimizing the halo exchange cost for the
+        given shape is selected. See ``compute_topology``.
+    partitions : tuple of (tuple of ints or None), optional
+        For each Dimension, the global indices at which a new chunk begins, that
+        is the boundaries between consecutive chunks (e.g., ``(30, 70)`` splits a
+        Dimension of size 100 into three chunks of size 30, 40 and 30). None
+        means near-equal chunks, as by default. If ``topology`` is not supplied,
+        it is inferred from ``partitions``, with None standing for a single
+        chunk. See ``compute_partitions`` to derive them from a cost model.
     """
 
-    def __init__(self, shape, dimensions, input_comm=None, topology=None):
+    def __init__(self, shape, dimensions, input_comm=None, topology=None,
+                 partitions=None):
         super(Distributor, self).__init__(shape, dimensions)
 
+        if partitions is not None:
+            partitions = tuple(None if i is None else tuple(int(j) for j in i)
+                               for i in partitions)
+            if len(partitions) != len(shape):
+                raise ValueError("Expected `partitions` for %d Dimensions, got %d"
+                                 % (len(shape), len(partitions)))
+            for i, n in zip(partitions, shape):
+                if i is None:
+                    continue
+                if any(j >= k for j, k in zip(i, i[1:])) or \
+                   any(j <= 0 or j >= n for j in i):
+                    raise ValueError("Invalid `partitions` %s for a Dimension of "
+                                     "size %d" % (str(i), n))
+
         if configuration['mpi']:
             # First time we enter here, we make sure MPI is initialized
             if not MPI.Is_initialized():
-                MPI.Init()
+                if configuration['mpi'] == 'progress':
+                    # Helper threads advance the halo exchanges, though never
+                    # concurrently with the main thread's MPI calls
+                    MPI.Init_thread(MPI.THREAD_SERIALIZED)
+                else:
+                    MPI.Init()
                 global init_by_devito
                 init_by_devito = True
 
@@ -194,7 +226,15 @@ class Distributor(AbstractDistributor):
             # mpi4py takes care of that when the object gets out of scope
             self._input_comm = (input_comm or MPI.COMM_WORLD).Clone()
 
-            if topology is None:
+            if topology is None and partitions is not None:
+                self._topology = tuple(1 if i is None else len(i) + 1
+                                       for i in partitions)
+                if np.prod(self._topology) != self._input_comm.size:
+                    raise ValueError("`partitions` implies %d processes, but "
+                                     "%d are available"
+                                     % (np.prod(self._topology),
+                                        self._input_comm.size))
+            elif topology is None:
                 # `MPI.Compute_dims` sets the dimension sizes to be as close to each other
                 # as possible, using an appropriate divisibility algorithm. Thus, in 3D:
                 # * topology[0] >= topology[1] >= topology[2]
@@ -203,6 +243,16 @@ class Distributor(AbstractDistributor):
                 # some properties through our own wrapper (e.g., OpenMPI v3 does not
                 # guarantee that 9 ranks are arranged into a 3x3 grid when shape=(9, 9))
                 self._topology = compute_dims(self._input_comm.size, len(shape))
+            elif topology == 'auto':
+                # Assume nodes with the same number of processes, each hosting a
+                # contiguous block of ranks, as with most launchers' default mapping
+                local_comm = self._input_comm.Split_type(MPI.COMM_TYPE_SHARED)
+                ranks_per_node = self._input_comm.allreduce(local_comm.size,
+                                                            op=MPI.MIN)
+                local_comm.Free()
+
+                self._topology = compute_topology(shape, self._input_comm.size,
+                                                  ranks_per_node=ranks_per_node)
             else:
                 # A custom topology may contain integers or the wildcard '*', which
                 # implies `nprocs // nstars`
@@ -225,8 +275,17 @@ class Distributor(AbstractDistributor):
             self._topology = tuple(1 for _ in range(len(shape)))
 
         # The domain decomposition
-        self._decomposition = [Decomposition(np.array_split(range(i), j), c)
-                               for i, j, c in zip(shape, self.topology, self.mycoords)]
+        if partitions is None or not configuration['mpi']:
+            partitions = [None]*len(shape)
+        self._decomposition = []
+        for i, j, c, p in zip(shape, self.topology, self.mycoords, partitions):
+            if p is None:
+                self._decomposition.append(Decomposition(np.array_split(range(i), j), c))
+            elif len(p) + 1 != j:
+                raise ValueError("`partitions` %s inconsistent with `topology` %s"
+                                 % (str(p), str(self.topology)))
+            else:
+                self._decomposition.append(Decomposition(np.split(range(i), p), c))
 
     @property
     def comm(self):
@@ -338,16 +397,46 @@ class Distributor(AbstractDistributor):
         if len(index.shape) == 2:
             index = np.expand_dims(index, axis=2)
 
+        # Bin each support point along each decomposed Dimension. A support point
+        # falling outside of the domain along any Dimension has no owner
+        mins, maxs, ranks = self._glb_to_rank_bins
+        inside = np.ones((index.shape[0], index.shape[2]), dtype=bool)
+        bins = []
+        for i, lo, hi in zip(np.moveaxis(index, 1, 0), mins, maxs):
+            b = np.clip(np.searchsorted(lo, i, side='right') - 1, 0, len(lo) - 1)
+            inside &= (i >= lo[b]) & (i <= hi[b])
+            bins.append(b)
+
+        # A sparse point is owned by all ranks owning at least one of its
+        # support points, hence points straddling boundaries have multiple owners
+        npoint = index.shape[0]
+        owners = ranks[tuple(bins)][inside]
+        points = np.broadcast_to(np.arange(npoint).reshape(-1, 1), inside.shape)[inside]
+        owners, points = np.divmod(np.unique(owners * npoint + points), npoint)
+
         ret = {}
-        for r, j in enumerate(self.all_ranges):
-            mins = np.array([b[0] for b in j]).reshape(1, -1, 1)
-            maxs = np.array([b[-1] for b in j]).reshape(1, -1, 1)
-            inds = np.where(((index <= maxs) & (index >= mins)).all(axis=1))
-            if inds[0].size == 0:
-                continue
-            ret[r] = filter_ordered(inds[0])
+        splits = np.flatnonzero(np.diff(owners)) + 1
+        for o, p in zip(np.split(owners, splits), np.split(points, splits)):
+            if o.size > 0:
+                ret[int(o[0])] = p.tolist()
         return ret
 
+    @cached_property
+    def _glb_to_rank_bins(self):
+        """
+        The metadata used by ``glb_to_rank``, that is the per-Dimension lower and
+        upper bounds of the decomposed domain's slices and the MPI ranks, as an
+        array indexed by the coordinates in the Distributor topology.
+        """
+        mins = [np.array([min(j) for j in i if len(j) > 0]) for i in self.decomposition]
+        maxs = [np.array([max(j) for j in i if len(j) > 0]) for i in self.decomposition]
+
+        ranks = np.empty(self.topology, dtype=np.int64)
+        for r, c in enumerate(self.all_coords):
+            ranks[c] = r
+
+        return mins, maxs, ranks
+
     @property
     def neighborhood(self):
         """
@@ -388,11 +477,52 @@ class Distributor(AbstractDistributor):
 
         return ret
 
+    @cached_property
+    def neighborhood_sides(self):
+        """
+        The DataSides, as in ``neighborhood``, of the halos the calling MPI rank
+        receives (first entry) and sends (second entry) within ``graph_comm``.
+        The halo along ``(s0, s1, ..., sn)`` is sent to the neighbour at
+        ``(s0, s1, ..., sn)``, and received from the one at the flipped sides.
+        Both lists are in the same order as the ``neighborhood`` entries, which
+        is what makes the sends and receives of any two ranks match up.
+        """
+        neighborhood = self.neighborhood
+
+        sides = [i for i in neighborhood
+                 if isinstance(i, tuple) and any(j is not CENTER for j in i)]
+        sources = [i for i in sides
+                   if neighborhood[tuple(j.flip() for j in i)] != MPI.PROC_NULL]
+        destinations = [i for i in sides if neighborhood[i] != MPI.PROC_NULL]
+
+        return sources, destinations
+
+    @cached_property
+    def graph_comm(self):
+        """
+        A distributed graph communicator connecting the calling MPI rank to all
+        of its neighbours, diagonal ones included, for use in neighborhood
+        collectives.
+        """
+        neighborhood = self.neighborhood
+        sources, destinations = self.neighborhood_sides
+
+        sources = [neighborhood[tuple(j.flip() for j in i)] for i in sources]
+        destinations = [neighborhood[i] for i in destinations]
+
+        return self.comm.Create_dist_graph_adjacent(sources, destinations,
+                                                    reorder=False)
+
     @cached_property
     def _obj_comm(self):
         """An Object representing the MPI communicator."""
         return MPICommObject(self.comm)
 
+    @cached_property
+    def _obj_graph_comm(self):
+        """An Object representing the MPI distributed graph communicator."""
+        return MPIGraphCommObject(self.graph_comm)
+
     @cached_property
     def _obj_neighborhood(self):
         """
@@ -510,6 +640,19 @@ class MPICommObject(Object):
             return self._arg_defaults()
 
 
+class MPIGraphCommObject(MPICommObject):
+
+    name = 'gcomm'
+
+    def _arg_values(self, *args, **kwargs):
+        grid = kwargs.get('grid', None)
+        # Update `gcomm` based on object attached to `grid`
+        if grid is not None:
+            return grid.distributor._obj_graph_comm._arg_defaults()
+        else:
+            return self._arg_defaults()
+
+
 class MPINeighborhood(CompositeObject):
 
     __rargs__ = ('neighborhood',)
@@ -632,3 +775,209 @@ def compute_dims(nprocs, ndim):
     else:
         v = int(v)
     return tuple(v for _ in range(ndim))
+
+
+def compute_topology(shape, nprocs, halo=1, ranks_per_node=None,
+                     inter_node_weight=4., simd_weight=2.):
+    """
+    Select the process grid minimizing the total halo exchange cost.
+
+    All factorizations of ``nprocs`` are scored by the number of points all
+    processes exchange, assuming a near-equal decomposition of ``shape``. The
+    faces orthogonal to the innermost Dimension, which is the SIMD one, and the
+    faces shared by processes on different nodes are given a higher weight.
+
+    Parameters
+    ----------
+    shape : tuple of ints
+        The shape of the domain to be decomposed.
+    nprocs : int
+        The number of processes.
+    halo : int or tuple of ints, optional
+        The halo width, either the same or one per Dimension. Defaults to 1.
+    ranks_per_node : int, optional
+        The number of processes per node, assumed to host a contiguous block of
+        ranks. Defaults to all processes sharing a single node.
+    inter_node_weight : float, optional
+        The cost of exchanging a point across nodes relative to within a node.
+        Defaults to 4.
+    simd_weight : float, optional
+        The cost of exchanging a point across the innermost Dimension, relative
+        to the other Dimensions, since those halos are non-contiguous and
+        decomposing the innermost Dimension shortens its vectorizable loops.
+        Defaults to 2.
+
+    Examples
+    --------
+    >>> compute_topology((2000, 2000, 400), 64)
+    (8, 8, 1)
+    """
+    shape = tuple(shape)
+    ndim = len(shape)
+    halo = as_tuple(halo)
+    if len(halo) == 1:
+        halo = halo*ndim
+
+    best = None
+    for topology in _factorizations(nprocs, ndim):
+        if any(p > n for p, n in zip(topology, shape)):
+            continue
+
+        extents = [np.array([len(i) for i in np.array_split(range(n), p)])
+                   for n, p in zip(shape, topology)]
+        nodes = np.arange(nprocs).reshape(topology) // (ranks_per_node or nprocs)
+
+        value = 0
+        for d, p in enumerate(topology):
+            if p == 1:
+                continue
+
+            # The area of the face each process shares with its right neighbour
+            area = np.ones(topology)
+            for k in range(ndim):
+                if k != d:
+                    shape_k = [-1 if i == k else 1 for i in range(ndim)]
+                    area = area*extents[k].reshape(shape_k)
+            area = np.take(area, range(p - 1), axis=d)
+
+            weights = np.where(np.take(nodes, range(p - 1), axis=d) ==
+                               np.take(nodes, range(1, p), axis=d),
+                               1., inter_node_weight)
+            if d == ndim - 1:
+                weights = weights*simd_weight
+
+            # Points are exchanged in both directions
+            value += 2*halo[d]*(weights*area).sum()
+
+        if best is None or value < best[0]:
+            best = (value, topology)
+
+    if best is None:
+        # More processes than grid points along any viable process grid
+        return compute_dims(nprocs, ndim)
+
+    return best[1]
+
+
+def compute_partitions(cost, nprocs, topology=None, halo=1, halo_weight=1.):
+    """
+    Compute a cost-balanced domain decomposition.
+
+    Each Dimension is split independently, so that every chunk carries about
+    the same share of the cost summed over all other Dimensions. Among all the
+    process grids comprising ``nprocs`` processes, the one minimizing the
+    maximum, over all processes, of the compute cost plus the halo exchange
+    cost is selected.
+
+    Parameters
+    ----------
+    cost : array_like
+        The cost of updating each grid point, e.g. higher in the absorbing
+        layers or in the SubDomains in which extra Eqs are computed.
+    nprocs : int
+        The number of processes.
+    topology : tuple of ints, optional
+        The process grid. If supplied, only the partition boundaries are computed.
+    halo : int, optional
+        The halo width, in grid points. Defaults to 1.
+    halo_weight : float, optional
+        The cost of exchanging a halo point, relative to the unit of ``cost``.
+        Defaults to 1.
+
+    Returns
+    -------
+    The topology and partitions, to be passed to Grid or Distributor.
+
+    Examples
+    --------
+    Assuming a 2D domain with a 20-point absorbing layer, in which the update of
+    a point is twice as expensive as in the interior:
+
+    >>> cost = np.full((140, 140), 2.)
+    >>> cost[20:-20, 20:-20] = 1.
+    >>> topology, partitions = compute_partitions(cost, 4)
+    >>> grid = Grid(shape=(140, 140), topology=topology,
+    ...             partitions=partitions)  # doctest: +SKIP
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    shape = cost.shape
+    ndim = cost.ndim
+
+    if topology is None:
+        candidates = [i for i in _factorizations(nprocs, ndim)
+                      if all(j <= n for j, n in zip(i, shape))]
+        if not candidates:
+            raise ValueError("Cannot decompose a domain of shape %s over %d "
+                             "processes" % (str(shape), nprocs))
+    else:
+        topology = tuple(topology)
+        if len(topology) != ndim or np.prod(topology) != nprocs:
+            raise ValueError("Invalid `topology` %s for %d processes"
+                             % (str(topology), nprocs))
+        candidates = [topology]
+
+    best = None
+    for topology in candidates:
+        partitions = []
+        for d, p in enumerate(topology):
+            axes = tuple(i for i in range(ndim) if i != d)
+            partitions.append(_split_weighted(cost.sum(axis=axes), p))
+
+        # The compute cost of each process
+        load = cost
+        for d, p in enumerate(partitions):
+            load = np.add.reduceat(load, (0,) + p, axis=d)
+
+        # The number of points each process sends and receives
+        extents = [np.diff((0,) + p + (n,)) for p, n in zip(partitions, shape)]
+        surface = np.zeros(topology)
+        for d, p in enumerate(topology):
+            nneighs = np.array([int(i > 0) + int(i < p - 1) for i in range(p)])
+            area = np.ones(topology)
+            for k in range(ndim):
+                v = nneighs if k == d else extents[k]
+                area = area*v.reshape([-1 if i == k else 1 for i in range(ndim)])
+            surface += area
+
+        value = (load + 2*halo*halo_weight*surface).max()
+        if best is None or value < best[0]:
+            best = (value, topology, tuple(partitions))
+
+    _, topology, partitions = best
+
+    return topology, partitions
+
+
+def _factorizations(nprocs, ndim):
+    """
+    All ways, in descending lexicographic order, of arranging `nprocs` processes
+    into a process grid with `ndim` Dimensions.
+    """
+    if ndim == 1:
+        return [(nprocs,)]
+    ret = []
+    for i in reversed(range(1, nprocs + 1)):
+        if nprocs % i == 0:
+            ret.extend((i,) + j for j in _factorizations(nprocs // i, ndim - 1))
+    return ret
+
+
+def _split_weighted(weights, nparts):
+    """
+    The `nparts - 1` boundaries splitting `weights` into `nparts` non-empty
+    chunks of about the same total weight.
+    """
+    n = len(weights)
+    prefix = np.concatenate([[0.], np.cumsum(weights)])
+
+    ret = []
+    for k in range(1, nparts):
+        target = prefix[-1]*k/nparts
+        b = int(np.searchsorted(prefix, target))
+        if b > 0 and target - prefix[b-1] < prefix[min(b, n)] - target:
+            b -= 1
+        # Chunks must be non-empty
+        b = min(max(b, ret[-1] + 1 if ret else 1), n - nparts + k)
+        ret.append(b)
+
+    return tuple(ret)
@@ -1,24 +1,29 @@
 import abc
 from collections import OrderedDict
-from ctypes import POINTER, c_void_p, c_int, sizeof
+from ctypes import POINTER, c_char, c_void_p, c_int, c_ssize_t, sizeof
 from functools import reduce
 from itertools import product
 from operator import mul
 
+import numpy as np
 from sympy import Integer
 
 from devito.data import OWNED, HALO, NOPAD, LEFT, CENTER, RIGHT
 from devito.ir.equations import DummyEq
-from devito.ir.iet import (Call, Callable, Conditional, ElementalFunction,
-                           Expression, ExpressionBundle, AugmentedExpression,
-                           Iteration, List, Prodder, Return, make_efunc, FindNodes,
+from devito.exceptions import InvalidOperator
+from devito.ir.iet import (AsyncCall, AsyncCallable, Call, Callable, Conditional,
+                           DummyExpr, ElementalFunction, Expression, ExpressionBundle,
+                           AugmentedExpression, Iteration, List, Prodder, Return,
+                           While, derive_parameters, make_efunc, FindNodes,
                            Transformer)
 from devito.mpi import MPI
-from devito.symbolics import (Byref, CondNe, FieldFromPointer, FieldFromComposite,
-                              IndexedPointer, Macro, cast_mapper, subs_op_args)
+from devito.symbolics import (Byref, CondEq, CondNe, FieldFromPointer,
+                              FieldFromComposite, IndexedPointer, Macro, cast_mapper,
+                              subs_op_args)
 from devito.tools import (dtype_to_mpitype, dtype_len, dtype_to_ctype, flatten,
                           generator)
-from devito.types import Array, Dimension, Eq, Symbol, LocalObject, CompositeObject
+from devito.types import (Array, CustomDimension, Dimension, Eq, Lock, Symbol,
+                          LocalObject, CompositeObject)
 
 __all__ = ['HaloExchangeBuilder', 'mpi_registry']
 
@@ -112,7 +117,8 @@ class HaloExchangeBuilder(object):
             if halowait is not None:
                 halowaits.append(self._call_halowait(halowait.name, f, hse, msg))
 
-        body = self._make_body(callcompute, remainder, haloupdates, halowaits)
+        body = self._make_body(callcompute, remainder, haloupdates, halowaits,
+                               callpoke)
 
         return body
 
@@ -252,7 +258,8 @@ class HaloExchangeBuilder(object):
         return
 
     @abc.abstractmethod
-    def _make_body(self, callcompute, remainder, haloupdates, halowaits):
+    def _make_body(self, callcompute, remainder, haloupdates, halowaits,
+                   callpoke=None):
         """
         Chain together the `compute`, `remainder`, `haloupdate`, and `halowait`
         Calls.
@@ -451,7 +458,8 @@ class BasicHaloExchangeBuilder(HaloExchangeBuilder):
     def _call_remainder(self, *args):
         return
 
-    def _make_body(self, callcompute, remainder, haloupdates, halowaits):
+    def _make_body(self, callcompute, remainder, haloupdates, halowaits,
+                   callpoke=None):
         body = []
 
         body.append(HaloUpdateList(body=haloupdates))
@@ -841,7 +849,8 @@ class DualHaloExchangeBuilder(Overlap2HaloExchangeBuilder):
         halowait()
     """
 
-    def _make_body(self, callcompute, remainder, haloupdates, halowaits):
+    def _make_body(self, callcompute, remainder, haloupdates, halowaits,
+                   callpoke=None):
         body = []
 
         assert remainder is not None
@@ -912,6 +921,467 @@ class FullHaloExchangeBuilder(Overlap2HaloExchangeBuilder):
         return Prodder(poke.name, poke.parameters, single_thread=True, periodic=True)
 
 
+class ProgressHaloExchangeBuilder(Overlap2HaloExchangeBuilder):
+
+    """
+    An Overlap2HaloExchangeBuilder in which a helper thread, rather than Calls
+    to MPI_Test injected into the compute loops, advances the outstanding
+    communications while the CORE region is computed. MPI must provide at
+    least MPI_THREAD_SERIALIZED, since the main thread only resumes calling
+    MPI once the helper thread is done.
+
+    Generates:
+
+        haloupdate()
+        progress()  <- asynchronous, runs until all requests complete
+        compute_core()
+        wait(progress)
+        halowait()
+        remainder()
+    """
+
+    def _make_poke(self, hs, key, msgs):
+        if MPI.Query_thread() < MPI.THREAD_SERIALIZED:
+            raise InvalidOperator("The `progress` MPI mode requires MPI to be "
+                                  "initialized with at least MPI_THREAD_SERIALIZED")
+
+        lflag = Symbol(name='lflag')
+        gflag = Symbol(name='gflag')
+
+        # Test all peers' requests, until all of them have completed
+        body = [Expression(DummyEq(lflag, 0)),
+                Expression(DummyEq(gflag, 1))]
+        for msg in msgs:
+            dim = Dimension(name='i')
+            msgi = IndexedPointer(msg, dim)
+
+            rrecv = Byref(FieldFromComposite(msg._C_field_rrecv, msgi))
+            testrecv = Call('MPI_Test', [rrecv, Byref(lflag), Macro('MPI_STATUS_IGNORE')])
+
+            rsend = Byref(FieldFromComposite(msg._C_field_rsend, msgi))
+            testsend = Call('MPI_Test', [rsend, Byref(lflag), Macro('MPI_STATUS_IGNORE')])
+
+            update = AugmentedExpression(DummyEq(gflag, lflag), operation='&')
+
+            body.append(Iteration([testsend, update, testrecv, update],
+                                  dim, msg.npeers - 1))
+
+        # Signal the main thread that the halo exchange is over
+        ld = CustomDimension(name='ld', symbolic_size=1)
+        lock = Lock(name='lock%d' % key, dimensions=ld)
+
+        body = List(body=[Expression(DummyEq(gflag, 0)),
+                          While(CondEq(gflag, 0), body),
+                          DummyExpr(lock[0], 2)])
+
+        return AsyncCallable('progress%d' % key, body,
+                             parameters=derive_parameters(body))
+
+    def _call_poke(self, poke):
+        lock, = [i for i in poke.parameters if isinstance(i, Lock)]
+
+        activation = List(body=[DummyExpr(lock[0], 0),
+                                AsyncCall(poke.name, poke.parameters)])
+        wait = ProgressWaitList(body=While(CondEq(lock[0], 0)))
+
+        return activation, wait
+
+    def _make_compute(self, hs, key, *args):
+        return super()._make_compute(hs, key)
+
+    def _make_body(self, callcompute, remainder, haloupdates, halowaits,
+                   callpoke=None):
+        activation, wait = callpoke
+
+        body = [HaloUpdateList(body=haloupdates),
+                activation,
+                CoreComputeList(body=callcompute),
+                wait,
+                HaloWaitList(body=halowaits),
+                self._call_remainder(remainder)]
+
+        return List(body=body)
+
+
+class PersistentHaloExchangeBuilder(Diag2HaloExchangeBuilder):
+
+    """
+    A Diag2HaloExchangeBuilder using persistent MPI requests. Like the buffers,
+    the requests are set up once per Operator run, rather than at each halo
+    exchange, which then merely (re)starts them.
+
+    Generates:
+
+        haloupdate()
+        halowait()
+        compute()
+    """
+
+    def _make_msg(self, f, hse, key):
+        # Only retain the halos required by the Diag scheme
+        halos = sorted(i for i in hse.halos if isinstance(i.dim, tuple))
+        return MPIMsgPersistent('msg%d' % key, f, halos)
+
+    def _make_haloupdate(self, f, hse, key, *args, msg=None):
+        iet = super()._make_haloupdate(f, hse, key, *args, msg=msg)
+
+        # The requests are already bound to buffers and peers
+        mapper = {i: StartCall(i.arguments[-1])
+                  for i in FindNodes((IrecvCall, IsendCall)).visit(iet)}
+
+        return Transformer(mapper).visit(iet)
+
+
+class AggregatedHaloExchangeBuilder(Diag2HaloExchangeBuilder):
+
+    """
+    A Diag2HaloExchangeBuilder packing all Functions sharing a HaloSpot, the
+    halos to be exchanged and the type into a single buffer per peer, so that
+    there is only one message per peer, rather than one per Function and peer.
+
+    Generates:
+
+        haloupdate()
+        halowait()
+        compute()
+    """
+
+    def make(self, hs):
+        # Sanity check
+        assert all(f.is_Function and f.grid is not None for f in hs.fmapper)
+
+        # Group the Functions that can share messages
+        groups = OrderedDict()
+        for f, hse in hs.fmapper.items():
+            # Only retain the halos required by the Diag scheme
+            halos = tuple(sorted(i for i in hse.halos if isinstance(i.dim, tuple)))
+            groups.setdefault((f.grid, f.dtype, halos), []).append((f, hse))
+
+        haloupdates = []
+        halowaits = []
+        for (_, _, halos), items in groups.items():
+            items = tuple(items)
+            try:
+                msg = self._msgs[items]
+            except KeyError:
+                key = self._gen_msgkey()
+                targets = [f for f, _ in items]
+                msg = self._msgs.setdefault(items,
+                                            MPIMsgAggregated('msg%d' % key, targets,
+                                                             list(halos)))
+
+            haloupdate, halowait = self._make_all(items, msg)
+            haloupdates.append(self._call_haloupdate(haloupdate.name, items, msg))
+            halowaits.append(self._call_halowait(halowait.name, items, msg))
+
+        return self._make_body(None, hs.body, haloupdates, halowaits)
+
+    def _make_all(self, items, msg):
+        key = self._gen_commkey()
+
+        copies = []
+        for f, hse in items:
+            k = self._gen_commkey()
+            copies.append((self._make_copy(f, hse, k),
+                           self._make_copy(f, hse, k, swap=True)))
+
+        haloupdate = self._make_haloupdate(items, key, [i for i, _ in copies], msg)
+        halowait = self._make_halowait(items, key, [i for _, i in copies], msg)
+
+        self._efuncs.extend([haloupdate, halowait])
+        self._efuncs.extend(flatten(copies))
+
+        return haloupdate, halowait
+
+    def _make_fixed(self, items):
+        return [{d: Symbol(name="o%s%d" % (d.root, n)) for d in hse.loc_indices}
+                for n, (_, hse) in enumerate(items)]
+
+    def _make_copies(self, cls, items, copies, msg, msgi, buf, field):
+        """
+        Calls to the gathers/scatters of all Functions from/to the packed buffer.
+        """
+        f0 = items[0][0]
+        cast = cast_mapper[(f0.dtype, '*')]
+        ndim = len(f0._dist_dimensions)
+
+        calls = []
+        for n, ((f, _), copy, fixed) in enumerate(zip(items, copies,
+                                                      self._make_fixed(items))):
+            sizes = [FieldFromComposite('%s[%d]' % (msg._C_field_sizes,
+                                                    n*ndim + i), msgi)
+                     for i in range(ndim)]
+            ofs = [FieldFromComposite('%s[%d]' % (field, n*ndim + i), msgi)
+                   for i in range(ndim)]
+            ofs = [fixed.get(d) or ofs.pop(0) for d in f.dimensions]
+            displ = FieldFromComposite('%s[%d]' % (msg._C_field_displs, n), msgi)
+
+            calls.append(cls(copy.name, [cast(buf) + displ] + sizes + [f] + ofs))
+
+        return calls
+
+    def _make_haloupdate(self, items, key, gathers, msg):
+        f0 = items[0][0]
+        comm = f0.grid.distributor._obj_comm
+
+        dim = Dimension(name='i')
+
+        msgi = IndexedPointer(msg, dim)
+
+        bufg = FieldFromComposite(msg._C_field_bufg, msgi)
+        bufs = FieldFromComposite(msg._C_field_bufs, msgi)
+        count = FieldFromComposite(msg._C_field_count, msgi)
+
+        fromrank = FieldFromComposite(msg._C_field_from, msgi)
+        torank = FieldFromComposite(msg._C_field_to, msgi)
+
+        # Pack all Functions into the same buffer
+        # The packing is unnecessary if sending to MPI.PROC_NULL
+        gather = self._make_copies(Gather, items, gathers, msg, msgi, bufg,
+                                   msg._C_field_ofsg)
+        gather = Conditional(CondNe(torank, Macro('MPI_PROC_NULL')), List(body=gather))
+
+        # Make Irecv/Isend
+        reqs = FieldFromPointer(msg._C_field_reqs, msg)
+        rrecv = Byref(IndexedPointer(reqs, 2*dim))
+        rsend = Byref(IndexedPointer(reqs, 2*dim + 1))
+        recv = IrecvCall([bufs, count, Macro(dtype_to_mpitype(f0.dtype)),
+                          fromrank, Integer(13), comm, rrecv])
+        send = IsendCall([bufg, count, Macro(dtype_to_mpitype(f0.dtype)),
+                         torank, Integer(13), comm, rsend])
+
+        # The -1 below is because an Iteration, by default, generates <=
+        ncomms = Symbol(name='ncomms')
+        iet = Iteration([recv, gather, send], dim, ncomms - 1)
+        parameters = ([f for f, _ in items] + [comm, msg, ncomms] +
+                      flatten(i.values() for i in self._make_fixed(items)))
+        return HaloUpdate('haloupdate%s' % key, iet, parameters)
+
+    def _call_haloupdate(self, name, items, msg):
+        comm = items[0][0].grid.distributor._obj_comm
+        args = ([f for f, _ in items] + [comm, msg, msg.npeers] +
+                flatten(hse.loc_indices.values() for _, hse in items))
+        return HaloUpdateCall(name, args)
+
+    def _make_halowait(self, items, key, scatters, msg):
+        dim = Dimension(name='i')
+
+        msgi = IndexedPointer(msg, dim)
+
+        bufs = FieldFromComposite(msg._C_field_bufs, msgi)
+
+        fromrank = FieldFromComposite(msg._C_field_from, msgi)
+
+        # A single wait for all messages
+        ncomms = Symbol(name='ncomms')
+        reqs = FieldFromPointer(msg._C_field_reqs, msg)
+        waitall = Call('MPI_Waitall', [2*ncomms, reqs, Macro('MPI_STATUSES_IGNORE')])
+
+        # Unpack all Functions from the same buffer
+        # The unpacking must be guarded as we must not alter the halo values along
+        # the domain boundary, where the sender is actually MPI.PROC_NULL
+        scatter = self._make_copies(Scatter, items, scatters, msg, msgi, bufs,
+                                    msg._C_field_ofss)
+        scatter = Conditional(CondNe(fromrank, Macro('MPI_PROC_NULL')),
+                              List(body=scatter))
+
+        # The -1 below is because an Iteration, by default, generates <=
+        iet = List(body=[waitall, Iteration(scatter, dim, ncomms - 1)])
+        parameters = ([f for f, _ in items] + [msg, ncomms] +
+                      flatten(i.values() for i in self._make_fixed(items)))
+        return Callable('halowait%d' % key, iet, 'void', parameters, ('static',))
+
+    def _call_halowait(self, name, items, msg):
+        args = ([f for f, _ in items] + [msg, msg.npeers] +
+                flatten(hse.loc_indices.values() for _, hse in items))
+        return HaloWaitCall(name, args)
+
+
+class DatatypeHaloExchangeBuilder(Diag2HaloExchangeBuilder):
+
+    """
+    A Diag2HaloExchangeBuilder which, rather than packing/unpacking the halos
+    into/from contiguous buffers, describes them through MPI subarray datatypes,
+    so that they are sent/received directly from/into the Function data.
+
+    Generates:
+
+        haloupdate()
+        halowait()
+    """
+
+    def _make_msg(self, f, hse, key):
+        # Only retain the halos required by the Diag scheme
+        halos = sorted(i for i in hse.halos if isinstance(i.dim, tuple))
+        return MPIMsgDatatype('msg%d' % key, f, halos)
+
+    def _make_all(self, f, hse, msg):
+        key = self._gen_commkey()
+
+        haloupdate = self._make_haloupdate(f, hse, key, msg=msg)
+        halowait = self._make_halowait(f, hse, key, msg=msg)
+
+        self._efuncs.extend([haloupdate, halowait])
+
+        return haloupdate, halowait
+
+    def _make_base(self, f, fixed):
+        """
+        The address of the ``f`` slice, along the Dimensions in ``fixed``, to
+        which the subarray datatypes apply.
+        """
+        cast = cast_mapper[(f.dtype, '*')]
+
+        sizes = [FieldFromPointer('%s[%d]' % (f._C_field_size, i), f._C_symbol)
+                 for i in range(f.ndim)]
+        offset = sum(v*reduce(mul, sizes[f.dimensions.index(d) + 1:], 1)
+                     for d, v in fixed.items())
+
+        return cast(FieldFromPointer(f._C_field_data, f._C_symbol)) + offset
+
+    def _make_haloupdate(self, f, hse, key, *args, msg=None):
+        comm = f.grid.distributor._obj_comm
+
+        fixed = {d: Symbol(name="o%s" % d.root) for d in hse.loc_indices}
+
+        dim = Dimension(name='i')
+
+        msgi = IndexedPointer(msg, dim)
+
+        fromrank = FieldFromComposite(msg._C_field_from, msgi)
+        torank = FieldFromComposite(msg._C_field_to, msgi)
+
+        trecv = FieldFromComposite(msg._C_field_trecv, msgi)
+        tsend = FieldFromComposite(msg._C_field_tsend, msgi)
+
+        # Make Irecv/Isend, straight from/into `f`. There's no need to guard
+        # the receives from MPI.PROC_NULL, as these leave `f` untouched
+        base = self._make_base(f, fixed)
+        rrecv = Byref(FieldFromComposite(msg._C_field_rrecv, msgi))
+        rsend = Byref(FieldFromComposite(msg._C_field_rsend, msgi))
+        recv = IrecvCall([base, Integer(1), trecv, fromrank, Integer(13), comm, rrecv])
+        send = IsendCall([base, Integer(1), tsend, torank, Integer(13), comm, rsend])
+
+        # The -1 below is because an Iteration, by default, generates <=
+        ncomms = Symbol(name='ncomms')
+        iet = Iteration([recv, send], dim, ncomms - 1)
+        parameters = ([f, comm, msg, ncomms]) + list(fixed.values())
+        return HaloUpdate('haloupdate%s' % key, iet, parameters)
+
+    def _make_halowait(self, f, hse, key, *args, msg=None):
+        fixed = {d: Symbol(name="o%s" % d.root) for d in hse.loc_indices}
+
+        dim = Dimension(name='i')
+
+        msgi = IndexedPointer(msg, dim)
+
+        rrecv = Byref(FieldFromComposite(msg._C_field_rrecv, msgi))
+        waitrecv = Call('MPI_Wait', [rrecv, Macro('MPI_STATUS_IGNORE')])
+        rsend = Byref(FieldFromComposite(msg._C_field_rsend, msgi))
+        waitsend = Call('MPI_Wait', [rsend, Macro('MPI_STATUS_IGNORE')])
+
+        # The -1 below is because an Iteration, by default, generates <=
+        ncomms = Symbol(name='ncomms')
+        iet = Iteration([waitsend, waitrecv], dim, ncomms - 1)
+        parameters = ([f] + list(fixed.values()) + [msg, ncomms])
+        return Callable('halowait%d' % key, iet, 'void', parameters, ('static',))
+
+
+class NeighborhoodHaloExchangeBuilder(DatatypeHaloExchangeBuilder):
+
+    """
+    A DatatypeHaloExchangeBuilder performing the whole halo exchange of a
+    Function through a single neighborhood collective, MPI_Neighbor_alltoallw,
+    over the Distributor's graph communicator.
+
+    Generates:
+
+        haloupdate()
+    """
+
+    def _make_msg(self, f, hse, key):
+        # Only retain the halos required by the Diag scheme
+        halos = sorted(i for i in hse.halos if isinstance(i.dim, tuple))
+        return MPIMsgNeighborhood('msg%d' % key, f, halos)
+
+    def _make_all(self, f, hse, msg):
+        key = self._gen_commkey()
+
+        haloupdate = self._make_haloupdate(f, hse, key, msg=msg)
+        halowait = self._make_halowait(f, hse, key, msg=msg)
+
+        self._efuncs.append(haloupdate)
+        if halowait is not None:
+            self._efuncs.append(halowait)
+
+        return haloupdate, halowait
+
+    def _make_alltoallw(self, arguments, msg):
+        return Call('MPI_Neighbor_alltoallw', arguments)
+
+    def _make_haloupdate(self, f, hse, key, *args, msg=None):
+        comm = f.grid.distributor._obj_graph_comm
+
+        fixed = {d: Symbol(name="o%s" % d.root) for d in hse.loc_indices}
+
+        # The send and receive regions are disjoint, so `f` acts as both the
+        # send and the receive buffer
+        base = self._make_base(f, fixed)
+        sargs = [FieldFromPointer(i, msg) for i in
+                 (msg._C_field_scounts, msg._C_field_sdispls, msg._C_field_stypes)]
+        rargs = [FieldFromPointer(i, msg) for i in
+                 (msg._C_field_rcounts, msg._C_field_rdispls, msg._C_field_rtypes)]
+        call = self._make_alltoallw([base] + sargs + [base] + rargs + [comm], msg)
+
+        iet = List(body=call)
+        parameters = [f, comm, msg] + list(fixed.values())
+        return HaloUpdate('haloupdate%s' % key, iet, parameters)
+
+    def _call_haloupdate(self, name, f, hse, msg):
+        comm = f.grid.distributor._obj_graph_comm
+        args = [f, comm, msg] + list(hse.loc_indices.values())
+        return HaloUpdateCall(name, args)
+
+    def _make_halowait(self, *args, **kwargs):
+        return
+
+
+class INeighborhoodHaloExchangeBuilder(NeighborhoodHaloExchangeBuilder):
+
+    """
+    A NeighborhoodHaloExchangeBuilder resorting to the non-blocking
+    MPI_Ineighbor_alltoallw, to implement computation-communication overlap
+    as in Overlap2HaloExchangeBuilder.
+
+    Generates:
+
+        haloupdate()
+        compute_core()
+        halowait()
+        remainder()
+    """
+
+    _make_region = Overlap2HaloExchangeBuilder._make_region
+    _make_compute = Overlap2HaloExchangeBuilder._make_compute
+    _call_compute = Overlap2HaloExchangeBuilder._call_compute
+    _make_remainder = Overlap2HaloExchangeBuilder._make_remainder
+    _call_remainder = Overlap2HaloExchangeBuilder._call_remainder
+
+    def _make_alltoallw(self, arguments, msg):
+        req = Byref(FieldFromPointer(msg._C_field_req, msg))
+        return Call('MPI_Ineighbor_alltoallw', arguments + [req])
+
+    def _make_halowait(self, f, hse, key, *args, msg=None):
+        req = Byref(FieldFromPointer(msg._C_field_req, msg))
+        wait = Call('MPI_Wait', [req, Macro('MPI_STATUS_IGNORE')])
+
+        iet = List(body=wait)
+        return Callable('halowait%d' % key, iet, 'void', [msg], ('static',))
+
+    def _call_halowait(self, name, f, hse, msg):
+        return HaloWaitCall(name, [msg])
+
+
 mpi_registry = {
     True: BasicHaloExchangeBuilder,
     'basic': BasicHaloExchangeBuilder,
@@ -920,7 +1390,13 @@ mpi_registry = {
     'overlap': OverlapHaloExchangeBuilder,
     'overlap2': Overlap2HaloExchangeBuilder,
     'full': FullHaloExchangeBuilder,
-    'dual': DualHaloExchangeBuilder
+    'progress': ProgressHaloExchangeBuilder,
+    'dual': DualHaloExchangeBuilder,
+    'persistent': PersistentHaloExchangeBuilder,
+    'aggregated': AggregatedHaloExchangeBuilder,
+    'datatype': DatatypeHaloExchangeBuilder,
+    'neighborhood': NeighborhoodHaloExchangeBuilder,
+    'ineighborhood': INeighborhoodHaloExchangeBuilder
 }
 
 
@@ -977,6 +1453,12 @@ class IrecvCall(Call):
         super().__init__('MPI_Irecv', arguments)
 
 
+class StartCall(Call):
+
+    def __init__(self, arguments, **kwargs):
+        super().__init__('MPI_Start', arguments)
+
+
 class MPICall(Call):
     pass
 
@@ -1005,6 +1487,14 @@ class HaloWaitList(MPIList):
     pass
 
 
+class CoreComputeList(MPIList):
+    pass
+
+
+class ProgressWaitList(MPIList):
+    pass
+
+
 # Types sub-hierarchy
 
 
@@ -1167,6 +1657,329 @@ class MPIMsgEnriched(MPIMsg):
         return {self.name: self.value}
 
 
+class MPIMsgPersistent(MPIMsgEnriched):
+
+    """
+    An MPIMsgEnriched whose requests are persistent, that is bound once and for
+    all, until the end of the Operator run, to the buffers and the peers.
+    """
+
+    def __init__(self, name, target, halos):
+        super().__init__(name, target, halos)
+
+        self._requests = []
+
+    def _C_memfree(self):
+        # The requests must be released before the buffers they refer to
+        if not MPI.Is_finalized():
+            for i in self._requests:
+                i.Free()
+        self._requests[:] = []
+
+        super()._C_memfree()
+
+    def _arg_defaults(self, allocator, alias=None):
+        super()._arg_defaults(allocator, alias)
+
+        function = alias or self.function
+        comm = function.grid.distributor.comm
+        for i, halo in enumerate(self.halos):
+            entry = self.value[i]
+
+            size = reduce(mul, entry.sizes[:len(halo.dim)], 1)
+            nbytes = size*np.dtype(function.dtype).itemsize
+            bufg = np.frombuffer((c_char*nbytes).from_address(entry.bufg),
+                                 dtype=function.dtype)
+            bufs = np.frombuffer((c_char*nbytes).from_address(entry.bufs),
+                                 dtype=function.dtype)
+
+            # Same tag as the non-persistent Isend/Irecv
+            rrecv = comm.Recv_init(bufs, source=entry.fromrank, tag=13)
+            rsend = comm.Send_init(bufg, dest=entry.torank, tag=13)
+            self._requests.extend([rrecv, rsend])
+
+            entry.rrecv = MPI._handleof(rrecv)
+            entry.rsend = MPI._handleof(rsend)
+
+        return {self.name: self.value}
+
+
+class MPIMsgAggregated(MPIMsg):
+
+    """
+    An MPIMsg packing the halos of several Functions, of the same type, into a
+    single buffer per peer. The sizes and offsets of all Functions are stored
+    one after the other, as well as the requests of all peers, so that they can
+    be waited for at once.
+    """
+
+    _C_field_ofss = 'ofss'
+    _C_field_ofsg = 'ofsg'
+    _C_field_from = 'fromrank'
+    _C_field_to = 'torank'
+    _C_field_displs = 'displs'
+    _C_field_count = 'count'
+    _C_field_reqs = 'reqs'
+
+    fields = MPIMsg.fields + [
+        (_C_field_ofss, POINTER(c_int)),
+        (_C_field_ofsg, POINTER(c_int)),
+        (_C_field_from, c_int),
+        (_C_field_to, c_int),
+        (_C_field_displs, POINTER(c_int)),
+        (_C_field_count, c_int),
+        (_C_field_reqs, POINTER(MPIMsg.c_mpirequest_p))
+    ]
+
+    __rargs__ = ('name', 'targets', 'halos')
+
+    def __init__(self, name, targets, halos):
+        self._targets = tuple(targets)
+
+        super().__init__(name, self._targets[0], halos)
+
+    @property
+    def targets(self):
+        return self._targets
+
+    def _arg_defaults(self, allocator, alias=None):
+        # Lazy initialization if `allocator` is necessary as the `allocator`
+        # type isn't really known until an Operator is constructed
+        self._allocator = allocator
+
+        targets = alias or self.targets
+        dtype = targets[0].dtype
+        neighborhood = targets[0].grid.distributor.neighborhood
+
+        # The requests of all peers, contiguous so that they can be waited at once
+        reqs = (self.c_mpirequest_p*(2*self.npeers))()
+
+        for i, halo in enumerate(self.halos):
+            entry = self.value[i]
+
+            # Buffer sizes, gather and scatter offsets of all Functions
+            sizes = []
+            ofsg = []
+            ofss = []
+            displs = []
+            size = 0
+            for f in targets:
+                shape = []
+                for dim, side in zip(*halo):
+                    try:
+                        shape.append(getattr(f._size_owned[dim], side.name))
+                        ofsg.append(getattr(f._offset_owned[dim], side.name))
+                        ofss.append(getattr(f._offset_halo[dim], side.flip().name))
+                    except AttributeError:
+                        assert side is CENTER
+                        shape.append(f._size_domain[dim])
+                        ofsg.append(f._offset_owned[dim].left)
+                        # Note `_offset_owned`, and not `_offset_halo`, as in
+                        # MPIMsgEnriched
+                        ofss.append(f._offset_owned[dim].left)
+                sizes.extend(shape)
+                displs.append(size)
+                size += reduce(mul, shape)
+            entry.sizes = (c_int*len(sizes))(*sizes)
+            entry.ofsg = (c_int*len(ofsg))(*ofsg)
+            entry.ofss = (c_int*len(ofss))(*ofss)
+            entry.displs = (c_int*len(displs))(*displs)
+            entry.count = size*dtype_len(dtype)
+
+            # Allocate the send/recv buffers
+            ctype = dtype_to_ctype(dtype)
+            entry.bufg, bufg_memfree_args = allocator._alloc_C_libcall(entry.count,
+                                                                       ctype)
+            entry.bufs, bufs_memfree_args = allocator._alloc_C_libcall(entry.count,
+                                                                       ctype)
+
+            # The `memfree_args` will be used to deallocate the buffer upon returning
+            # from C-land
+            self._memfree_args.extend([bufg_memfree_args, bufs_memfree_args])
+
+            # Peers
+            entry.torank = neighborhood[halo.side]
+            entry.fromrank = neighborhood[tuple(i.flip() for i in halo.side)]
+
+            entry.reqs = reqs
+
+        return {self.name: self.value}
+
+    def _arg_values(self, args=None, **kwargs):
+        return self._arg_defaults(
+            args.allocator,
+            alias=[kwargs.get(i.name, i) for i in self.targets]
+        )
+
+
+class MPIMsgDatatype(MPIMsg):
+
+    """
+    An MPIMsg without buffers, carrying instead, for each peer, the committed
+    MPI subarray datatypes describing the OWNED region to be sent and the HALO
+    region to be received. The datatypes are built upon first use and then
+    cached, for as long as the MPIMsg is alive, for each shape of the target.
+    """
+
+    _C_field_from = 'fromrank'
+    _C_field_to = 'torank'
+    _C_field_tsend = 'tsend'
+    _C_field_trecv = 'trecv'
+
+    if MPI._sizeof(MPI.Datatype) == sizeof(c_int):
+        c_mpidatatype_p = type('MPI_Datatype', (c_int,), {})
+    else:
+        c_mpidatatype_p = type('MPI_Datatype', (c_void_p,), {})
+
+    fields = MPIMsg.fields + [
+        (_C_field_from, c_int),
+        (_C_field_to, c_int),
+        (_C_field_tsend, c_mpidatatype_p),
+        (_C_field_trecv, c_mpidatatype_p)
+    ]
+
+    def __init__(self, name, target, halos):
+        super().__init__(name, target, halos)
+
+        self._datatypes = {}
+
+    def __del__(self):
+        if not MPI.Is_finalized():
+            for i in self._datatypes.values():
+                i.Free()
+        self._datatypes.clear()
+
+        super().__del__()
+
+    def _make_datatype(self, function, starts, subsizes):
+        shape = tuple(function.shape_allocated)
+        key = (shape, function.dtype, starts, subsizes)
+        try:
+            return self._datatypes[key]
+        except KeyError:
+            pass
+        mpitype = MPI._typedict[np.dtype(function.dtype).char]
+        datatype = mpitype.Create_subarray(shape, subsizes, starts).Commit()
+        return self._datatypes.setdefault(key, datatype)
+
+    def _make_datatypes(self, function, halo):
+        """
+        The datatypes describing the OWNED region to be sent, and the HALO region
+        to be received, for ``halo``, along with the size of such regions.
+        """
+        # The Dimensions along which no halo is exchanged, such as the time
+        # Dimension, are fixed by the caller, through the datatypes' base address
+        mapper = dict(zip(*halo))
+        subsizes = []
+        ofsg = []
+        ofss = []
+        for dim in function.dimensions:
+            try:
+                side = mapper[dim]
+            except KeyError:
+                subsizes.append(1)
+                ofsg.append(0)
+                ofss.append(0)
+                continue
+            try:
+                subsizes.append(getattr(function._size_owned[dim], side.name))
+                ofsg.append(getattr(function._offset_owned[dim], side.name))
+                ofss.append(getattr(function._offset_halo[dim], side.flip().name))
+            except AttributeError:
+                assert side is CENTER
+                subsizes.append(function._size_domain[dim])
+                ofsg.append(function._offset_owned[dim].left)
+                # Note `_offset_owned`, and not `_offset_halo`, as in
+                # MPIMsgEnriched
+                ofss.append(function._offset_owned[dim].left)
+
+        tsend = self._make_datatype(function, tuple(ofsg), tuple(subsizes))
+        trecv = self._make_datatype(function, tuple(ofss), tuple(subsizes))
+
+        return tsend, trecv, subsizes
+
+    def _arg_defaults(self, allocator, alias=None):
+        self._allocator = allocator
+
+        function = alias or self.target
+        neighborhood = function.grid.distributor.neighborhood
+        for i, halo in enumerate(self.halos):
+            entry = self.value[i]
+
+            tsend, trecv, subsizes = self._make_datatypes(function, halo)
+            entry.sizes = (c_int*len(subsizes))(*subsizes)
+            entry.tsend = MPI._handleof(tsend)
+            entry.trecv = MPI._handleof(trecv)
+
+            # Peers
+            entry.torank = neighborhood[halo.side]
+            entry.fromrank = neighborhood[tuple(i.flip() for i in halo.side)]
+
+        return {self.name: self.value}
+
+
+class MPIMsgNeighborhood(MPIMsgDatatype):
+
+    """
+    An MPIMsgDatatype laid out for the neighborhood collectives, that is a single
+    struct carrying, for each neighbour in the Distributor's graph communicator,
+    the count, displacement and datatype of the halo to be sent and received.
+    Neighbours with which no halo is exchanged get a zero count.
+    """
+
+    _C_field_scounts = 'scounts'
+    _C_field_sdispls = 'sdispls'
+    _C_field_stypes = 'stypes'
+    _C_field_rcounts = 'rcounts'
+    _C_field_rdispls = 'rdispls'
+    _C_field_rtypes = 'rtypes'
+    _C_field_req = 'req'
+
+    # MPI_Aint
+    c_mpiaint = c_ssize_t
+
+    fields = [
+        (_C_field_scounts, POINTER(c_int)),
+        (_C_field_sdispls, POINTER(c_mpiaint)),
+        (_C_field_stypes, POINTER(MPIMsgDatatype.c_mpidatatype_p)),
+        (_C_field_rcounts, POINTER(c_int)),
+        (_C_field_rdispls, POINTER(c_mpiaint)),
+        (_C_field_rtypes, POINTER(MPIMsgDatatype.c_mpidatatype_p)),
+        (_C_field_req, MPIMsg.c_mpirequest_p)
+    ]
+
+    def __value_setup__(self, dtype, value):
+        # A single struct, regardless of the number of peers
+        return (dtype._type_*1)()
+
+    def _arg_defaults(self, allocator, alias=None):
+        self._allocator = allocator
+
+        function = alias or self.target
+        sources, destinations = function.grid.distributor.neighborhood_sides
+
+        tsends = {}
+        trecvs = {}
+        for halo in self.halos:
+            tsend, trecv, _ = self._make_datatypes(function, halo)
+            tsends[halo.side] = tsend
+            trecvs[halo.side] = trecv
+
+        entry = self.value[0]
+        for items, tmap, counts, displs, types in [
+            (destinations, tsends, 'scounts', 'sdispls', 'stypes'),
+            (sources, trecvs, 'rcounts', 'rdispls', 'rtypes')
+        ]:
+            n = len(items)
+            setattr(entry, counts, (c_int*n)(*[int(i in tmap) for i in items]))
+            setattr(entry, displs, (self.c_mpiaint*n)())
+            # Any committed datatype will do for the zero-count neighbours
+            handles = [MPI._handleof(tmap.get(i, MPI.BYTE)) for i in items]
+            setattr(entry, types, (self.c_mpidatatype_p*n)(*handles))
+
+        return {self.name: self.value}
+
+
 class MPIRegion(CompositeObject):
 
     __rargs__ = ('prefix', 'key', 'arguments', 'owned')
@@ -1,2 +1,3 @@
 from .interpolators import *  # noqa
 from .solve import *  # noqa
+from .streaming import *  # noqa
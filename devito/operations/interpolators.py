@@ -168,10 +168,20 @@ class LinearInterpolator(GenericInterpolator):
         A = A.subs(reference_cell)
         return A.inv().T * p
 
+    @property
+    def _precomputed(self):
+        """
+        True if the grid indices and the interpolation weights are read from
+        arrays precomputed once per ``apply``, rather than recomputed at each
+        iteration (e.g., at each timestep) from the coordinates.
+        """
+        return getattr(self.sfunction, '_interp_gridpoints', None) is not None
+
     def _interpolation_indices(self, variables, offset=0, field_offset=0,
                                implicit_dims=None):
         """
-        Generate interpolation indices for the DiscreteFunctions in ``variables``.
+        Generate interpolation indices for the DiscreteFunctions in ``variables``,
+        along with the corresponding interpolation coefficients.
         """
         index_matrix, points = self.sfunction._index_matrix(offset)
 
@@ -192,6 +202,26 @@ class LinearInterpolator(GenericInterpolator):
             # Track Indexed substitutions
             idx_subs.append(mapper)
 
+        if self._precomputed:
+            # The reference grid points and the normalized positions within the
+            # grid cells are time-invariant, so they're simply loaded
+            p_dim = self.sfunction.indices[self.sfunction._sparse_position]
+            gridpoints = [self.sfunction._interp_gridpoints.indexify((p_dim, i))
+                          for i in range(self.grid.dim)]
+            bases = [self.sfunction._interp_bases.indexify((p_dim, i))
+                     for i in range(self.grid.dim)]
+
+            mapper = dict(zip(self.sfunction._coordinate_indices, gridpoints))
+            temps = [Eq(v, k.xreplace(mapper), implicit_dims=implicit_dims)
+                     for k, v in points.items()]
+
+            mapper = {p: b*d.spacing
+                      for p, b, d in zip(self.sfunction._point_symbols, bases,
+                                         self.grid.dimensions)}
+            coeffs = [c.xreplace(mapper) for c in self._interpolation_coeffs]
+
+            return idx_subs, temps, coeffs
+
         # Temporaries for the position
         temps = [Eq(v, k, implicit_dims=implicit_dims)
                  for k, v in self.sfunction._position_map.items()]
@@ -205,7 +235,7 @@ class LinearInterpolator(GenericInterpolator):
                       for p, c in zip(self.sfunction._point_symbols,
                                       self.sfunction._coordinate_bases(field_offset))])
 
-        return idx_subs, temps
+        return idx_subs, temps, list(self._interpolation_coeffs)
 
     def interpolate(self, expr, offset=0, increment=False, self_subs={},
                     implicit_dims=None):
@@ -241,13 +271,13 @@ class LinearInterpolator(GenericInterpolator):
             # TODO: handle each variable staggereing spearately
             field_offset = variables[0].origin
             # List of indirection indices for all adjacent grid points
-            idx_subs, temps = self._interpolation_indices(
+            idx_subs, temps, coeffs = self._interpolation_indices(
                 variables, offset, field_offset=field_offset, implicit_dims=implicit_dims
             )
 
             # Substitute coordinate base symbols into the interpolation coefficients
             args = [_expr.xreplace(v_sub) * b.xreplace(v_sub)
-                    for b, v_sub in zip(self._interpolation_coeffs, idx_subs)]
+                    for b, v_sub in zip(coeffs, idx_subs)]
 
             # Accumulate point-wise contributions into a temporary
             rhs = Symbol(name='sum', dtype=self.sfunction.dtype)
@@ -263,7 +293,41 @@ class LinearInterpolator(GenericInterpolator):
 
         return Interpolation(expr, offset, increment, self_subs, self, callback)
 
-    def inject(self, field, expr, offset=0, implicit_dims=None):
+    def _colored(self, eqns, idx_subs, implicit_dims):
+        """
+        Rewrite the injection equations ``eqns`` so that the sparse points are
+        visited one color at a time, through the permutation computed by the
+        SparseFunction at argument processing time.
+        """
+        p_dim = self.sfunction._sparse_dim
+        cdim, = self.sfunction._color_m.dimensions
+        kdim, = self.sfunction._color_perm.dimensions
+
+        # Each color is a contiguous range of positions in the permutation
+        rdims = tuple(cdim if d is p_dim else d for d in implicit_dims)
+        bounds = [Eq(kdim.symbolic_min, self.sfunction._color_m.indexed[cdim],
+                     implicit_dims=rdims),
+                  Eq(kdim.symbolic_max, self.sfunction._color_M.indexed[cdim],
+                     implicit_dims=rdims)]
+
+        # The sparse point at a given position in the permutation
+        kdims = flatten((cdim, kdim) if d is p_dim else d for d in implicit_dims)
+        point = Symbol(name='pp_%s' % self.sfunction.name, dtype=np.int32)
+        temps = [Eq(point, self.sfunction._color_perm.indexed[kdim],
+                    implicit_dims=kdims)]
+
+        # The indirection Dimensions now iterate over the colors
+        mapper = {p_dim: point}
+        for v in flatten(i.values() for i in idx_subs):
+            mapper[v] = ConditionalDimension(v.name, kdim, condition=v.condition,
+                                             indirect=True)
+
+        eqns = [e.func(e.lhs.xreplace(mapper), e.rhs.xreplace(mapper),
+                       implicit_dims=kdims) for e in eqns]
+
+        return bounds + temps + eqns
+
+    def inject(self, field, expr, offset=0, implicit_dims=None, mode='atomic'):
         """
         Generate equations injecting an arbitrary expression into a field.
 
@@ -279,7 +343,20 @@ class LinearInterpolator(GenericInterpolator):
             An ordered list of Dimensions that do not explicitly appear in the
             injection expression, but that should be honored when constructing
             the operator.
+        mode : str, optional
+            How concurrent increments are handled when the injection runs in
+            parallel. With ``'atomic'`` (default), all sparse points are injected
+            at once, through atomic updates. With ``'color'``, the sparse points
+            are grouped, at argument processing time, into colors of points with
+            disjoint supports; the colors are injected one after the other, each
+            in parallel and without atomics.
         """
+        if mode not in ('atomic', 'color'):
+            raise ValueError("Unsupported injection mode `%s`" % mode)
+        if mode == 'color' and getattr(self.sfunction, '_color_perm', None) is None:
+            raise ValueError("`%s` does not support colored injection"
+                             % self.sfunction.name)
+
         implicit_dims = as_tuple(implicit_dims) + self.sfunction.dimensions
 
         def callback():
@@ -295,14 +372,17 @@ class LinearInterpolator(GenericInterpolator):
             # Need to get origin of the field in case it is staggered
             field_offset = field.origin
             # List of indirection indices for all adjacent grid points
-            idx_subs, temps = self._interpolation_indices(
+            idx_subs, temps, coeffs = self._interpolation_indices(
                 variables, offset, field_offset=field_offset, implicit_dims=implicit_dims
             )
 
             # Substitute coordinate base symbols into the interpolation coefficients
             eqns = [Inc(field.xreplace(vsub), _expr.xreplace(vsub) * b,
                         implicit_dims=implicit_dims)
-                    for b, vsub in zip(self._interpolation_coeffs, idx_subs)]
+                    for b, vsub in zip(coeffs, idx_subs)]
+
+            if mode == 'color':
+                return self._colored(temps + eqns, idx_subs, implicit_dims)
 
             return temps + eqns
 
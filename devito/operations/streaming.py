@@ -0,0 +1,194 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from devito.tools import as_tuple
+
+__all__ = ['TraceWriter', 'stream_apply']
+
+
+class TraceWriter(object):
+
+    """
+    Drain the circular time buffer of a SparseTimeFunction into a raw binary
+    file, one chunk of timesteps at a time.
+
+    Parameters
+    ----------
+    function : SparseTimeFunction
+        The sparse function to be streamed. It must have been created with
+        ``save=Buffer(k)``, so that only ``k`` timesteps are kept in memory.
+    filename : str
+        Path of the output file. The file contains the raw values, of type
+        ``function.dtype``, without any header.
+    nt : int
+        Total number of timesteps in the output file.
+    order : str, optional
+        Layout of the output file. With ``'time'`` (default), the file stores
+        an ``(nt, npoint)`` array, that is all sparse points are contiguous for
+        a given timestep. With ``'trace'``, the file stores an ``(npoint, nt)``
+        array, that is each sparse point is a contiguous trace, as in SEG-Y.
+    time_m : int, optional
+        The timestep of the first sample in the output file. Defaults to 0.
+    background : bool, optional
+        If True, the chunks are written by a background thread, so that the
+        Operator may compute the next chunk while the previous one is flushed
+        to disk. Defaults to False.
+
+    Examples
+    --------
+    >>> from devito import (Grid, TimeFunction, SparseTimeFunction, Buffer,
+    ...                     Eq, Operator)
+    >>> grid = Grid(shape=(4, 4))
+    >>> u = TimeFunction(name='u', grid=grid)
+    >>> rec = SparseTimeFunction(name='rec', grid=grid, npoint=2, save=Buffer(4))
+    >>> op = Operator([Eq(u.forward, u + 1)] + rec.interpolate(u))
+
+    The Operator is run in chunks of 4 timesteps, each drained to disk
+
+    >>> import os, tempfile
+    >>> filename = os.path.join(tempfile.mkdtemp(), 'rec.bin')
+    >>> with TraceWriter(rec, filename, nt=10) as writer:
+    ...     summaries = stream_apply(op, writer, time_M=9)
+    >>> len(summaries)
+    3
+
+    Notes
+    -----
+    With MPI, all ranks write into the same file, each rank taking care of
+    its physically owned sparse points.
+    """
+
+    _orders = ('time', 'trace')
+
+    def __init__(self, function, filename, nt, order='time', time_m=0,
+                 background=False):
+        if not function._time_buffering:
+            raise ValueError("`%s` must be created with `save=Buffer(...)` to be "
+                             "streamed" % function.name)
+        if order not in self._orders:
+            raise ValueError("`order` must be one of %s, not `%s`"
+                             % (str(self._orders), order))
+
+        self.function = function
+        self.filename = filename
+        self.nt = nt
+        self.order = order
+        self.time_m = time_m
+
+        # The physically owned sparse points, as a slice into the global points
+        decomposition = function._distributor.decomposition[function._sparse_dim]
+        npoint = sum(len(i) for i in decomposition)
+        start = sum(len(i) for i in decomposition[:decomposition.local])
+        self._points = slice(start, start + function.npoint)
+
+        # All ranks map the same file, which is created by the root rank
+        shape = (nt, npoint) if order == 'time' else (npoint, nt)
+        distributor = function.grid.distributor
+        if distributor.myrank == 0:
+            mmap = np.memmap(filename, dtype=function.dtype, mode='w+', shape=shape)
+        if distributor.is_parallel:
+            distributor.comm.Barrier()
+        if distributor.myrank != 0:
+            mmap = np.memmap(filename, dtype=function.dtype, mode='r+', shape=shape)
+        self._mmap = mmap
+
+        self._executor = ThreadPoolExecutor(max_workers=1) if background else None
+        self._pending = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _write(self, start, chunk):
+        stop = start + chunk.shape[0]
+        if self.order == 'time':
+            self._mmap[start:stop, self._points] = chunk
+        else:
+            self._mmap[self._points, start:stop] = chunk.T
+
+    def _wait(self):
+        if self._pending is not None:
+            # Also re-raises any exception occurred in the background thread
+            self._pending.result()
+            self._pending = None
+
+    def drain(self, time_m, time_M):
+        """
+        Write the timesteps in ``[time_m, time_M]``, currently held in the
+        circular buffer, to the output file.
+        """
+        size = self.function._time_size
+        if time_M - time_m + 1 > size:
+            raise ValueError("Cannot drain %d timesteps out of a buffer of size %d"
+                             % (time_M - time_m + 1, size))
+        start = time_m - self.time_m
+        if start < 0 or time_M - self.time_m >= self.nt:
+            raise ValueError("Timesteps [%d, %d] out of the output file bounds"
+                             % (time_m, time_M))
+
+        # `np.take` returns a copy, so the buffer may be overwritten by the next
+        # chunk while this one is being written
+        data = self.function.data._local.view(np.ndarray)
+        chunk = np.take(data, np.arange(time_m, time_M + 1) % size,
+                        axis=self.function._time_position)
+
+        if self._executor is None:
+            self._write(start, chunk)
+        else:
+            # At most one chunk in flight, to bound the memory footprint
+            self._wait()
+            self._pending = self._executor.submit(self._write, start, chunk)
+
+    def close(self):
+        """Wait for any pending write and flush the output file."""
+        if self._mmap is None:
+            return
+        self._wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._mmap.flush()
+        self._mmap = None
+
+
+def stream_apply(op, writers, time_M, time_m=0, **kwargs):
+    """
+    Run an Operator in chunks of timesteps, draining the circular buffers of
+    one or more SparseTimeFunctions to disk at each chunk boundary.
+
+    Parameters
+    ----------
+    op : Operator
+        The Operator to be run.
+    writers : TraceWriter or list of TraceWriter
+        The SparseTimeFunctions to be streamed, along with their output files.
+    time_M : int
+        The last timestep to be computed.
+    time_m : int, optional
+        The first timestep to be computed. Defaults to 0.
+    **kwargs
+        Any other runtime argument for ``op.apply``.
+
+    Returns
+    -------
+    A list with the PerformanceSummary of each chunk.
+    """
+    writers = as_tuple(writers)
+    if not writers:
+        raise ValueError("Need at least one TraceWriter")
+
+    # The chunk size is bounded by the smallest circular buffer
+    size = min(w.function._time_size for w in writers)
+    time_dim = writers[0].function.time_dim.root
+
+    summaries = []
+    for t0 in range(time_m, time_M + 1, size):
+        t1 = min(t0 + size - 1, time_M)
+        kwargs.update({time_dim.min_name: t0, time_dim.max_name: t1})
+        summaries.append(op.apply(**kwargs))
+        for w in writers:
+            w.drain(t0, t1)
+
+    return summaries
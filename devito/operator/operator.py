@@ -617,7 +617,10 @@ class Operator(Callable):
         """Process runtime arguments upon returning from ``.apply()``."""
         for p in self.parameters:
             try:
-                p._arg_apply(args[p.name], args[p.coordinates.name], kwargs.get(p.name))
+                # The coordinates are only gathered back if written by the Operator
+                coords = args[p.coordinates.name] if p.coordinates in self.writes \
+                    else None
+                p._arg_apply(args[p.name], coords, kwargs.get(p.name))
             except AttributeError:
                 p._arg_apply(args[p.name], kwargs.get(p.name))
 
@@ -927,10 +930,19 @@ class Operator(Callable):
             name = "%s%s<%s>" % (k.name, rank, itershapes)
 
             perf("%s* %s ran in %.2f s %s" % (indent, name, fround(v.time), metrics))
-            for n, time in summary.subsections.get(k.name, {}).items():
+            subsections = summary.subsections.get(k.name, {})
+            for n, time in subsections.items():
                 perf("%s+ %s ran in %.2f s [%.2f%%]" %
                      (indent*2, n, time, fround(time/v.time*100)))
 
+            # With MPI progress threads, the time spent waiting for them is the
+            # part of the halo exchanges not hidden behind the CORE computation
+            core = sum(t for n, t in subsections.items() if n.startswith('computecore'))
+            wait = sum(t for n, t in subsections.items() if n.startswith('progresswait'))
+            if core + wait > 0:
+                perf("%s+ halo exchange overlap achieved: %.2f%%" %
+                     (indent*2, fround(core/(core + wait)*100)))
+
         # Emit performance mode and arguments
         perf_args = {}
         for i in self.input + self.dimensions:
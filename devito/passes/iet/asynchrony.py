@@ -27,8 +27,6 @@ def lower_async_callables(iet, track=None, root=None, sregistry=None):
     if not isinstance(iet, AsyncCallable):
         return iet, {}
 
-    n = len(track)
-
     # Determine the max number of threads that can run this `iet` in parallel
     locks = [i for i in iet.parameters if isinstance(i, Lock)]
     npthreads = min([i.size for i in locks], default=1)
@@ -48,13 +46,16 @@ def lower_async_callables(iet, track=None, root=None, sregistry=None):
     defines = FindSymbols('defines').visit(root.body)
     ncfields, cfields = split(fields, lambda i: i in defines)
 
+    # Unique across all `pthreadify` invocations, as there may be more than one
+    pname = sregistry.make_name(prefix='tsdata')
+
     # SharedData -- that is the data structure that will be used by the
     # main thread to pass information down to the child thread(s)
     sdata = track[iet.name].sdata = SharedData(name='sdata',
                                                npthreads=threads.size,
                                                cfields=cfields,
                                                ncfields=ncfields,
-                                               pname='tsdata%d' % n)
+                                               pname=pname)
     sbase = sdata.symbolic_base
 
     # Prepend the SharedData fields available upon thread activation
@@ -84,6 +85,9 @@ def lower_async_callables(iet, track=None, root=None, sregistry=None):
     for i in cfields:
         if i.is_AbstractFunction:
             unpacks.append(Dereference(i, sdata))
+        elif i.is_Object:
+            # E.g., an MPIMsg -- unlike Symbols, it won't be declared later on
+            unpacks.append(DummyExpr(i, FieldFromPointer(i.name, sbase), init=True))
         else:
             unpacks.append(DummyExpr(i, FieldFromPointer(i.name, sbase)))
 
@@ -1,7 +1,8 @@
 from devito.ir.iet import (BusyWait, FindNodes, FindSymbols, MapNodes, Section,
                            TimedList, Transformer)
 from devito.mpi.routines import (HaloUpdateCall, HaloWaitCall, MPICall, MPIList,
-                                 HaloUpdateList, HaloWaitList, RemainderCall)
+                                 HaloUpdateList, HaloWaitList, CoreComputeList,
+                                 ProgressWaitList, RemainderCall)
 from devito.passes.iet.engine import iet_pass
 from devito.types import Timer
 
@@ -38,6 +39,8 @@ def track_subsections(iet, **kwargs):
         RemainderCall: 'remainder',
         HaloUpdateList: 'haloupdate',
         HaloWaitList: 'halowait',
+        CoreComputeList: 'computecore',
+        ProgressWaitList: 'progresswait',
         BusyWait: 'busywait'
     }
 
@@ -1,14 +1,21 @@
 from collections import defaultdict
+from itertools import product
 
-from sympy import S
+from sympy import Integer, Mod, S
 
-from devito.ir.iet import (Call, Expression, HaloSpot, Iteration, FindNodes,
-                           MapNodes, Transformer, retrieve_iteration_tree)
-from devito.ir.support import PARALLEL, Scope
-from devito.mpi.halo_scheme import HaloScheme
+from devito.data import LEFT, CENTER, RIGHT
+from devito.exceptions import InvalidOperator
+from devito.ir.equations import DummyEq
+from devito.ir.iet import (Call, Conditional, Expression, HaloSpot, Iteration, List,
+                           FindNodes, MapNodes, Transformer, retrieve_iteration_tree)
+from devito.ir.support import PARALLEL, Backward, Forward, Scope
+from devito.mpi.halo_scheme import Halo, HaloScheme, HaloSchemeEntry
 from devito.mpi.routines import HaloExchangeBuilder
+from devito.passes.iet.asynchrony import pthreadify
 from devito.passes.iet.engine import iet_pass
-from devito.tools import generator
+from devito.symbolics import CondEq, FieldFromPointer, InlineIf, Macro, uxreplace
+from devito.tools import filter_ordered, frozendict, generator, is_integer
+from devito.types import Grid, Symbol
 
 __all__ = ['mpiize']
 
@@ -270,6 +277,169 @@ def _mark_overlappable(iet):
     return iet
 
 
+@iet_pass
+def avoid_comms(iet, period=1, **kwargs):
+    """
+    Communication-avoiding time stepping: trade redundant computation for fewer
+    halo exchanges. The halos of the Functions read within a time loop are
+    exchanged only once every ``period`` time steps. In between, the computation
+    is redundantly carried out over a region extending into the halo, which
+    shrinks, step after step, by the stencil radius, thus vanishing on the last
+    step of each period.
+
+    Notes
+    -----
+    This requires the Functions to have halos at least ``period - 1`` stencil
+    radii deeper than the stencil radius itself. Further, all of the time loop
+    computation must be enclosed by a single HaloSpot -- thus sparse operations
+    and intra-step halo dependences are not supported.
+    """
+    mapper = {}
+    seen = set()
+    for i in FindNodes(Iteration).visit(iet):
+        if not i.dim.is_Time or i in seen:
+            continue
+        seen.update(FindNodes(Iteration).visit(i))
+
+        halo_spots = FindNodes(HaloSpot).visit(i)
+        if halo_spots:
+            mapper[i] = _avoid_comms(i, halo_spots, period)
+
+    iet = Transformer(mapper, nested=True).visit(iet)
+
+    return iet, {}
+
+
+def _avoid_comms(iteration, halo_spots, period):
+    exprs = FindNodes(Expression).visit(iteration)
+    if len(halo_spots) > 1 or \
+       len(exprs) != len(FindNodes(Expression).visit(halo_spots[0])):
+        raise InvalidOperator("Communication-avoiding halo exchange requires "
+                              "a single HaloSpot enclosing the whole time loop "
+                              "computation (no sparse operations, no intra-step "
+                              "halo dependences)")
+    hs = halo_spots.pop()
+
+    scope = Scope([e.expr for e in exprs])
+
+    if any(f.is_SparseFunction for f in scope.functions):
+        raise InvalidOperator("Communication-avoiding halo exchange is "
+                              "incompatible with sparse operations")
+
+    functions = [f for f in scope.reads
+                 if f.is_DiscreteFunction and isinstance(f.grid, Grid) and
+                 f._dist_dimensions]
+    if not functions:
+        return iteration
+    distributor = functions[0].grid.distributor
+
+    # The stencil radius of each Function, and the overall one, that is how
+    # much the redundant computation must shrink at each step
+    radius = {}
+    for f in functions:
+        offsets = [0]
+        for a in scope.reads[f]:
+            for d in f._dist_dimensions:
+                # Note: the indices are shifted by the halo and padding sizes
+                ai = a.aindices[d]
+                offset = a[d] - (ai or 0) - f._size_nodomain[d].left
+                if ai is None or not is_integer(offset):
+                    raise InvalidOperator("Communication-avoiding halo exchange "
+                                          "requires affine accesses, got `%s`" % a)
+                offsets.append(abs(int(offset)))
+        radius[f] = max(offsets)
+    r = max(radius.values())
+
+    # Sanity checks
+    for f in scope.writes:
+        if f.is_Array and any(d.root in distributor.dimensions for d in f.dimensions):
+            raise InvalidOperator("Communication-avoiding halo exchange is "
+                                  "incompatible with Array temporaries such as "
+                                  "`%s`" % f)
+    updated = [f for f in functions if f in scope.writes]
+    invariant = [f for f in functions if f not in scope.writes]
+    for f in updated:
+        if not (f.is_TimeFunction and f._time_buffering) or \
+           len(f.dimensions) != len(f._dist_dimensions) + 1:
+            raise InvalidOperator("Communication-avoiding halo exchange requires "
+                                  "the updated Functions to be time-buffered "
+                                  "TimeFunctions, got `%s`" % f)
+    for f in invariant:
+        if len(f.dimensions) != len(f._dist_dimensions):
+            raise InvalidOperator("Communication-avoiding halo exchange requires "
+                                  "the read-only Functions to be time-invariant, "
+                                  "got `%s`" % f)
+    written = [f for f in scope.writes
+               if f.is_DiscreteFunction and isinstance(f.grid, Grid)]
+    for f in filter_ordered(functions + written):
+        depth = (period - 1)*r + radius.get(f, 0)
+        if any(min(f._size_halo[d]) < depth for d in f._dist_dimensions):
+            raise InvalidOperator("Communication-avoiding halo exchange every %d "
+                                  "time steps requires `%s` to have a halo of at "
+                                  "least %d points" % (period, f, depth))
+
+    # The time step within the current period
+    dim = iteration.dim
+    if iteration.direction is Backward:
+        step = Mod(dim.symbolic_max - dim, period)
+    else:
+        step = Mod(dim - dim.symbolic_min, period)
+
+    # At the beginning of each period, exchange the whole halo of all time
+    # buffers of the updated Functions
+    exchanges = []
+    for s in range(max(f.time_size for f in updated)):
+        fmapper = {f: _make_full_halo(f, {f.dimensions[f._time_position]: Integer(s)})
+                   for f in updated if s < f.time_size}
+        exchanges.append(HaloSpot(HaloScheme.build(fmapper, {})))
+    exchanges = Conditional(CondEq(step, 0), List(body=exchanges))
+
+    # The redundant computation extends into the halo, except along the
+    # physical domain boundaries
+    nb = distributor._obj_neighborhood
+    width = Symbol(name='ca_width')
+    body = [exchanges, Expression(DummyEq(width, r*(period - 1 - step)))]
+    bounds = {}
+    for d in distributor.dimensions:
+        for side, bound in [(LEFT, d.symbolic_min), (RIGHT, d.symbolic_max)]:
+            name = ''.join(side.name[0] if i is d else 'c'
+                           for i in distributor.dimensions)
+            cond = CondEq(FieldFromPointer(name, nb), Macro('MPI_PROC_NULL'))
+            ext = Symbol(name='%s_ca_%s' % (d.name, side.name[0]))
+            body.append(Expression(DummyEq(ext, InlineIf(cond, Integer(0), width))))
+            bounds[bound] = bound - ext if side is LEFT else bound + ext
+    imapper = {i: i._rebuild(limits=[uxreplace(j, bounds) for j in i.limits])
+               for i in FindNodes(Iteration).visit(hs.body)}
+    body.append(Transformer(imapper, nested=True).visit(hs.body))
+
+    iteration = Transformer({hs: List(body=body)}).visit(iteration)
+
+    # The time-invariant Functions get exchanged once, before the time loop
+    if invariant:
+        fmapper = {f: _make_full_halo(f, {}) for f in invariant}
+        iteration = HaloSpot(HaloScheme.build(fmapper, {}), iteration)
+
+    return iteration
+
+
+def _make_full_halo(f, loc_indices):
+    """
+    A HaloSchemeEntry describing the exchange of the whole halo of ``f``,
+    diagonal halos included.
+    """
+    dims = f._dist_dimensions
+
+    halos = [Halo(d, s) for d in dims for s in (LEFT, RIGHT)]
+    combs = list(product([LEFT, CENTER, RIGHT], repeat=len(dims)))
+    combs.remove((CENTER,)*len(dims))
+    halos.extend(Halo(dims, c) for c in combs)
+
+    loc_dirs = {d: Forward for d in loc_indices}
+
+    return HaloSchemeEntry(frozendict(loc_indices), frozendict(loc_dirs),
+                           frozenset(halos), frozenset(dims))
+
+
 @iet_pass
 def make_mpi(iet, mpimode=None, **kwargs):
     """
@@ -317,12 +487,22 @@ def mpiize(graph, **kwargs):
 
     The latter resorts to creating MPI Callables and replacing HaloSpots with Calls
     to MPI Callables.
+
+    With the `mpi-ca` option, the halo exchanges within the time loop are
+    further made communication-avoiding; see `avoid_comms`.
     """
     options = kwargs['options']
 
     if options['optcomms']:
         optimize_halospots(graph)
 
+    if options['mpi-ca'] > 1:
+        avoid_comms(graph, period=options['mpi-ca'])
+
     mpimode = options['mpi']
     if mpimode:
         make_mpi(graph, mpimode=mpimode, **kwargs)
+
+    if mpimode == 'progress':
+        # Lower the helper threads advancing the halo exchanges
+        pthreadify(graph, sregistry=kwargs['sregistry'])
@@ -232,6 +232,10 @@ class CodePrinter(C99CodePrinter):
     _print_Keyword = _print_Fallback
     _print_Basic = _print_Fallback
 
+    # Otherwise SymPy would pick its own `_print_Object`, which is meant for
+    # `sympy.categories.Object`, thus emitting `Object("name")`
+    _print_Object = _print_Fallback
+
 
 # Always parenthesize IntDiv and InlineIf within expressions
 PRECEDENCE_VALUES['IntDiv'] = 1
@@ -3,9 +3,11 @@ from collections.abc import Iterable, Mapping
 from functools import reduce
 from operator import attrgetter
 
+import numpy as np
+
 from devito.tools.utils import flatten
 
-__all__ = ['toposort']
+__all__ = ['toposort', 'zorder']
 
 
 def build_dependence_lists(elements):
@@ -73,3 +75,37 @@ def toposort(data):
     if len(processed) != len(set(flatten(data) + flatten(data.values()))):
         raise ValueError("A cyclic dependency exists amongst %r" % data)
     return processed
+
+
+def zorder(points):
+    """
+    The permutation sorting a set of points along a Z-order (Morton) curve,
+    that is a space-filling curve preserving locality.
+
+    Parameters
+    ----------
+    points : array of ints
+        The points, of shape ``(npoint, ndim)``.
+
+    Examples
+    --------
+    >>> zorder(np.array([[1, 1], [0, 0], [2, 0], [0, 1]]))
+    array([1, 3, 0, 2])
+    """
+    points = np.asarray(points, dtype=np.int64)
+    npoint, ndim = points.shape
+    if npoint == 0:
+        return np.zeros(0, dtype=np.int64)
+    points = points - points.min(axis=0)
+
+    # Interleave the bits of the coordinates, the first Dimension being the most
+    # significant one, so that the innermost Dimension varies fastest
+    nbits = int(points.max()).bit_length()
+    if nbits * ndim > 63:
+        raise ValueError("Points too far apart to be sorted along a Z-order curve")
+    keys = np.zeros(npoint, dtype=np.int64)
+    for b in range(nbits):
+        for d in range(ndim):
+            keys |= ((points[:, d] >> b) & 1) << (b*ndim + ndim - 1 - d)
+
+    return np.argsort(keys, kind='stable')
@@ -1,5 +1,6 @@
 import gc
 import weakref
+from collections import deque
 
 import sympy
 from sympy.core import cache
@@ -15,11 +16,15 @@ _SymbolCache = {}
 
 class AugmentedWeakRef(weakref.ref):
 
-    def __new__(cls, obj, meta):
-        obj = super().__new__(cls, obj)
+    def __new__(cls, obj, meta, keys=(), callback=None):
+        obj = super().__new__(cls, obj, callback)
         obj.nbytes = meta.get('nbytes', 0)
+        obj.keys = keys
         return obj
 
+    def __init__(self, obj, meta, keys=(), callback=None):
+        super().__init__(obj, callback)
+
 
 class Uncached(object):
 
@@ -78,10 +83,13 @@ class Cached(object):
                 # Cleanup _SymbolCache (though practically unnecessary)
                 # does not fail if it's already gone
                 _SymbolCache.pop(key, None)
+                CacheManager.misses += 1
                 return None
             else:
+                CacheManager.hits += 1
                 return obj
         else:
+            CacheManager.misses += 1
             return None
 
     def __init__(self, key, *aliases):
@@ -98,10 +106,13 @@ class Cached(object):
         # Precompute hash. This uniquely depends on the cache key
         self._cache_key_hash = hash(key)
 
-        # Add ourselves to the symbol cache
-        awr = AugmentedWeakRef(self, self._cache_meta())
-        for i in (key,) + aliases:
+        # Add ourselves to the symbol cache. Once `self` becomes unreachable,
+        # the weak reference is queued for eviction by the CacheManager
+        keys = (key,) + aliases
+        awr = AugmentedWeakRef(self, self._cache_meta(), keys, CacheManager._enqueue)
+        for i in keys:
             _SymbolCache[i] = awr
+        CacheManager._track(awr)
 
     def __init_cached__(self, cached_obj):
         """
@@ -143,26 +154,87 @@ class CacheManager(object):
     """
     Drop unreferenced objects from the SymPy and Devito caches. The associated
     data is lost (and thus memory is freed).
+
+    The entries of the Devito symbol cache are evicted incrementally: as soon as
+    a cached object dies, its weak reference is queued, and the queue is drained
+    by the next call to ``clear``. The bytes held by the live cached objects, as
+    per their ``_cache_meta``, are tracked too, so that the expensive operations
+    -- garbage collection and wiping out the SymPy caches -- are only performed
+    when a memory or size budget is exceeded, or upon ``clear(force=True)``.
     """
 
     gc_ths = 3*10**8
     """
-    The `clear` function will trigger garbage collection if at least one weak
-    reference points to an unreachable object whose size in bytes is greated
-    than the `gc_ths` value. Garbage collection is an expensive operation, so
-    we do it judiciously.
+    The `clear` function will trigger garbage collection if the objects added
+    to the symbol cache since the last garbage collection amount to more than
+    `gc_ths` bytes. Garbage collection is an expensive operation, so we do it
+    judiciously.
     """
 
     force_ths = 100
     """
-    After `force_ths` *consecutive* calls ``clear(force=False)``, the flag
-    ``force`` is ignored, and thus ``clear(force=True)`` is executed.
-    ``
+    After `force_ths` *consecutive* calls ``clear(force=False)`` that have not
+    triggered garbage collection, garbage collection is triggered anyway, as
+    unreachable objects within reference cycles are only evicted after that.
     """
     ncalls_w_force_false = 0
 
+    sympy_ths = 10**5
+    """
+    The `clear` function will wipe out the SymPy caches if the total number of
+    entries therein exceeds `sympy_ths`, or whenever garbage collection is
+    triggered, since SymPy may hold references to otherwise unreachable objects.
+    """
+
+    # Counters, see `stats`
+    hits = 0
+    misses = 0
+    evictions = 0
+    nbytes = 0
+    nbytes_since_gc = 0
+    ncollections = 0
+    nsympy_clears = 0
+
+    _dead = deque()
+    """The weak references to dead objects, waiting to be evicted."""
+
     @classmethod
-    def clear(cls, force=True):
+    def _track(cls, awr):
+        cls.nbytes += awr.nbytes
+        cls.nbytes_since_gc += awr.nbytes
+
+    @classmethod
+    def _enqueue(cls, awr):
+        # Weakref callback. This may be executed at any time, even by the garbage
+        # collector, so we keep it minimal; `deque.append` is thread safe
+        cls._dead.append(awr)
+
+    @classmethod
+    def _evict(cls, pop=True):
+        """Drop the symbol cache entries of the dead objects, if any."""
+        while True:
+            try:
+                awr = cls._dead.popleft()
+            except IndexError:
+                break
+            for key in awr.keys if pop else ():
+                # The key may have been remapped to a new object in the meanwhile
+                if _SymbolCache.get(key) is awr:
+                    _SymbolCache.pop(key, None)
+            cls.nbytes -= awr.nbytes
+            cls.evictions += 1
+
+    @classmethod
+    def _sympy_cache_size(cls):
+        size = sum(i.cache_info().currsize for i in cache.CACHE
+                   if hasattr(i, 'cache_info'))
+        size += len(sympy.polys.rings._ring_cache)
+        size += len(sympy.polys.fields._field_cache)
+        size += len(sympy.polys.domains.modularinteger._modular_integer_cache)
+        return size
+
+    @classmethod
+    def _clear_sympy_cache(cls):
         # Wipe out the "true" SymPy cache
         cache.clear_cache()
 
@@ -172,25 +244,71 @@ class CacheManager(object):
         sympy.polys.fields._field_cache.clear()
         sympy.polys.domains.modularinteger._modular_integer_cache.clear()
 
-        # Take a copy of the dictionary so we can safely iterate over it
-        # even if another thread is making changes
-        cache_copied = safe_dict_copy(_SymbolCache)
+        cls.nsympy_clears += 1
 
-        # Maybe trigger garbage collection
+    @classmethod
+    def _gc_collect(cls):
+        gc.collect()
+        cls.ncalls_w_force_false = 0
+        cls.nbytes_since_gc = 0
+        cls.ncollections += 1
+
+    @classmethod
+    def stats(cls):
+        """
+        Return a dict with the cache counters, that is:
+
+            * hits, misses: the outcome of the symbol cache lookups;
+            * evictions: the number of dead objects dropped from the symbol cache;
+            * nbytes: the bytes held by the live objects in the symbol cache;
+            * nentries: the number of entries in the symbol cache;
+            * ncollections: the number of garbage collections triggered;
+            * nsympy_clears: the number of times the SymPy caches were wiped out.
+        """
+        cls._evict()
+        return {'hits': cls.hits,
+                'misses': cls.misses,
+                'evictions': cls.evictions,
+                'nbytes': cls.nbytes,
+                'nentries': len(_SymbolCache),
+                'ncollections': cls.ncollections,
+                'nsympy_clears': cls.nsympy_clears}
+
+    @classmethod
+    def reset_stats(cls):
+        """Reset the hit, miss, eviction, and collection counters."""
+        cls.hits = cls.misses = cls.evictions = 0
+        cls.ncollections = cls.nsympy_clears = 0
+
+    @classmethod
+    def clear(cls, force=True):
         if force is False:
-            if cls.ncalls_w_force_false + 1 == cls.force_ths:
-                # Case 1: too long since we called gc.collect, let's do it now
-                gc.collect()
-                cls.ncalls_w_force_false = 0
-            elif any(i.nbytes > cls.gc_ths for i in cache_copied.values()):
-                # Case 2: we got big objects in cache, we try to reclaim memory
-                gc.collect()
-                cls.ncalls_w_force_false = 0
+            if cls.nbytes_since_gc > cls.gc_ths:
+                # Case 1: we got big objects in cache, we try to reclaim memory.
+                # Unreachable objects may still be referenced by SymPy
+                cls._clear_sympy_cache()
+                cls._gc_collect()
+            elif cls.ncalls_w_force_false + 1 == cls.force_ths:
+                # Case 2: too long since we called gc.collect, let's do it now
+                cls._gc_collect()
             else:
                 # We won't call gc.collect() this time
                 cls.ncalls_w_force_false += 1
-        else:
-            gc.collect()
+
+            if cls._sympy_cache_size() > cls.sympy_ths:
+                cls._clear_sympy_cache()
+
+            # Only visit the entries of the objects that died in the meanwhile
+            cls._evict()
+
+            return
+
+        cls._clear_sympy_cache()
+        cls._gc_collect()
+
+        # Take a copy of the dictionary so we can safely iterate over it
+        # even if another thread is making changes
+        cache_copied = safe_dict_copy(_SymbolCache)
 
         for key in cache_copied:
             obj = _SymbolCache.get(key)
@@ -201,3 +319,6 @@ class CacheManager(object):
                 # pop(x, None) does not error if already gone
                 # (key could be removed in another thread since get() above)
                 _SymbolCache.pop(key, None)
+
+        # The entries have been dropped already, just update the counters
+        cls._evict(pop=False)
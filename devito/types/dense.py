@@ -12,6 +12,7 @@ from cached_property import cached_property
 from devito.builtins import assign
 from devito.data import (DOMAIN, OWNED, HALO, NOPAD, FULL, LEFT, CENTER, RIGHT,
                          Data, default_allocator)
+from devito.data.allocators import ExternalAllocator
 from devito.exceptions import InvalidArgument
 from devito.logger import debug, warning
 from devito.mpi import MPI
@@ -463,6 +464,158 @@ class DiscreteFunction(AbstractFunction, ArgProvider, Differentiable):
         """
         return self.data._gather(start=start, stop=stop, step=step, rank=rank)
 
+    def data_save(self, path, direct=False):
+        """
+        Write the distributed `Data` attached to a `Function` to disk, for
+        later restart via ``data_load``.
+
+        Each rank writes its own portion of the domain data into a separate
+        binary shard, while a small metadata file describes the decomposition.
+
+        Parameters
+        ----------
+        path : str
+            The directory in which the shards and the metadata are written.
+        direct : bool, optional
+            If True, open the shards with ``O_DIRECT``, thus bypassing the
+            OS page cache. Defaults to False.
+
+        Notes
+        -----
+        Alias to ``self.data._save``.
+        """
+        self.data_ro_domain._save(path, direct=direct)
+
+    def data_load(self, path):
+        """
+        Read the `Data` attached to a `Function` from the shards written by
+        ``data_save``.
+
+        The data may be loaded onto a different number of ranks, or a
+        different decomposition, than those used to write it; in that case,
+        each rank reads the overlapping portions of the relevant shards.
+
+        Parameters
+        ----------
+        path : str
+            The directory in which the shards and the metadata were written.
+
+        Notes
+        -----
+        Alias to ``self.data._load``.
+        """
+        self.data._load(path)
+
+    @classmethod
+    def from_external(cls, array, writeable=False, **kwargs):
+        """
+        Create a new object adopting, without any copy, an external buffer.
+
+        Parameters
+        ----------
+        array : array-like
+            Any C-contiguous object exposing the buffer or the DLPack interface,
+            such as a numpy.ndarray or a PyTorch CPU tensor. Its shape and dtype
+            must match ``shape_allocated`` and ``dtype`` of the new object.
+        writeable : bool, optional
+            Adopt a buffer imported as read-only through DLPack anyway, that is
+            take responsibility for the producer's memory being writeable. See
+            ``ExternalAllocator``. Defaults to False.
+        **kwargs
+            The arguments to construct the new object, e.g. ``name`` and ``grid``.
+
+        Notes
+        -----
+        Unless an ``initializer`` is supplied, the external data is preserved.
+        A reference to ``array`` is retained for as long as the data is alive.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from devito import Grid, Function
+        >>> grid = Grid(shape=(2, 2))
+        >>> array = np.ones((4, 4), dtype=np.float32)
+        >>> f = Function.from_external(array, name='f', grid=grid)
+        >>> f.data[0, 0] = 2
+        >>> array[1, 1]
+        2.0
+        """
+        kwargs.setdefault('initializer', lambda x: None)
+        kwargs.setdefault('first_touch', False)
+        return cls(allocator=ExternalAllocator(array, writeable=writeable), **kwargs)
+
+    _data_regions = ('domain', 'inhalo', 'outhalo', 'allocated')
+
+    @property
+    def data_regions(self):
+        """
+        The layout of the data regions within the allocated buffer.
+
+        Returns
+        -------
+        A dict mapping each of ``'domain'``, ``'inhalo'``, ``'outhalo'`` and
+        ``'allocated'`` to a tuple with, for each Dimension, the offset and the
+        size of the region within the allocated buffer, as a RegionMeta.
+        In an MPI context, these refer to the *local* buffer.
+        """
+        masks = {'domain': self._mask_domain,
+                 'inhalo': self._mask_inhalo,
+                 'outhalo': self._mask_outhalo,
+                 'allocated': (slice(None),)*self.ndim}
+        retval = {}
+        for region, mask in masks.items():
+            indices = [i.indices(n) for i, n in zip(mask, self.shape_allocated)]
+            retval[region] = tuple(RegionMeta(start, stop - start)
+                                   for start, stop, _ in indices)
+        return retval
+
+    def to_dlpack(self, region='domain'):
+        """
+        Export, without any copy, a data region through the DLPack interface.
+
+        Parameters
+        ----------
+        region : str, optional
+            The data region to be exported, one of ``'domain'`` (default),
+            ``'inhalo'``, ``'outhalo'`` and ``'allocated'``. Unless the region
+            is ``'allocated'``, the exported tensor is strided.
+
+        Returns
+        -------
+        A DLPack capsule, holding a reference to the data, which is therefore
+        kept alive for as long as the capsule (or its consumer) is.
+
+        Notes
+        -----
+        The data may be modified through the exported tensor, so, whatever the
+        region, the halo is flagged as dirty upon export. Modifications made
+        after an Operator has run, however, go unnoticed; in that case, the
+        data should be exported again. In an MPI context, only the *local* data
+        is exported.
+        """
+        if region == 'domain':
+            data = np.asarray(self.data_domain)
+        elif region == 'outhalo':
+            data = np.asarray(self.data_with_halo)
+        elif region == 'inhalo':
+            data = self._data_with_inhalo
+        elif region == 'allocated':
+            data = self._data_allocated
+        else:
+            raise ValueError("`region` must be one of %s, not `%s`"
+                             % (str(self._data_regions), region))
+        self._is_halo_dirty = True
+        return data.__dlpack__()
+
+    def __dlpack__(self, stream=None):
+        if stream is not None:
+            raise BufferError("`stream` must be None for data on the host")
+        return self.to_dlpack()
+
+    def __dlpack_device__(self):
+        # The data is always on the host (kDLCPU = 1)
+        return (1, 0)
+
     @property
     @_allocate_memory
     def data_domain(self):
@@ -996,7 +1149,7 @@ class Function(DiscreteFunction):
 
     def _cache_meta(self):
         # Attach additional metadata to self's cache entry
-        return {'nbytes': self.size}
+        return {'nbytes': self.nbytes}
 
     def __init_finalize__(self, *args, **kwargs):
         super(Function, self).__init_finalize__(*args, **kwargs)
@@ -1476,7 +1629,7 @@ class SubFunction(Function):
             raise RuntimeError("`%s` is a SubFunction, so it can't be assigned "
                                "a value dynamically" % self.name)
         else:
-            return self._parent._arg_defaults(alias=self._parent).reduce_all()
+            return self._parent._arg_values(**kwargs)
 
     @property
     def parent(self):
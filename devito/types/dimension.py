@@ -106,6 +106,7 @@ class Dimension(ArgProvider):
     is_Modulo = False
     is_Incr = False
     is_Block = False
+    is_Color = False
 
     # Prioritize self's __add__ and __sub__ to construct AffineIndexAccessFunction
     _op_priority = sympy.Expr._op_priority + 1.
@@ -1318,6 +1319,18 @@ class DynamicDimension(DynamicDimensionMixin, BasicDimension):
     pass
 
 
+class ColorDimension(DynamicDimension):
+
+    """
+    A DynamicDimension iterating over a color, that is a set of sparse points
+    whose supports are pairwise disjoint. Increments performed through indirection
+    arrays indexed by a ColorDimension never conflict, hence its iterations may
+    run in parallel without atomics.
+    """
+
+    is_Color = True
+
+
 class DynamicSubDimension(DynamicDimensionMixin, SubDimension):
 
     @classmethod
@@ -88,6 +88,14 @@ class Grid(CartesianDiscretization, ArgProvider):
     comm : MPI communicator, optional
         The set of processes over which the grid is distributed. Only relevant in
         case of MPI execution.
+    topology : tuple of ints or str, optional
+        The number of processes along each dimension, or ``'auto'`` to select
+        the one minimizing the halo exchange cost. Only relevant in case of MPI
+        execution.
+    partitions : tuple of (tuple of ints or None), optional
+        The boundaries between the chunks into which each dimension is
+        decomposed; defaults to near-equal chunks. Only relevant in case of MPI
+        execution. See ``Distributor.__doc__`` and ``compute_partitions``.
 
     Examples
     --------
@@ -139,7 +147,7 @@ class Grid(CartesianDiscretization, ArgProvider):
 
     def __init__(self, shape, extent=None, origin=None, dimensions=None,
                  time_dimension=None, dtype=np.float32, subdomains=None,
-                 comm=None, topology=None):
+                 comm=None, topology=None, partitions=None):
         shape = as_tuple(shape)
 
         # Create or pull the SpaceDimensions
@@ -165,7 +173,8 @@ class Grid(CartesianDiscretization, ArgProvider):
 
         # Create a Distributor, used internally to implement domain decomposition
         # by all Functions defined on this Grid
-        self._distributor = Distributor(shape, dimensions, comm, topology)
+        self._distributor = Distributor(shape, dimensions, comm, topology,
+                                        partitions)
 
         # The physical extent
         self._extent = as_tuple(extent or tuple(1. for _ in self.shape))
@@ -1,4 +1,4 @@
-from collections import OrderedDict
+from collections import OrderedDict, namedtuple
 from itertools import product
 
 import sympy
@@ -12,19 +12,41 @@ from devito.operations import LinearInterpolator, PrecomputedInterpolator
 from devito.symbolics import (INT, cast_mapper, indexify,
                               retrieve_function_carriers)
 from devito.tools import (ReducerMap, as_tuple, flatten, prod, filter_ordered,
-                          memoized_meth, is_integer)
+                          memoized_meth, is_integer, zorder)
 from devito.types.dense import DiscreteFunction, Function, SubFunction
 from devito.types.dimension import (Dimension, ConditionalDimension, DefaultDimension,
-                                    DynamicDimension)
+                                    DynamicDimension, ColorDimension)
 from devito.types.basic import Symbol
 from devito.types.equation import Eq, Inc
-from devito.types.utils import IgnoreDimSort
+from devito.types.utils import Buffer, IgnoreDimSort
 
 
 __all__ = ['SparseFunction', 'SparseTimeFunction', 'PrecomputedSparseFunction',
            'PrecomputedSparseTimeFunction', 'MatrixSparseTimeFunction']
 
 
+DistPlan = namedtuple('DistPlan', 'version value mask counts coords perm')
+
+MatrixDistPlan = namedtuple('MatrixDistPlan', 'version value mrow mcol gp local_gp '
+                            'which active_mrow active_mcol par_dim_to_nnz')
+
+
+class DerivedSubFunction(SubFunction):
+
+    """
+    A SubFunction whose values are derived by its parent from other data, such
+    as the sparse point coordinates. They are only computed if an Operator
+    actually uses the DerivedSubFunction.
+    """
+
+    def _arg_values(self, **kwargs):
+        if self.name in kwargs:
+            raise RuntimeError("`%s` is a SubFunction, so it can't be assigned "
+                               "a value dynamically" % self.name)
+        else:
+            return self._parent._arg_derived(self, **kwargs)
+
+
 class AbstractSparseFunction(DiscreteFunction):
 
     """
@@ -177,12 +199,12 @@ class AbstractSparseFunction(DiscreteFunction):
         ret += tuple(i for i, d in enumerate(self.indices) if d is not self._sparse_dim)
         return ret
 
-    def _dist_alltoall(self, dmap=None):
+    def _dist_alltoall(self, dmap=None, counts=None):
         """
         The metadata necessary to perform an ``MPI_Alltoallv`` distributing the
         sparse data values across the MPI ranks needing them.
         """
-        ssparse, rsparse = self._dist_count(dmap=dmap)
+        ssparse, rsparse = counts or self._dist_count(dmap=dmap)
 
         # Per-rank shape of send/recv data
         sshape = []
@@ -218,7 +240,7 @@ class AbstractSparseFunction(DiscreteFunction):
 
         return sshape, scount, sdisp, rshape, rcount, rdisp
 
-    def _dist_subfunc_alltoall(self, dmap=None):
+    def _dist_subfunc_alltoall(self, dmap=None, counts=None):
         """
         The metadata necessary to perform an ``MPI_Alltoallv`` distributing
         self's SubFunction values across the MPI ranks needing them.
@@ -276,15 +298,25 @@ class AbstractSparseFunction(DiscreteFunction):
         key = alias if alias is not None else self
         if isinstance(key, AbstractSparseFunction):
             # Gather into `self.data`
-            # Coords may be None if the coordinates are not used in the Operator
-            if coordsobj is None:
-                pass
+            # Coords may be None if the coordinates are not used in the Operator,
+            # or still a NumPy array if only the precomputed interpolation indices
+            # and weights are used, in which case there's nothing to gather back
+            if coordsobj is None or isinstance(coordsobj, np.ndarray):
+                coordsobj = None
             elif np.sum([coordsobj._obj.size[i] for i in range(self.ndim)]) > 0:
                 coordsobj = self.coordinates._C_as_ndarray(coordsobj)
+            else:
+                # No local sparse points, but still part of the Alltoallv
+                coordsobj = np.empty((0, self.grid.dim), dtype=self.coordinates.dtype)
             key._dist_gather(self._C_as_ndarray(dataobj), coordsobj)
         elif self.grid.distributor.nprocs > 1:
             raise NotImplementedError("Don't know how to gather data from an "
                                       "object of type `%s`" % type(key))
+        elif getattr(self, 'reorder', False):
+            # A pure-data replacement (array), to be restored in user order
+            index = [slice(None)]*self.ndim
+            index[self._sparse_position] = self._dist_plan().perm
+            key[tuple(index)] = self._C_as_ndarray(dataobj)
 
 
 class AbstractSparseTimeFunction(AbstractSparseFunction):
@@ -296,13 +328,14 @@ class AbstractSparseTimeFunction(AbstractSparseFunction):
     _time_position = 0
     """Position of time index among the function indices."""
 
-    __rkwargs__ = AbstractSparseFunction.__rkwargs__ + ('nt', 'time_order')
+    __rkwargs__ = AbstractSparseFunction.__rkwargs__ + ('nt', 'time_order', 'save')
 
     def __init_finalize__(self, *args, **kwargs):
         self._time_dim = self.indices[self._time_position]
         self._time_order = kwargs.get('time_order', 1)
         if not isinstance(self.time_order, int):
             raise ValueError("`time_order` must be int")
+        self._save = kwargs.get('save')
 
         super(AbstractSparseTimeFunction, self).__init_finalize__(*args, **kwargs)
 
@@ -322,15 +355,25 @@ class AbstractSparseTimeFunction(AbstractSparseFunction):
     def __indices_setup__(cls, **kwargs):
         dimensions = as_tuple(kwargs.get('dimensions'))
         if not dimensions:
-            dimensions = (kwargs['grid'].time_dim,
-                          Dimension(name='p_%s' % kwargs["name"]))
+            grid = kwargs['grid']
+            if isinstance(kwargs.get('save'), Buffer):
+                time_dim = grid.stepping_dim
+            else:
+                time_dim = grid.time_dim
+            dimensions = (time_dim, Dimension(name='p_%s' % kwargs["name"]))
         return dimensions, dimensions
 
     @classmethod
     def __shape_setup__(cls, **kwargs):
         shape = kwargs.get('shape')
         if shape is None:
-            nt = kwargs.get('nt')
+            save = kwargs.get('save')
+            if save is None:
+                nt = kwargs.get('nt')
+            elif isinstance(save, Buffer):
+                nt = save.val
+            else:
+                raise TypeError("`save` can be None or Buffer, not %s" % type(save))
             if not isinstance(nt, int):
                 raise TypeError('Need `nt` int argument')
             if nt <= 0:
@@ -350,10 +393,22 @@ class AbstractSparseTimeFunction(AbstractSparseFunction):
         """The time order."""
         return self._time_order
 
+    @property
+    def save(self):
+        """
+        The time Buffer, if any, in which only the most recent time samples
+        are retained.
+        """
+        return self._save
+
     @property
     def _time_size(self):
         return self.shape_allocated[self._time_position]
 
+    @property
+    def _time_buffering(self):
+        return isinstance(self.save, Buffer)
+
 
 class SparseFunction(AbstractSparseFunction):
     """
@@ -375,6 +430,11 @@ class SparseFunction(AbstractSparseFunction):
         The computational domain from which the sparse points are sampled.
     coordinates : np.ndarray, optional
         The coordinates of each sparse point.
+    reorder : bool, optional
+        If True, the sparse points are processed by the Operator along a
+        space-filling curve, which improves data locality for large, unsorted
+        sets of points. ``data`` and ``coordinates`` are still presented in
+        user order. Defaults to False.
     space_order : int, optional
         Discretisation order for space derivatives. Defaults to 0.
     shape : tuple of ints, optional
@@ -446,11 +506,12 @@ class SparseFunction(AbstractSparseFunction):
 
     _sub_functions = ('coordinates',)
 
-    __rkwargs__ = AbstractSparseFunction.__rkwargs__ + ('coordinates_data',)
+    __rkwargs__ = AbstractSparseFunction.__rkwargs__ + ('coordinates_data', 'reorder')
 
     def __init_finalize__(self, *args, **kwargs):
         super(SparseFunction, self).__init_finalize__(*args, **kwargs)
         self.interpolator = LinearInterpolator(self)
+        self._reorder = kwargs.get('reorder', False)
         # Set up sparse point coordinates
         coordinates = kwargs.get('coordinates', kwargs.get('coordinates_data'))
         if isinstance(coordinates, Function):
@@ -473,6 +534,9 @@ class SparseFunction(AbstractSparseFunction):
                 # case ``self._data is None``
                 self.coordinates.data
 
+        # The scatter plan, built lazily upon the first `_dist_scatter`
+        self._dist_plan_cache = None
+
     def __distributor_setup__(self, **kwargs):
         """
         A `SparseDistributor` handles the SparseFunction decomposition based on
@@ -490,6 +554,14 @@ class SparseFunction(AbstractSparseFunction):
     def coordinates_data(self):
         return self.coordinates.data.view(np.ndarray)
 
+    @property
+    def reorder(self):
+        """
+        True if the sparse points are processed along a space-filling curve,
+        False if in user order.
+        """
+        return self._reorder
+
     @cached_property
     def _point_symbols(self):
         """Symbol for coordinate value in each dimension of the point."""
@@ -624,9 +696,8 @@ class SparseFunction(AbstractSparseFunction):
         mapper = {self._sparse_dim: self._distributor.decomposition[self._sparse_dim]}
         return tuple(mapper.get(d) for d in self.dimensions)
 
-    def _dist_subfunc_alltoall(self, dmap=None):
-        dmap = dmap or self._dist_datamap
-        ssparse, rsparse = self._dist_count(dmap=dmap)
+    def _dist_subfunc_alltoall(self, dmap=None, counts=None):
+        ssparse, rsparse = counts or self._dist_count(dmap=dmap)
 
         # Per-rank shape of send/recv `coordinates`
         sshape = [(i, self.grid.dim) for i in ssparse]
@@ -649,27 +720,94 @@ class SparseFunction(AbstractSparseFunction):
 
         return sshape, scount, sdisp, rshape, rcount, rdisp
 
+    def _dist_plan(self):
+        """
+        The ``DistPlan`` to scatter and gather the sparse data values, which is
+        recomputed only if the coordinates have been modified since it was
+        last built. The staleness check is collective, so that all MPI ranks
+        recompute the plan together.
+
+        With ``reorder=True``, the plan also carries the permutation sorting the
+        sparse points local to the calling MPI rank along a Z-order curve over
+        their reference grid points, while its coordinates are already sorted.
+        """
+        distributor = self.grid.distributor
+        comm = distributor.comm
+        version = self.coordinates.data._version
+
+        plan = self._dist_plan_cache
+        stale = plan is None or plan.version is not version or \
+            plan.value != version.value
+        if distributor.nprocs > 1:
+            stale = comm.allreduce(stale, op=MPI.LOR)
+        if not stale:
+            return plan
+
+        if distributor.nprocs == 1:
+            mask = counts = None
+            coords = self.coordinates.data._local
+        else:
+            # Compute dist map only once
+            dmap = self._dist_datamap
+            mask = self._dist_scatter_mask(dmap=dmap)
+            counts = self._dist_count(dmap=dmap)
+
+            # Pack (reordered) coordinates so that they can be sent out via an
+            # Alltoallv
+            coords = self.coordinates.data._local[mask[self._sparse_position]]
+
+            # Send out the sparse point coordinates
+            _, scount, sdisp, rshape, rcount, rdisp = \
+                self._dist_subfunc_alltoall(counts=counts)
+            scattered = np.empty(shape=rshape, dtype=self.coordinates.dtype)
+            mpitype = MPI._typedict[np.dtype(self.coordinates.dtype).char]
+            comm.Alltoallv([coords, scount, sdisp, mpitype],
+                           [scattered, rcount, rdisp, mpitype])
+
+            # Translate global coordinates into local coordinates
+            coords = scattered - np.array(self.grid.origin_offset, dtype=self.dtype)
+
+        if self.reorder:
+            gridpoints = np.floor((coords - np.array(self.grid.origin)) /
+                                  np.array(self.grid.spacing))
+            perm = zorder(gridpoints)
+            coords = coords[perm]
+        else:
+            perm = None
+
+        self._dist_plan_cache = DistPlan(version, version.value, mask, counts,
+                                         coords, perm)
+
+        return self._dist_plan_cache
+
     def _dist_scatter(self, data=None):
         data = data if data is not None else self.data._local
         distributor = self.grid.distributor
 
         # If not using MPI, don't waste time
         if distributor.nprocs == 1:
-            return {self: data, self.coordinates: self.coordinates.data}
+            if not self.reorder:
+                return {self: data, self.coordinates: self.coordinates.data}
+
+            # Only the sparse points need sorting
+            plan = self._dist_plan()
+            data = np.take(data, plan.perm, axis=self._sparse_position)
+            return {self: data, self.coordinates: plan.coords}
 
         comm = distributor.comm
         mpitype = MPI._typedict[np.dtype(self.dtype).char]
 
-        # Compute dist map only once
-        dmap = self._dist_datamap
-        mask = self._dist_scatter_mask(dmap=dmap)
+        # The coordinates don't move unless modified, so they are only scattered
+        # along with the plan
+        plan = self._dist_plan()
 
         # Pack sparse data values so that they can be sent out via an Alltoallv
-        data = data[mask]
+        data = data[plan.mask]
         data = np.ascontiguousarray(np.transpose(data, self._dist_reorder_mask))
 
         # Send out the sparse point values
-        _, scount, sdisp, rshape, rcount, rdisp = self._dist_alltoall(dmap=dmap)
+        _, scount, sdisp, rshape, rcount, rdisp = \
+            self._dist_alltoall(counts=plan.counts)
         scattered = np.empty(shape=rshape, dtype=self.dtype)
         comm.Alltoallv([data, scount, sdisp, mpitype],
                        [scattered, rcount, rdisp, mpitype])
@@ -678,38 +816,44 @@ class SparseFunction(AbstractSparseFunction):
         # Unpack data values so that they follow the expected storage layout
         data = np.ascontiguousarray(np.transpose(data, self._dist_reorder_mask))
 
-        # Pack (reordered) coordinates so that they can be sent out via an Alltoallv
-        coords = self.coordinates.data._local[mask[self._sparse_position]]
+        # Sort the received sparse points
+        if plan.perm is not None:
+            data = np.take(data, plan.perm, axis=self._sparse_position)
 
-        # Send out the sparse point coordinates
-        _, scount, sdisp, rshape, rcount, rdisp = self._dist_subfunc_alltoall(dmap=dmap)
-        scattered = np.empty(shape=rshape, dtype=self.coordinates.dtype)
-        comm.Alltoallv([coords, scount, sdisp, mpitype],
-                       [scattered, rcount, rdisp, mpitype])
-        coords = scattered
-
-        # Translate global coordinates into local coordinates
-        coords = coords - np.array(self.grid.origin_offset, dtype=self.dtype)
-
-        return {self: data, self.coordinates: coords}
+        return {self: data, self.coordinates: plan.coords}
 
     def _dist_gather(self, data, coords):
         distributor = self.grid.distributor
 
         # If not using MPI, don't waste time
+        if distributor.nprocs == 1 and not self.reorder:
+            return
+
+        # Same plan as in the preceding `_dist_scatter`
+        plan = self._dist_plan()
+
+        # Restore the user order of the sparse points
+        if plan.perm is not None:
+            inv = np.argsort(plan.perm)
+            data = np.take(data, inv, axis=self._sparse_position)
+            if coords is not None:
+                coords = coords[inv]
+
         if distributor.nprocs == 1:
+            self._data[:] = data
+            if coords is not None:
+                # Also invalidates the plan, as the coordinates may have changed
+                self._coordinates.data._local[:] = coords
             return
 
         comm = distributor.comm
-
-        # Compute dist map only once
-        dmap = self._dist_datamap
-        mask = self._dist_scatter_mask(dmap=dmap)
+        mask = plan.mask
 
         # Pack sparse data values so that they can be sent out via an Alltoallv
         data = np.ascontiguousarray(np.transpose(data, self._dist_reorder_mask))
         # Send back the sparse point values
-        sshape, scount, sdisp, _, rcount, rdisp = self._dist_alltoall(dmap=dmap)
+        sshape, scount, sdisp, _, rcount, rdisp = \
+            self._dist_alltoall(counts=plan.counts)
         gathered = np.empty(shape=sshape, dtype=self.dtype)
         mpitype = MPI._typedict[np.dtype(self.dtype).char]
         comm.Alltoallv([data, rcount, rdisp, mpitype],
@@ -723,11 +867,12 @@ class SparseFunction(AbstractSparseFunction):
             coords = coords + np.array(self.grid.origin_offset, dtype=self.dtype)
             # Send out the sparse point coordinates
             sshape, scount, sdisp, _, rcount, rdisp = \
-                self._dist_subfunc_alltoall(dmap=dmap)
+                self._dist_subfunc_alltoall(counts=plan.counts)
             gathered = np.empty(shape=sshape, dtype=self.coordinates.dtype)
             mpitype = MPI._typedict[np.dtype(self.coordinates.dtype).char]
             comm.Alltoallv([coords, rcount, rdisp, mpitype],
                            [gathered, scount, sdisp, mpitype])
+            # Also invalidates the plan, as the coordinates may have changed
             self._coordinates.data._local[mask[self._sparse_position]] = gathered[:]
 
         # Note: this method "mirrors" `_dist_scatter`: a sparse point that is sent
@@ -757,8 +902,19 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
         Number of timesteps along the time dimension.
     grid : Grid
         The computational domain from which the sparse points are sampled.
+    save : Buffer, optional
+        By default, ``save=None``, which indicates that all ``nt`` timesteps are
+        retained in memory. With ``save=Buffer(k)``, only ``k`` timesteps are
+        stored in a circular buffer indexed by the ``grid.stepping_dim``, and
+        ``nt`` may be omitted. Combined with a TraceWriter, this allows long
+        recordings to be streamed to disk while the Operator runs.
     coordinates : np.ndarray, optional
         The coordinates of each sparse point.
+    reorder : bool, optional
+        If True, the sparse points are processed by the Operator along a
+        space-filling curve, which improves data locality for large, unsorted
+        sets of points. ``data`` and ``coordinates`` are still presented in
+        user order. Defaults to False.
     space_order : int, optional
         Discretisation order for space derivatives. Defaults to 0.
     time_order : int, optional
@@ -808,6 +964,15 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
     >>> exprs0 = sf.interpolate(f)
     >>> exprs1 = sf.inject(f, sf)
 
+    A circular buffer retaining only the last two timesteps
+
+    >>> from devito import Buffer
+    >>> sb = SparseTimeFunction(name='sb', grid=grid, npoint=2, save=Buffer(2))
+    >>> sb
+    sb(t, p_sb)
+    >>> sb.shape
+    (2, 2)
+
     Notes
     -----
     The parameters must always be given as keyword arguments, since SymPy
@@ -819,6 +984,159 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
     __rkwargs__ = (AbstractSparseTimeFunction.__rkwargs__ +
                    SparseFunction.__rkwargs__)
 
+    def __init_finalize__(self, *args, **kwargs):
+        super().__init_finalize__(*args, **kwargs)
+
+        # The sparse points don't move over time, so the interpolation indices
+        # and weights are time-invariant. The generated code reads them from
+        # these SubFunctions, whose values are computed at `apply` time, and only
+        # by the Operators that interpolate or inject
+        dimensions = self.coordinates.dimensions
+        shape = (self.npoint, self.grid.dim)
+        self._interp_gridpoints = DerivedSubFunction(
+            name='%s_gp' % self.name, parent=self, dtype=np.int32,
+            dimensions=dimensions, shape=shape, space_order=0
+        )
+        self._interp_bases = DerivedSubFunction(
+            name='%s_bases' % self.name, parent=self, dtype=self.dtype,
+            dimensions=dimensions, shape=shape, space_order=0
+        )
+
+        # For atomic-free injection, the sparse points are grouped into colors,
+        # that is sets of points with disjoint supports. `<name>_cperm` lists the
+        # sparse points color by color, while `<name>_cm` and `<name>_cM` are
+        # the first and last position of each color in `<name>_cperm`
+        cdim = Dimension(name='c_%s' % self.name)
+        kdim = ColorDimension(name='k_%s' % self.name)
+        self._color_perm = DerivedSubFunction(
+            name='%s_cperm' % self.name, parent=self, dtype=np.int32,
+            dimensions=(kdim,), shape=(self.npoint,), space_order=0
+        )
+        # The number of colors is unknown at this stage
+        self._color_m = DerivedSubFunction(
+            name='%s_cm' % self.name, parent=self, dtype=np.int32,
+            dimensions=(cdim,), shape=(1,), space_order=0
+        )
+        self._color_M = DerivedSubFunction(
+            name='%s_cM' % self.name, parent=self, dtype=np.int32,
+            dimensions=(cdim,), shape=(1,), space_order=0
+        )
+
+        self._interp_cache = None
+        self._color_cache = None
+
+    def _interpolation_bases(self, coords, origin, spacing):
+        """
+        The reference grid point of each sparse point, along with the position
+        of the sparse point within the grid cell, normalized by the grid spacing.
+
+        Notes
+        -----
+        This mirrors, in NumPy, the position and index computation otherwise
+        performed by the generated code. The result is cached, and reused for as
+        long as the coordinates, the grid origin and the grid spacing don't change.
+        """
+        coords = np.asarray(coords)
+        origin = np.array(origin, dtype=self.dtype)
+        spacing = np.array(spacing, dtype=self.dtype)
+
+        if self._interp_cache is not None:
+            c, o, h, retval = self._interp_cache
+            if np.array_equal(c, coords) and np.array_equal(o, origin) and \
+               np.array_equal(h, spacing):
+                return retval
+
+        pos = (coords - origin).astype(self.dtype, copy=False)
+        gridpoints = np.floor(pos / spacing)
+        bases = ((pos - gridpoints * spacing) / spacing).astype(self.dtype)
+        gridpoints = gridpoints.astype(np.int32)
+        retval = {self._interp_gridpoints.name: gridpoints,
+                  self._interp_bases.name: bases}
+
+        self._interp_cache = (coords.copy(), origin, spacing, retval)
+
+        return retval
+
+    def _interpolation_colors(self, gridpoints):
+        """
+        Group the sparse points into colors, that is sets of points whose
+        supports are pairwise disjoint, so that each color may be injected in
+        parallel without atomics.
+
+        Notes
+        -----
+        The result is cached, and reused for as long as the reference grid points,
+        as returned by `_interpolation_bases`, don't change.
+
+        The support of a sparse point spans two grid points along each
+        Dimension, starting at its reference grid point. Two points whose
+        reference grid points have the same parity along each Dimension are
+        therefore either in the same grid cell or at least two grid points apart
+        along some Dimension, i.e. their supports are disjoint. So a color is a
+        parity class, with the points sharing a grid cell spread over as many
+        rounds of colors as the most populated grid cell.
+        """
+        if self._color_cache is not None:
+            gp, retval = self._color_cache
+            if gp is gridpoints:
+                return retval
+
+        npoint, ndim = gridpoints.shape
+
+        parity = (gridpoints & 1).dot(1 << np.arange(ndim))
+
+        # Rank of each point among those sharing its grid cell
+        order = np.lexsort(gridpoints.T[::-1])
+        cells = gridpoints[order]
+        first = np.ones(npoint, dtype=bool)
+        first[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+        start = np.maximum.accumulate(np.where(first, np.arange(npoint), 0))
+        rank = np.empty(npoint, dtype=np.int64)
+        rank[order] = np.arange(npoint) - start
+
+        colors = (rank << ndim) + parity
+        perm = np.argsort(colors, kind='stable')
+        _, counts = np.unique(colors[perm], return_counts=True)
+        cM = np.cumsum(counts) - 1
+        cm = cM - counts + 1
+
+        retval = {self._color_perm.name: perm.astype(np.int32),
+                  self._color_m.name: cm.astype(np.int32),
+                  self._color_M.name: cM.astype(np.int32)}
+        for f, size in [(self._color_perm, npoint), (self._color_m, len(counts))]:
+            retval.update(f.dimensions[0]._arg_defaults(size=size))
+
+        self._color_cache = (gridpoints, retval)
+
+        return retval
+
+    def _arg_derived(self, subfunc, **kwargs):
+        """
+        The runtime values of the DerivedSubFunction `subfunc`, that is either the
+        interpolation indices and weights or the injection colors.
+        """
+        try:
+            # The coordinates have already been processed, possibly overridden
+            coords = kwargs['args'][self.coordinates.name]
+            values = {}
+        except KeyError:
+            values = self._arg_values(**kwargs)
+            coords = values[self.coordinates.name]
+
+        # The grid origin and spacing may be overridden at `apply` time
+        origin = [kwargs.get(o.name, v) for o, v in self.grid.origin_map.items()]
+        spacing = [kwargs.get(d.spacing.name, v)
+                   for d, v in zip(self.grid.dimensions, self.grid.spacing)]
+        bases = self._interpolation_bases(coords, origin, spacing)
+
+        if subfunc in (self._interp_gridpoints, self._interp_bases):
+            values.update(bases)
+        else:
+            gridpoints = bases[self._interp_gridpoints.name]
+            values.update(self._interpolation_colors(gridpoints))
+
+        return values
+
     def interpolate(self, expr, offset=0, u_t=None, p_t=None, increment=False):
         """
         Generate equations interpolating an arbitrary expression into ``self``.
@@ -850,7 +1168,8 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
                                                            increment=increment,
                                                            self_subs=subs)
 
-    def inject(self, field, expr, offset=0, u_t=None, p_t=None, implicit_dims=None):
+    def inject(self, field, expr, offset=0, u_t=None, p_t=None, implicit_dims=None,
+               mode='atomic'):
         """
         Generate equations injecting an arbitrary expression into a field.
 
@@ -870,6 +1189,10 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
             An ordered list of Dimensions that do not explicitly appear in the
             injection expression, but that should be honored when constructing
             the operator.
+        mode : str, optional
+            Either ``'atomic'`` (default), to inject all sparse points at once
+            through atomic updates, or ``'color'``, to inject one color of sparse
+            points with disjoint supports at a time, without atomics.
         """
         # Apply optional time symbol substitutions to field and expr
         if u_t is not None:
@@ -877,7 +1200,8 @@ class SparseTimeFunction(AbstractSparseTimeFunction, SparseFunction):
         if p_t is not None:
             expr = expr.subs({self.time_dim: p_t})
 
-        return super().inject(field, expr, offset=offset, implicit_dims=implicit_dims)
+        return super().inject(field, expr, offset=offset, implicit_dims=implicit_dims,
+                              mode=mode)
 
 
 class PrecomputedSparseFunction(AbstractSparseFunction):
@@ -1145,7 +1469,9 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
     Before using this in an Operator, msf.manual_scatter() must be called to
     distribute the data.  This only needs to be done once for any number of
     calls to the Operator (e.g. for checkpointing), if the data, gridpoints
-    and coefficients have not changed.
+    and coefficients have not changed. If only the values in `matrix` have
+    changed, a new msf.manual_scatter() reuses the scatter metadata computed
+    by the previous one, and merely sends out the new values.
 
     This is true whether or not MPI is being used, and independent of
     the MPI_Size.
@@ -1353,6 +1679,11 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
         self.scatter_result = None
         self.scattered_data = None
 
+        # The scatter metadata, reused across `manual_scatter`s until either the
+        # gridpoints or the sparsity pattern of the matrix change
+        self._scatter_plan = None
+        self._par_dim_to_nnz_cache = None
+
     def free_data(self):
         # The sympy cache holds the symbol references, but we can break the link
         # between the symbol and the data, thus causing the memory to be freed
@@ -1367,6 +1698,8 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
 
         self.scatter_result = None
         self.scattered_data = None
+        self._scatter_plan = None
+        self._par_dim_to_nnz_cache = None
 
     @property
     def dt(self):
@@ -1628,6 +1961,8 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
         interpolation (must verify that this occurs).
         """
         distributor = self.grid.distributor
+        gridpoints = np.asarray(self._gridpoints.data)
+        nloc = gridpoints.shape[0]
 
         # Along each dimension, the coordinate indices are broken into
         # 2*decomposition_size+3 groups, numbered starting at 0
@@ -1640,11 +1975,10 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
         # So is group 2*decomp_size+1 and 2*decomp_size+2
         #  (these contributes to rank "decomp_size")
 
-        # binned_gridpoints will hold which group the particular
-        # point is along that decomposed dimension.
-        binned_gridpoints = np.empty_like(self._gridpoints.data)
-        dim_group_dim_rank = []
-
+        # Along each dimension, a location contributes to at most two
+        # consecutive ranks, `lo` and `hi`
+        dim_lo = []
+        dim_hi = []
         for idim, dim in enumerate(self.grid.dimensions):
             decomp = distributor.decomposition[idim]
             decomp_size = len(decomp)
@@ -1657,86 +1991,60 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
 
             # Define the split
             dim_breaks[:-2:2] = [
-                decomp_part[0] - self.r + 1 for decomp_part in decomp]
-            dim_breaks[-2] = decomp[-1][-1] + 1 - self.r + 1
+                decomp_part[0] - dim_r + 1 for decomp_part in decomp]
+            dim_breaks[-2] = decomp[-1][-1] + 1 - dim_r + 1
             dim_breaks[1:-1:2] = [
                 decomp_part[0] for decomp_part in decomp]
             dim_breaks[-1] = decomp[-1][-1] + 1
 
             # Handle the radius is None case by ensuring we treat
             # all grid points in that direction as zero
-            gridpoints_dim = self._gridpoints.data[:, idim]
+            gridpoints_dim = gridpoints[:, idim]
             if self.r[dim] is None:
                 gridpoints_dim = np.zeros_like(gridpoints_dim)
 
             try:
-                binned_gridpoints[:, idim] = np.digitize(
-                    gridpoints_dim, dim_breaks)
+                groups = np.digitize(gridpoints_dim, dim_breaks)
             except ValueError as e:
                 raise ValueError(
                     "decomposition failed!  Are some ranks too skinny?"
                 ) from e
 
-            this_group_rank_map = {
-                0: {None},
-                1: {None, 0},
-                **{2*i+2: {i} for i in range(decomp_size)},
-                **{2*i+2+1: {i, i+1} for i in range(decomp_size-1)},
-                2*decomp_size+1: {decomp_size-1, None},
-                2*decomp_size+2: {None}}
-
-            dim_group_dim_rank.append(this_group_rank_map)
-
-        # This allows the points to be grouped into non-overlapping sets
-        # based on their bin in each dimension.  For each set we build a list
-        # of points.
-        bins, inverse, counts = np.unique(
-            binned_gridpoints,
-            return_inverse=True,
-            return_counts=True,
-            axis=0)
-
-        # inverse is now a "unique bin number" for each point gridpoints
-        # we want to turn that into a list of points for each bin
-        # so we argsort
-        inverse_argsort = np.argsort(inverse).astype(np.int32)
-        cumulative_counts = np.cumsum(counts)
-        gp_map = {tuple(bi): inverse_argsort[cci-ci:cci]
-                  for bi, cci, ci in zip(bins, cumulative_counts, counts)
-                  }
-
-        # the result is now going to be a concatenation of these lists
-        # for each of the output ranks
-        # each bin has a set of ranks -> each rank has a set (possibly empty)
-        # of bins
-
-        # For each rank get the per-dimension coordinates
-        # TODO maybe we should cache this on the distributor
-        dim_ranks_to_glb = {
-            tuple(distributor.comm.Get_coords(rank)): rank
-            for rank in range(distributor.comm.Get_size())}
-
-        global_rank_to_bins = {}
-
-        from itertools import product
-        for bi in bins:
-            # This is a list of sets for the dimension-specific rank
-            dim_rank_sets = [dgdr[bii]
-                             for dgdr, bii in zip(dim_group_dim_rank, bi)]
-
-            # Convert these to an absolute rank
-            # This is where we will throw a KeyError if there are points OOB
-            for dim_ranks in product(*dim_rank_sets):
-                global_rank = dim_ranks_to_glb[tuple(dim_ranks)]
-                global_rank_to_bins\
-                    .setdefault(global_rank, set())\
-                    .add(tuple(bi))
-
-        empty = np.array([], dtype=np.int32)
-
-        return [np.concatenate((
-            empty, *[gp_map[bi] for bi in global_rank_to_bins.get(rank, [])]))
-            for rank in range(distributor.comm.Get_size())]
+            lo = groups // 2 - 1
+            hi = np.where(groups % 2 == 1, lo + 1, lo)
+            if np.any(lo < 0) or np.any(hi >= decomp_size):
+                raise ValueError("Some locations are injected outside of the "
+                                 "domain along Dimension `%s`" % dim)
+
+            dim_lo.append(lo)
+            dim_hi.append(hi)
+
+        # Cartesian communicators use a row-major numbering of the ranks
+        rank_table = np.arange(distributor.nprocs).reshape(distributor.topology)
+
+        # Each location contributes to up to 2**ndim ranks, i.e. all combinations
+        # of `lo` and `hi` along each dimension. A combination picking `hi` where
+        # `hi == lo` is a duplicate, hence dropped
+        ranks = []
+        points = []
+        for choice in product((False, True), repeat=self.grid.dim):
+            keep = np.ones(nloc, dtype=bool)
+            for c, lo, hi in zip(choice, dim_lo, dim_hi):
+                if c:
+                    keep &= hi != lo
+            coords = tuple(np.where(c, hi, lo)[keep]
+                           for c, lo, hi in zip(choice, dim_lo, dim_hi))
+            ranks.append(rank_table[coords])
+            points.append(np.flatnonzero(keep))
+        ranks = np.concatenate(ranks)
+        points = np.concatenate(points)
+
+        # Group the locations by rank
+        order = np.lexsort((points, ranks))
+        bounds = np.searchsorted(ranks[order], np.arange(distributor.nprocs + 1))
+        points = points[order].astype(np.int32)
+
+        return [points[bounds[i]:bounds[i+1]] for i in range(distributor.nprocs)]
 
     def _build_par_dim_to_nnz(self, active_gp, active_mrow):
         # The case where we parallelise over a non-local index is suboptimal, but
@@ -1763,9 +2071,9 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
         r = self._radius[self._par_dim]
 
         # now, the parameters can be devito.Data, which doesn't like fancy indexing
-        # very much. So, we convert to regular numpy arrays
-        active_gp = np.array(active_gp)
-        active_mrow = np.array(active_mrow)
+        # very much. So, we view them as regular numpy arrays
+        active_gp = np.asarray(active_gp)
+        active_mrow = np.asarray(active_mrow)
 
         # sort the injected nonzero indices by parallel coordinate
         pardim_coordinates_nnz = active_gp[active_mrow, pardim_index]
@@ -1808,7 +2116,7 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
                 self.mrow: self.mrow.data,
                 self.mcol: self.mcol.data,
                 self.mval: self.mval.data,
-                **self._build_par_dim_to_nnz(self.gridpoints.data, self.mrow.data),
+                **self._serial_par_dim_to_nnz(),
             }
             return
 
@@ -1822,24 +2130,33 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
         if distributor.myrank != 0 and self.npoint != 0:
             raise ValueError("can only accept sources/receivers on rank 0")
 
-        # args[self.mrow.name] = m_coo.row.copy()
-        # args[self.mcol.name] = m_coo.col.copy()
-        # args[self.mval.name] = m_coo.data.copy()
-        # args.update(self.nnzdim._arg_defaults(size=m_coo.nnz))
-
         # Send out data
         # Send out gridpoints
         # Send out coefficients
         # Send out matrix rows, cols, data
         r_tuple = tuple(self.r[dim] for dim in self.grid.dimensions)
 
-        npoint, nloc, nnz, ndim, r_tuple_bcast, nt = distributor.comm.bcast(
+        # If neither the gridpoints nor the sparsity pattern of the matrix have
+        # changed since the last scatter, only the values need to be sent out
+        # again, as the rest of the scatter metadata is still valid
+        if distributor.myrank == 0:
+            plan = self._scatter_plan
+            version = self._gridpoints.data._version
+            reuse = (plan is not None and
+                     plan.version is version and plan.value == version.value and
+                     np.array_equal(plan.mrow, m_coo.row) and
+                     np.array_equal(plan.mcol, m_coo.col))
+        else:
+            reuse = None
+
+        npoint, nloc, nnz, ndim, r_tuple_bcast, nt, reuse = distributor.comm.bcast(
             (self.npoint,
              self._gridpoints.data.shape[0],
              m_coo.nnz,
              self._gridpoints.data.shape[-1],
              r_tuple,
-             self.data.shape[self._time_position]), root=0)
+             self.data.shape[self._time_position],
+             reuse), root=0)
 
         # important that all ranks have the same ndims and same r
         assert r_tuple == r_tuple_bcast
@@ -1857,115 +2174,144 @@ class MatrixSparseTimeFunction(AbstractSparseTimeFunction):
                 scattered_data = np.zeros([nt, npoint], dtype=self.dtype)
             else:
                 scattered_data = np.empty([nt, npoint], dtype=self.dtype)
-            scattered_gp = np.empty([nloc, ndim], dtype=np.int32)
             scattered_coeffs = [
                 np.empty([nloc, r_tuple_no_none[idim]], dtype=self.dtype)
                 for idim in range(ndim)
             ]
-            scattered_mrow = np.empty([nnz], dtype=np.int32)
-            scattered_mcol = np.empty([nnz], dtype=np.int32)
             scattered_mval = np.empty([nnz], dtype=self.dtype)
+            if not reuse:
+                scattered_gp = np.empty([nloc, ndim], dtype=np.int32)
+                scattered_mrow = np.empty([nnz], dtype=np.int32)
+                scattered_mcol = np.empty([nnz], dtype=np.int32)
         else:
             scattered_data = self.data
 
-            # These are copies because we mess with them down below
-            scattered_gp = self._gridpoints.data.copy()
+            # The coefficients are copies because we mess with them down below
             scattered_coeffs = [
                 self.interpolation_coefficients[d].data.copy()
                 for d in self.grid.dimensions]
-            scattered_mrow = m_coo.row.copy()
-            scattered_mcol = m_coo.col.copy()
-            scattered_mval = m_coo.data.copy()
+            scattered_mval = np.ascontiguousarray(m_coo.data, dtype=self.dtype)
+            if not reuse:
+                scattered_gp = np.array(self._gridpoints.data, dtype=np.int32)
+                scattered_mrow = np.array(m_coo.row, dtype=np.int32)
+                scattered_mcol = np.array(m_coo.col, dtype=np.int32)
 
         if not data_all_zero:
             distributor.comm.Bcast(scattered_data, root=0)
-        for arr in [scattered_gp, *scattered_coeffs,
-                    scattered_mrow, scattered_mcol, scattered_mval]:
+        arrays = [*scattered_coeffs, scattered_mval]
+        if not reuse:
+            arrays.extend([scattered_gp, scattered_mrow, scattered_mcol])
+        for arr in arrays:
             distributor.comm.Bcast(arr, root=0)
 
-        # now recreate the matrix to only contain points in our
-        # local domain.
-        # along each dimension, each point is in one of 5 groups
-        #  0 - completely to the left
-        #  1 - to the left, but the injection stencil touches our domain
-        #  2 - completely in our domain
-        #  3 - in the domain, but the injection stencil includes points
-        #      to the right
-        #  4 - completely to the right
-        active_mrow = scattered_mrow
-        active_mcol = scattered_mcol
-        active_mval = scattered_mval
-
-        # first, build a reduced matrix excluding any points outside our domain
+        # The local domain along each dimension, and the effective radius and
+        # gridpoints of the locations
+        domain = []
         for idim, (dim, mycoord) in enumerate(zip(
                 self.grid.dimensions, distributor.mycoords)):
             _left = distributor.decomposition[idim][mycoord][0]
             _right = distributor.decomposition[idim][mycoord][-1] + 1
-
-            this_dim_r = self.r[dim]
-            effective_gridpoints = scattered_gp[active_mrow, idim]
-            if this_dim_r is None:
-                this_dim_r = self.grid.dimension_map[dim].glb
-                effective_gridpoints = np.zeros_like(effective_gridpoints)
+            domain.append((_left, _right))
+
+        if not reuse:
+            # now recreate the matrix to only contain points in our
+            # local domain.
+            # along each dimension, each point is in one of 5 groups
+            #  0 - completely to the left
+            #  1 - to the left, but the injection stencil touches our domain
+            #  2 - completely in our domain
+            #  3 - in the domain, but the injection stencil includes points
+            #      to the right
+            #  4 - completely to the right
+            # A location is active if it's in groups 1-3 along all dimensions
+            active = np.ones(nloc, dtype=bool)
+            for idim, (dim, (_left, _right)) in enumerate(zip(self.grid.dimensions,
+                                                              domain)):
+                if self.r[dim] is None:
+                    # All gridpoints are effectively zero, hence always active
+                    continue
+                gp = scattered_gp[:, idim]
+                active &= (gp >= _left - self.r[dim] + 1) & (gp < _right)
 
             # rewrite the matrix to remove the rows in groups 0 and 4
-            mask = (
-                (effective_gridpoints >= _left - this_dim_r + 1)
-                & (effective_gridpoints < _right))
+            which = np.flatnonzero(active[scattered_mrow])
+            active_mrow = scattered_mrow[which]
+            active_mcol = scattered_mcol[which]
+
+            # finally, we translate to local coordinates
+            # no need for this in the broadcasted dimensions
+            local_gp = scattered_gp.copy()
+            for idim, (dim, (_left, _)) in enumerate(zip(self.grid.dimensions,
+                                                         domain)):
+                if self.r[dim] is not None:
+                    local_gp[:, idim] -= _left
+
+            if distributor.myrank == 0:
+                version = self._gridpoints.data._version
+                value = version.value
+            else:
+                version = value = None
+            self._scatter_plan = MatrixDistPlan(
+                version, value, scattered_mrow, scattered_mcol, scattered_gp,
+                local_gp, which, active_mrow, active_mcol,
+                self._build_par_dim_to_nnz(local_gp, active_mrow)
+            )
 
-            which = np.nonzero(mask)
-            active_mrow = active_mrow[which]
-            active_mcol = active_mcol[which]
-            active_mval = active_mval[which]
+        plan = self._scatter_plan
 
         # then, zero any of the coefficients which refer to points outside our
         # domain.  Do this on all the gridpoints for now, since this is a hack
         # anyway
-        for idim, (dim, mycoord) in enumerate(zip(
-                self.grid.dimensions, distributor.mycoords)):
-            _left = distributor.decomposition[idim][mycoord][0]
-            _right = distributor.decomposition[idim][mycoord][-1] + 1
-
-            # points to the left have the first few coeffs zeroed
+        for idim, (dim, (_left, _right)) in enumerate(zip(self.grid.dimensions,
+                                                          domain)):
             this_dim_r = self.r[dim]
-            effective_gridpoints = scattered_gp[:, idim]
+            effective_gridpoints = plan.gp[:, idim]
             if this_dim_r is None:
                 this_dim_r = self.grid.dimension_map[dim].glb
                 effective_gridpoints = np.zeros_like(effective_gridpoints)
+            ir = np.arange(this_dim_r)
 
+            # points to the left have the first few coeffs zeroed
             trim_size = np.clip(_left - effective_gridpoints, 0, this_dim_r)
-            for ir in range(this_dim_r):
-                # which points need zeroing?
-                mask = (trim_size > ir)
-                scattered_coeffs[idim][mask, ir] = 0
+            scattered_coeffs[idim][trim_size[:, None] > ir] = 0
 
             # points to the right have the last few coeffs zeroed
             trim_size = np.clip(
                 effective_gridpoints - (_right - this_dim_r), 0, this_dim_r)
-            for ir in range(this_dim_r):
-                # which points need zeroing?
-                mask = (trim_size > ir)
-                scattered_coeffs[idim][mask, -(ir+1)] = 0
-
-            # finally, we translate to local coordinates
-            # no need for this in the broadcasted dimensions
-            if self.r[dim] is not None:
-                scattered_gp[:, idim] -= _left
+            scattered_coeffs[idim][trim_size[:, None] > ir[::-1]] = 0
 
         self.scattered_data = scattered_data
         self.scatter_result = {
             self: scattered_data,
-            self.gridpoints: scattered_gp,
+            self.gridpoints: plan.local_gp,
             **{
                 self.interpolation_coefficients[d]: scattered_coeffs[idim]
                 for idim, d in enumerate(self.grid.dimensions)
             },
-            self.mrow: active_mrow,
-            self.mcol: active_mcol,
-            self.mval: active_mval,
-            **self._build_par_dim_to_nnz(scattered_gp, active_mrow),
+            self.mrow: plan.active_mrow,
+            self.mcol: plan.active_mcol,
+            self.mval: scattered_mval[plan.which],
+            **plan.par_dim_to_nnz,
         }
 
+    def _serial_par_dim_to_nnz(self):
+        """
+        The output of ``_build_par_dim_to_nnz`` in the non-MPI case, which is
+        cached for as long as neither the gridpoints nor ``mrow`` are written.
+        """
+        versions = (self.gridpoints.data._version, self.mrow.data._version)
+        values = tuple(v.value for v in versions)
+
+        cache = self._par_dim_to_nnz_cache
+        if cache is None or \
+           any(i is not j for i, j in zip(cache[0], versions)) or \
+           cache[1] != values:
+            retval = self._build_par_dim_to_nnz(self.gridpoints.data,
+                                                self.mrow.data)
+            self._par_dim_to_nnz_cache = cache = (versions, values, retval)
+
+        return cache[2]
+
     def _dist_scatter(self, data=None):
         assert data is None
         if self.scatter_result is None:
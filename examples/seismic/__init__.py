@@ -3,3 +3,4 @@ from .source import *  # noqa
 from .plotting import *  # noqa
 from .preset_models import *  # noqa
 from .utils import *  # noqa
+from .scheduler import *  # noqa
@@ -1,6 +1,10 @@
-from devito import Eq, Operator, Function, TimeFunction, Inc, solve, sign
+import numpy as np
+
+from devito import (Dimension, Eq, Operator, Function, TimeFunction, Inc, solve, sign,
+                    cos, sin)
 from devito.symbolics import retrieve_functions, INT
-from examples.seismic import PointSource, Receiver
+from devito.types import IgnoreDimSort
+from examples.seismic import PointSource, Receiver, snapshot_field
 
 
 def freesurface(model, eq):
@@ -26,7 +30,10 @@ def freesurface(model, eq):
     # Antisymmetric mirror at negative indices
     # TODO: Make a proper "mirror_indices" tool function
     for f in funcs:
-        zind = f.indices[-1]
+        # The vertical Dimension isn't the innermost one in batched wavefields
+        if z not in f.dimensions:
+            continue
+        zind = f.indices[f.dimensions.index(z)]
         if (zind - z).as_coeff_Mul()[0] < 0:
             s = sign(zind.subs({z: zfs, z.spacing: 1}))
             mapper.update({f: s * f.subs({zind: INT(abs(zind))})})
@@ -93,8 +100,130 @@ def iso_stencil(field, model, kernel, **kwargs):
     return eqns
 
 
+def batched_fields(model, geometry, nbatch, space_order=4, save=False,
+                   src_positions=None):
+    """
+    Create the forward wavefield, the sources and the receivers of ``nbatch``
+    shots modelled at once, or "super-shot".
+
+    The shots are independent from each other, and are stacked along a batch
+    Dimension ``b``, which is the innermost Dimension of the wavefield, i.e.
+    ``u(t, x, y, z, b)``, for SIMD vectorization. The sources are
+    ``src(time, p_src)``, one per shot, and the receivers ``rec(time, b, p_rec)``.
+    The ``b``-th shot is fired from the ``b``-th source only (see
+    ``batched_injection``), and is recorded by all receivers in ``geometry``.
+
+    Parameters
+    ----------
+    model : Model
+        Object containing the physical parameters.
+    geometry : AcquisitionGeometry
+        Geometry object that contains the source wavelet and the receiver
+        positions.
+    nbatch : int
+        Number of shots.
+    space_order : int, optional
+        Space discretization order.
+    save : bool, optional
+        Whether or not to save the entire (unrolled) wavefield.
+    src_positions : array_like, optional
+        The position of the source of each shot, of shape ``(nbatch, dim)``.
+    """
+    grid = model.grid
+    b = Dimension(name='b')
+
+    if save:
+        time_dim, nt = grid.time_dim, geometry.nt
+    else:
+        time_dim, nt = grid.stepping_dim, 3
+    u = TimeFunction(name='u', grid=grid, save=geometry.nt if save else None,
+                     time_order=2, space_order=space_order,
+                     dimensions=(time_dim,) + grid.dimensions + (b,),
+                     shape=(nt,) + grid.shape + (nbatch,))
+
+    src = PointSource(name='src', grid=grid, time_range=geometry.time_axis,
+                      npoint=nbatch, coordinates=src_positions)
+    if src_positions is not None:
+        src.data[:] = geometry.src.data[:, :1]
+
+    shape = list(Receiver.__shape_setup__(grid=grid, npoint=geometry.nrec,
+                                          nt=geometry.nt))
+    shape.insert(1, nbatch)
+    p = Dimension(name='p_rec')
+    rec = Receiver(name='rec', grid=grid, time_range=geometry.time_axis,
+                   npoint=geometry.nrec, coordinates=geometry.rec_positions,
+                   dimensions=(grid.time_dim, b, p), shape=tuple(shape))
+
+    return u, src, rec
+
+
+def batched_injection(field, src, expr):
+    """
+    Inject each source of ``src`` only into its own shot of the batched
+    ``field``, as created in ``batched_fields``, so that the cost of the
+    injection grows linearly, rather than quadratically, with the number
+    of shots.
+    """
+    b = field.dimensions[-1]
+    return _batched(src.inject(field=field.subs({b: src._sparse_dim}), expr=expr))
+
+
+def batched_interpolation(rec, expr):
+    """
+    Interpolate the batched ``expr`` into the batched receivers ``rec``, as
+    created in ``batched_fields``.
+    """
+    return _batched(rec.interpolate(expr=expr))
+
+
+def _batched(operation):
+    # The shot Dimension is the innermost one of the wavefield, but it must be
+    # iterated over before the grid points the sparse points are mapped to, so
+    # the Dimensions are ordered as the sparse ones only
+    return [e.func(e.lhs, e.rhs, implicit_dims=IgnoreDimSort(e.implicit_dims))
+            for e in operation.evaluate]
+
+
+def dft_fields(model, nfreq):
+    """
+    Create the Functions into which the discrete Fourier transform of a
+    wavefield is accumulated, on-the-fly, at ``nfreq`` frequencies.
+
+    These are the real and imaginary parts ``ufr(x, y, z, f)`` and
+    ``ufi(x, y, z, f)``, with the frequency Dimension ``f`` innermost for SIMD
+    vectorization, along with the frequencies ``freq(f)``. Only ``2*nfreq``
+    values per grid point are stored, rather than one per time step.
+
+    Parameters
+    ----------
+    model : Model
+        Physical model.
+    nfreq : int
+        Number of frequencies.
+    """
+    grid = model.grid
+    f = Dimension(name='f')
+
+    freq = Function(name='freq', dimensions=(f,), shape=(nfreq,), dtype=model.dtype)
+    ufr = Function(name='ufr', grid=grid, dimensions=grid.dimensions + (f,),
+                   shape=grid.shape + (nfreq,), space_order=0, dtype=model.dtype)
+    ufi = Function(name='ufi', grid=grid, dimensions=grid.dimensions + (f,),
+                   shape=grid.shape + (nfreq,), space_order=0, dtype=model.dtype)
+
+    return ufr, ufi, freq
+
+
+def dft_phase(model, freq):
+    """
+    The phase ``2*pi*f*t`` of the Fourier kernel at the current time step.
+    """
+    time = model.grid.time_dim
+    return 2*np.pi*freq*time*time.spacing
+
+
 def ForwardOperator(model, geometry, space_order=4,
-                    save=False, kernel='OT2', **kwargs):
+                    save=False, kernel='OT2', nbatch=None, nfreq=None,
+                    snapshot_factor=None, **kwargs):
     """
     Construct a forward modelling operator in an acoustic medium.
 
@@ -112,27 +241,65 @@ def ForwardOperator(model, geometry, space_order=4,
         Defaults to False.
     kernel : str, optional
         Type of discretization, 'OT2' or 'OT4'.
+    nbatch : int, optional
+        If provided, the Operator models ``nbatch`` independent shots at once,
+        with the wavefield, the sources and the receivers created as in
+        ``batched_fields``.
+    nfreq : int, optional
+        If provided, the discrete Fourier transform of the wavefield at
+        ``nfreq`` frequencies is accumulated within the time loop, into the
+        Functions created as in ``dft_fields``.
+    snapshot_factor : int, optional
+        If provided, the wavefield is not saved at every time step, but one
+        every ``snapshot_factor`` time steps, into the TimeFunction ``usave``
+        created as in ``snapshot_field``.
     """
     m = model.m
 
     # Create symbols for forward wavefield, source and receivers
-    u = TimeFunction(name='u', grid=model.grid,
-                     save=geometry.nt if save else None,
-                     time_order=2, space_order=space_order)
-    src = PointSource(name='src', grid=geometry.grid, time_range=geometry.time_axis,
-                      npoint=geometry.nsrc)
-
-    rec = Receiver(name='rec', grid=geometry.grid, time_range=geometry.time_axis,
-                   npoint=geometry.nrec)
+    if nbatch is None:
+        u = TimeFunction(name='u', grid=model.grid,
+                         save=geometry.nt if save and not snapshot_factor else None,
+                         time_order=2, space_order=space_order)
+        src = PointSource(name='src', grid=geometry.grid,
+                          time_range=geometry.time_axis, npoint=geometry.nsrc)
+
+        rec = Receiver(name='rec', grid=geometry.grid, time_range=geometry.time_axis,
+                       npoint=geometry.nrec)
+    else:
+        u, src, rec = batched_fields(model, geometry, nbatch,
+                                     space_order=space_order, save=save)
 
     s = model.grid.stepping_dim.spacing
     eqn = iso_stencil(u, model, kernel)
 
     # Construct expression to inject source values
-    src_term = src.inject(field=u.forward, expr=src * s**2 / m)
+    if nbatch is None:
+        src_term = src.inject(field=u.forward, expr=src * s**2 / m)
+    else:
+        src_term = batched_injection(u.forward, src, src * s**2 / m)
 
     # Create interpolation expression for receivers
-    rec_term = rec.interpolate(expr=u)
+    if nbatch is None:
+        rec_term = rec.interpolate(expr=u)
+    else:
+        rec_term = batched_interpolation(rec, u)
+
+    # Accumulate the Fourier transform of the wavefield
+    if nfreq is not None:
+        if nbatch is not None:
+            raise ValueError("Batched shots don't support on-the-fly DFT")
+        ufr, ufi, freq = dft_fields(model, nfreq)
+        phase = dft_phase(model, freq)
+        eqn += [Inc(ufr, u*cos(phase)), Inc(ufi, -u*sin(phase))]
+
+    # Save the wavefield snapshots
+    if snapshot_factor:
+        if nbatch is not None:
+            raise ValueError("Batched shots don't support wavefield snapshots")
+        usave = snapshot_field('usave', model, geometry, snapshot_factor,
+                               space_order=space_order)
+        eqn += [Eq(usave, u)]
 
     # Substitute spacing terms to reduce flops
     return Operator(eqn + src_term + rec_term, subs=model.spacing_map,
@@ -180,7 +347,7 @@ def AdjointOperator(model, geometry, space_order=4,
 
 
 def GradientOperator(model, geometry, space_order=4, save=True,
-                     kernel='OT2', **kwargs):
+                     kernel='OT2', nfreq=None, snapshot_factor=None, **kwargs):
     """
     Construct a gradient operator in an acoustic media.
 
@@ -197,13 +364,35 @@ def GradientOperator(model, geometry, space_order=4, save=True,
         Option to store the entire (unrolled) wavefield.
     kernel : str, optional
         Type of discretization, centered or shifted.
+    nfreq : int, optional
+        If provided, the gradient is computed in the frequency domain, from the
+        discrete Fourier transform of the forward wavefield at ``nfreq``
+        frequencies, as accumulated by a ForwardOperator with the same ``nfreq``,
+        rather than from the forward wavefield itself. This requires the 'OT2'
+        kernel.
+    snapshot_factor : int, optional
+        If provided, the gradient is computed from the forward wavefield saved
+        one every ``snapshot_factor`` time steps, as by a ForwardOperator with the
+        same ``snapshot_factor``, and is rescaled accordingly.
     """
     m = model.m
 
     # Gradient symbol and wavefield symbols
     grad = Function(name='grad', grid=model.grid)
-    u = TimeFunction(name='u', grid=model.grid, save=geometry.nt if save
-                     else None, time_order=2, space_order=space_order)
+    if snapshot_factor:
+        u = snapshot_field('usave', model, geometry, snapshot_factor,
+                           space_order=space_order)
+    elif nfreq is None:
+        u = TimeFunction(name='u', grid=model.grid, save=geometry.nt if save
+                         else None, time_order=2, space_order=space_order)
+    elif kernel == 'OT2':
+        # The forward wavefield, at the current time step, as synthesized back
+        # from its Fourier transform. The sum over the frequencies is implicit
+        ufr, ufi, freq = dft_fields(model, nfreq)
+        phase = dft_phase(model, freq)
+        u = ufr*cos(phase) - ufi*sin(phase)
+    else:
+        raise ValueError("Frequency-domain gradient requires the 'OT2' kernel")
     v = TimeFunction(name='v', grid=model.grid, save=None,
                      time_order=2, space_order=space_order)
     rec = Receiver(name='rec', grid=model.grid, time_range=geometry.time_axis,
@@ -212,10 +401,13 @@ def GradientOperator(model, geometry, space_order=4, save=True,
     s = model.grid.stepping_dim.spacing
     eqn = iso_stencil(v, model, kernel, forward=False)
 
+    # Only one every `snapshot_factor` time steps contributes to the gradient
+    w = snapshot_factor or 1
     if kernel == 'OT2':
-        gradient_update = Inc(grad, - u * v.dt2)
+        gradient_update = Inc(grad, - w * u * v.dt2)
     elif kernel == 'OT4':
-        gradient_update = Inc(grad, - u * v.dt2 - s**2 / 12.0 * u.biharmonic(m**(-2)) * v)
+        gradient_update = Inc(grad, - w * (u * v.dt2 +
+                                           s**2 / 12.0 * u.biharmonic(m**(-2)) * v))
     # Add expression for receiver injection
     receivers = rec.inject(field=v.backward, expr=rec * s**2 / m)
 
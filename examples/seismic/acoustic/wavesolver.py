@@ -1,7 +1,11 @@
+import numpy as np
+
 from devito import Function, TimeFunction, DevitoCheckpoint, CheckpointOperator
 from devito.tools import memoized_meth
+from examples.seismic import resolve_snapshot_factor, snapshot_field
 from examples.seismic.acoustic.operators import (
-    ForwardOperator, AdjointOperator, GradientOperator, BornOperator
+    ForwardOperator, AdjointOperator, GradientOperator, BornOperator, batched_fields,
+    dft_fields
 )
 from pyrevolve import Revolver
 
@@ -23,8 +27,13 @@ class AcousticWaveSolver(object):
         Type of discretization, centered or shifted.
     space_order: int, optional
         Order of the spatial stencil discretisation. Defaults to 4.
+    snapshot_factor : int or str, optional
+        If provided, the wavefield saved by the forward modelling for the
+        gradient is subsampled in time, one every ``snapshot_factor`` time steps.
+        If 'auto', the factor is derived from the Nyquist rate of the source.
     """
-    def __init__(self, model, geometry, kernel='OT2', space_order=4, **kwargs):
+    def __init__(self, model, geometry, kernel='OT2', space_order=4,
+                 snapshot_factor=None, **kwargs):
         self.model = model
         self.model._initialize_bcs(bcs="damp")
         self.geometry = geometry
@@ -33,6 +42,7 @@ class AcousticWaveSolver(object):
 
         self.space_order = space_order
         self.kernel = kernel
+        self.snapshot_factor = resolve_snapshot_factor(snapshot_factor, geometry)
 
         # Cache compiler options
         self._kwargs = kwargs
@@ -45,10 +55,12 @@ class AcousticWaveSolver(object):
         return self.model.critical_dt
 
     @memoized_meth
-    def op_fwd(self, save=None):
+    def op_fwd(self, save=None, nbatch=None, nfreq=None):
         """Cached operator for forward runs with buffered wavefield"""
         return ForwardOperator(self.model, save=save, geometry=self.geometry,
                                kernel=self.kernel, space_order=self.space_order,
+                               nbatch=nbatch, nfreq=nfreq,
+                               snapshot_factor=self.snapshot_factor if save else None,
                                **self._kwargs)
 
     @memoized_meth
@@ -59,10 +71,12 @@ class AcousticWaveSolver(object):
                                **self._kwargs)
 
     @memoized_meth
-    def op_grad(self, save=True):
+    def op_grad(self, save=True, nfreq=None):
         """Cached operator for gradient runs"""
         return GradientOperator(self.model, save=save, geometry=self.geometry,
                                 kernel=self.kernel, space_order=self.space_order,
+                                nfreq=nfreq,
+                                snapshot_factor=self.snapshot_factor if save else None,
                                 **self._kwargs)
 
     @memoized_meth
@@ -72,7 +86,8 @@ class AcousticWaveSolver(object):
                             kernel=self.kernel, space_order=self.space_order,
                             **self._kwargs)
 
-    def forward(self, src=None, rec=None, u=None, model=None, save=None, **kwargs):
+    def forward(self, src=None, rec=None, u=None, model=None, save=None,
+                src_positions=None, frequencies=None, **kwargs):
         """
         Forward modelling function that creates the necessary
         data objects for running a forward modelling operator.
@@ -91,30 +106,84 @@ class AcousticWaveSolver(object):
             The time-constant velocity.
         save : bool, optional
             Whether or not to save the entire (unrolled) wavefield.
+        src_positions : array_like, optional
+            The source positions of several shots, which are then modelled at
+            once by a batched Operator, one shot per source. ``src``, ``rec``
+            and ``u``, if provided, must be batched too, as in ``batched_fields``.
+            The receiver data has shape ``(nt, nshots, nrec)``, and the wavefield
+            has the shot as its innermost Dimension.
+        frequencies : array_like, optional
+            The frequencies, in kHz, at which the discrete Fourier transform of
+            the wavefield is accumulated on-the-fly. If provided, the returned
+            wavefield is the tuple ``(ufr, ufi, freq)`` of the real and imaginary
+            parts of the transform and of the frequencies, as in ``dft_fields``,
+            which can then be passed to ``jacobian_adjoint``.
 
         Returns
         -------
         Receiver, wavefield and performance summary
-        """
-        # Source term is read-only, so re-use the default
-        src = src or self.geometry.src
-        # Create a new receiver object to store the result
-        rec = rec or self.geometry.rec
 
-        # Create the forward wavefield if not provided
-        u = u or TimeFunction(name='u', grid=self.model.grid,
-                              save=self.geometry.nt if save else None,
-                              time_order=2, space_order=self.space_order)
+        Notes
+        -----
+        If the solver has a ``snapshot_factor`` and ``save`` is set, the returned
+        wavefield is the subsampled ``usave`` rather than ``u``.
+        """
+        if frequencies is not None:
+            if src_positions is not None:
+                raise ValueError("Batched shots don't support on-the-fly DFT")
+            frequencies = np.atleast_1d(frequencies)
+            nfreq = frequencies.size
+
+            ufr, ufi, freq = dft_fields(self.model, nfreq)
+            freq.data[:] = frequencies
+            kwargs.update({'ufr': ufr, 'ufi': ufi, 'freq': freq})
+        else:
+            nfreq = None
+
+        if src_positions is not None:
+            src_positions = np.reshape(src_positions, (-1, self.model.dim))
+            nbatch = src_positions.shape[0]
+
+            # Create the batched objects not provided
+            if src is None or rec is None or u is None:
+                u0, src0, rec0 = batched_fields(self.model, self.geometry, nbatch,
+                                                space_order=self.space_order,
+                                                save=save,
+                                                src_positions=src_positions)
+                src = src or src0
+                rec = rec or rec0
+                u = u or u0
+        else:
+            nbatch = None
+
+            # Source term is read-only, so re-use the default
+            src = src or self.geometry.src
+            # Create a new receiver object to store the result
+            rec = rec or self.geometry.rec
+
+            # Create the forward wavefield if not provided
+            snapshots = save and self.snapshot_factor
+            u = u or TimeFunction(name='u', grid=self.model.grid,
+                                  save=self.geometry.nt if save and not snapshots
+                                  else None,
+                                  time_order=2, space_order=self.space_order)
+            if snapshots:
+                kwargs['usave'] = kwargs.get('usave') or \
+                    snapshot_field('usave', self.model, self.geometry,
+                                   self.snapshot_factor, space_order=self.space_order)
 
         model = model or self.model
         # Pick vp from model unless explicitly provided
         kwargs.update(model.physical_params(**kwargs))
 
         # Execute operator and return wavefield and receiver data
-        summary = self.op_fwd(save).apply(src=src, rec=rec, u=u,
-                                          dt=kwargs.pop('dt', self.dt), **kwargs)
+        summary = self.op_fwd(save, nbatch, nfreq).apply(src=src, rec=rec, u=u,
+                                                         dt=kwargs.pop('dt', self.dt),
+                                                         **kwargs)
 
-        return rec, u, summary
+        if nfreq is not None:
+            return rec, (ufr, ufi, freq), summary
+        return rec, kwargs.get('usave', u), summary
 
     def adjoint(self, rec, srca=None, v=None, model=None, **kwargs):
         """
@@ -167,8 +236,12 @@ class AcousticWaveSolver(object):
         ----------
         rec : SparseTimeFunction
             Receiver data.
-        u : TimeFunction
-            Full wavefield `u` (created with save=True).
+        u : TimeFunction or tuple of Function
+            Full wavefield `u` (created with save=True), or its discrete Fourier
+            transform ``(ufr, ufi, freq)`` as returned by ``forward`` with
+            ``frequencies``. In the latter case, the gradient is computed in the
+            frequency domain and is, for a sufficient number of frequencies,
+            proportional to the time-domain one.
         v : TimeFunction, optional
             Stores the computed wavefield.
         grad : Function, optional
@@ -194,7 +267,13 @@ class AcousticWaveSolver(object):
         # Pick vp from model unless explicitly provided
         kwargs.update(model.physical_params(**kwargs))
 
-        if checkpointing:
+        if isinstance(u, tuple):
+            ufr, ufi, freq = u
+            summary = self.op_grad(nfreq=freq.shape[0]).apply(rec=rec, grad=grad, v=v,
+                                                              ufr=ufr, ufi=ufi,
+                                                              freq=freq, dt=dt,
+                                                              **kwargs)
+        elif checkpointing:
             u = TimeFunction(name='u', grid=self.model.grid,
                              time_order=2, space_order=self.space_order)
             cp = DevitoCheckpoint([u])
@@ -210,8 +289,9 @@ class AcousticWaveSolver(object):
             wrp.apply_forward()
             summary = wrp.apply_reverse()
         else:
-            summary = self.op_grad().apply(rec=rec, grad=grad, v=v, u=u, dt=dt,
-                                           **kwargs)
+            # The forward wavefield may have been saved subsampled in time
+            kwargs['usave' if self.snapshot_factor else 'u'] = u
+            summary = self.op_grad().apply(rec=rec, grad=grad, v=v, dt=dt, **kwargs)
         return grad, summary
 
     def jacobian(self, dmin, src=None, rec=None, u=None, U=None, model=None, **kwargs):
@@ -0,0 +1,241 @@
+import os
+import traceback
+from multiprocessing import get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from devito import Function
+
+__all__ = ['ShotScheduler', 'fwi_gradient_shot']
+
+
+class ShotScheduler(object):
+    """
+    A pool of local worker processes modelling independent shots concurrently.
+
+    Each worker builds its solver, hence its Operators, once, and then runs the
+    shots it picks up from a shared queue. The physical parameters are broadcast
+    to the workers, and the gradients reduced from them, through shared memory,
+    so that no Function is ever pickled.
+
+    Parameters
+    ----------
+    setup : callable
+        Picklable callable, such as a module-level function, returning a solver.
+        It is called once in each worker, as ``setup(**kwargs)``.
+    nworkers : int, optional
+        Number of worker processes. Defaults to the number of available cores.
+    pin : bool, optional
+        If True, each worker is pinned to a disjoint set of contiguous cores, and
+        runs its Operators with as many OpenMP threads. Defaults to True.
+    **kwargs
+        Passed to ``setup``.
+
+    Examples
+    --------
+    >>> from functools import partial
+    >>> from examples.seismic.acoustic import acoustic_setup
+    >>> setup = partial(acoustic_setup, shape=(101, 101), spacing=(10., 10.))
+
+    Each shot pairs its source position with the data observed in the true model,
+    while ``vp0`` is the current estimate of the velocity, here a constant one
+
+    >>> solver = setup()
+    >>> shots = []
+    >>> for x in np.linspace(0., solver.model.domain_size[0], num=4):
+    ...     solver.geometry.src_positions[0, 0] = x
+    ...     shots.append((solver.geometry.src_positions.copy(),
+    ...                   solver.forward()[0].data.copy()))
+    >>> vp0 = np.full_like(solver.model.vp.data, 1.5)
+    >>> with ShotScheduler(setup, nworkers=4) as scheduler:
+    ...     objective, grad = scheduler.run(fwi_gradient_shot, shots, vp=vp0)
+    >>> grad.shape == solver.model.vp.shape
+    True
+
+    Notes
+    -----
+    The workers are started with the 'spawn' method, rather than forked from a
+    process which may have initialized an OpenMP runtime already.
+    """
+
+    def __init__(self, setup, nworkers=None, pin=True, **kwargs):
+        cores = sorted(os.sched_getaffinity(0))
+        nworkers = nworkers or len(cores)
+        if pin:
+            chunks = [[int(j) for j in i] for i in np.array_split(cores, nworkers)
+                      if len(i) > 0]
+            nworkers = len(chunks)
+        else:
+            chunks = [None]*nworkers
+
+        ctx = get_context('spawn')
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._workers = [ctx.Process(target=_worker, daemon=True,
+                                     args=(rank, setup, kwargs, chunks[rank],
+                                           self._tasks, self._results))
+                         for rank in range(nworkers)]
+        for w in self._workers:
+            w.start()
+
+        # Wait for the solvers to be built, which tells the gradient layout
+        self._shms = {}
+        layouts = self._gather(nworkers)
+        shape, dtype = layouts[0]
+        self._grad = self._alloc('grad', (nworkers,) + shape, dtype)
+
+    @property
+    def nworkers(self):
+        return len(self._workers)
+
+    def _alloc(self, key, shape, dtype):
+        try:
+            shm, array = self._shms[key]
+            if array.shape == shape and array.dtype == dtype:
+                return array
+            shm.close()
+            shm.unlink()
+        except KeyError:
+            pass
+        nbytes = max(int(np.prod(shape))*np.dtype(dtype).itemsize, 1)
+        shm = SharedMemory(create=True, size=nbytes)
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        self._shms[key] = (shm, array)
+        return array
+
+    def _layout(self, key):
+        shm, array = self._shms[key]
+        return shm.name, array.shape, array.dtype
+
+    def _gather(self, nitems):
+        values = [None]*nitems
+        errors = []
+        for _ in range(nitems):
+            i, value, error = self._results.get()
+            if error is not None:
+                errors.append(error)
+            else:
+                values[i] = value
+        if errors:
+            raise RuntimeError("ShotScheduler worker failed:\n%s" % errors[0])
+        return values
+
+    def run(self, task, shots, **params):
+        """
+        Run a task over a set of shots.
+
+        Parameters
+        ----------
+        task : callable
+            Picklable callable, such as a module-level function, run by the
+            workers as ``task(solver, shot, grad)`` for each shot. It must
+            accumulate the shot's gradient, if any, into the zero-initialized
+            Function ``grad``, and return the shot's objective value.
+        shots : list
+            The picklable descriptions of the shots, e.g. source positions.
+        **params
+            The physical parameters, as ndarrays, to use for all shots, such
+            as ``vp``. They're set in the workers' models via ``Model.update``.
+
+        Returns
+        -------
+        The objective value and the gradient, as an ndarray, summed over the shots.
+        """
+        for k, v in params.items():
+            v = np.asarray(getattr(v, 'data', v))
+            self._alloc(k, v.shape, v.dtype)[:] = v
+        self._grad.fill(0)
+
+        layout = {'params': {k: self._layout(k) for k in params},
+                  'grad': self._layout('grad')}
+        for i, shot in enumerate(shots):
+            self._tasks.put((i, task, shot, layout))
+        objectives = self._gather(len(shots))
+
+        return sum(objectives), self._grad.sum(axis=0)
+
+    def close(self):
+        """Shut down the workers and release the shared memory."""
+        for _ in self._workers:
+            self._tasks.put(None)
+        for w in self._workers:
+            w.join()
+        for shm, _ in self._shms.values():
+            shm.close()
+            shm.unlink()
+        self._shms.clear()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _worker(rank, setup, kwargs, cores, tasks, results):
+    if cores:
+        os.sched_setaffinity(0, cores)
+        os.environ['OMP_NUM_THREADS'] = str(len(cores))
+
+    try:
+        solver = setup(**kwargs)
+        grad = Function(name='grad', grid=solver.model.grid)
+    except Exception:
+        results.put((rank, None, traceback.format_exc()))
+        return
+    results.put((rank, (grad.shape, grad.dtype), None))
+
+    shms = {}
+
+    def attach(name, shape, dtype):
+        try:
+            return shms[name][1]
+        except KeyError:
+            shm = SharedMemory(name=name)
+            # The segment is owned, hence eventually unlinked, by the scheduler
+            resource_tracker.unregister(shm._name, 'shared_memory')
+            shms[name] = (shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf))
+            return shms[name][1]
+
+    for i, task, shot, layout in iter(tasks.get, None):
+        try:
+            for k, v in layout['params'].items():
+                solver.model.update(k, attach(*v))
+            grad.data[:] = 0
+            objective = task(solver, shot, grad)
+            attach(*layout['grad'])[rank] += grad.data
+            results.put((i, objective, None))
+        except Exception:
+            results.put((i, None, traceback.format_exc()))
+
+    for shm, _ in shms.values():
+        shm.close()
+
+
+def fwi_gradient_shot(solver, shot, grad):
+    """
+    The FWI objective value and gradient of a single shot, for the acoustic solver.
+
+    Parameters
+    ----------
+    solver : AcousticWaveSolver
+        The solver, whose model holds the current physical parameters.
+    shot : tuple
+        The source position(s) and the observed data of the shot.
+    grad : Function
+        The gradient, into which this shot's is accumulated.
+    """
+    src_positions, d_obs = shot
+    geometry = solver.geometry
+    geometry.src_positions[:] = src_positions
+
+    # Synthetic data and full forward wavefield
+    d_syn, u0 = solver.forward(save=True)[0:2]
+
+    residual = geometry.new_rec(name='residual')
+    residual.data[:] = d_syn.data - d_obs
+    solver.jacobian_adjoint(residual, u0, grad=grad)
+
+    return .5*np.linalg.norm(residual.data)**2
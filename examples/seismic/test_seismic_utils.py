@@ -2,7 +2,8 @@ import pytest
 import numpy as np
 
 from devito import norm
-from examples.seismic import Model, setup_geometry, AcquisitionGeometry
+from examples.seismic import (Model, setup_geometry, AcquisitionGeometry,
+                              resolve_snapshot_factor)
 
 
 def not_bcs(bc):
@@ -95,3 +96,22 @@ def test_geom(shape):
 
     assert geometry.new_rec(name="bonjour").name == "bonjour"
     assert geometry.new_src(name="bonjour").name == "bonjour"
+
+
+def test_snapshot_factor():
+    shape = (21, 21)
+    vp = np.ones(shape)
+    model = Model((0, 0), (10, 10), shape, 4, vp, nbl=0)
+    geometry = setup_geometry(model, 500., f0=0.010)
+
+    assert resolve_snapshot_factor(None, geometry) is None
+    assert resolve_snapshot_factor(1, geometry) is None
+    assert resolve_snapshot_factor(4, geometry) == 4
+
+    # Nyquist rate of 3*f0
+    factor = resolve_snapshot_factor('auto', geometry.resample(geometry.dt / 4))
+    assert factor == int(1. / (6 * geometry.f0 * geometry.dt))
+    assert factor * geometry.dt <= 1. / (6 * geometry.f0)
+
+    with pytest.raises(ValueError):
+        resolve_snapshot_factor(0, geometry)
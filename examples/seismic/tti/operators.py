@@ -1,6 +1,6 @@
 from devito import (Eq, Operator, Function, TimeFunction, NODE, Inc, solve,
                     cos, sin, sqrt)
-from examples.seismic import PointSource, Receiver
+from examples.seismic import PointSource, Receiver, snapshot_field
 
 
 def second_order_stencil(model, u, v, H0, Hz, qu, qv, forward=True):
@@ -498,7 +498,7 @@ def kernel_staggered_3d(model, u, v, space_order, **kwargs):
 
 
 def ForwardOperator(model, geometry, space_order=4,
-                    save=False, kernel='centered', **kwargs):
+                    save=False, kernel='centered', snapshot_factor=None, **kwargs):
     """
     Construct an forward modelling operator in an tti media.
 
@@ -516,6 +516,10 @@ def ForwardOperator(model, geometry, space_order=4,
         Defaults to False.
     kernel : str, optional
         Type of discretization, centered or shifted
+    snapshot_factor : int, optional
+        If provided, the wavefields are not saved at every time step, but one
+        every ``snapshot_factor`` time steps, into the TimeFunctions ``usave``
+        and ``vsave`` created as in ``snapshot_field``.
     """
 
     dt = model.grid.time_dim.spacing
@@ -525,13 +529,12 @@ def ForwardOperator(model, geometry, space_order=4,
         stagg_u = stagg_v = NODE
     else:
         stagg_u = stagg_v = None
+    save_t = geometry.nt if save and not snapshot_factor else None
 
     # Create symbols for forward wavefield, source and receivers
-    u = TimeFunction(name='u', grid=model.grid, staggered=stagg_u,
-                     save=geometry.nt if save else None,
+    u = TimeFunction(name='u', grid=model.grid, staggered=stagg_u, save=save_t,
                      time_order=time_order, space_order=space_order)
-    v = TimeFunction(name='v', grid=model.grid, staggered=stagg_v,
-                     save=geometry.nt if save else None,
+    v = TimeFunction(name='v', grid=model.grid, staggered=stagg_v, save=save_t,
                      time_order=time_order, space_order=space_order)
     src = PointSource(name='src', grid=model.grid, time_range=geometry.time_axis,
                       npoint=geometry.nsrc)
@@ -548,6 +551,14 @@ def ForwardOperator(model, geometry, space_order=4,
     stencils += src.inject(field=v.forward, expr=expr)
     stencils += rec.interpolate(expr=u + v)
 
+    # Save the wavefield snapshots
+    if snapshot_factor:
+        usave = snapshot_field('usave', model, geometry, snapshot_factor,
+                               space_order=space_order)
+        vsave = snapshot_field('vsave', model, geometry, snapshot_factor,
+                               space_order=space_order)
+        stencils += [Eq(usave, u), Eq(vsave, v)]
+
     # Substitute spacing terms to reduce flops
     return Operator(stencils, subs=model.spacing_map, name='ForwardTTI', **kwargs)
 
@@ -666,7 +677,7 @@ def JacobianOperator(model, geometry, space_order=4,
 
 
 def JacobianAdjOperator(model, geometry, space_order=4,
-                        save=True, **kwargs):
+                        save=True, snapshot_factor=None, **kwargs):
     """
     Construct a linearized JacobianAdjoint modeling Operator in a TTI media.
 
@@ -681,16 +692,26 @@ def JacobianAdjOperator(model, geometry, space_order=4,
         Space discretization order.
     save : int or Buffer, optional
         Option to store the entire (unrolled) wavefield.
+    snapshot_factor : int, optional
+        If provided, the gradient is computed from the forward wavefields saved
+        one every ``snapshot_factor`` time steps, as by a ForwardOperator with the
+        same ``snapshot_factor``, and is rescaled accordingly.
     """
     dt = model.grid.stepping_dim.spacing
     m = model.m
     time_order = 2
 
     # Gradient symbol and wavefield symbols
-    u0 = TimeFunction(name='u0', grid=model.grid, save=geometry.nt if save
-                      else None, time_order=time_order, space_order=space_order)
-    v0 = TimeFunction(name='v0', grid=model.grid, save=geometry.nt if save
-                      else None, time_order=time_order, space_order=space_order)
+    if snapshot_factor:
+        u0 = snapshot_field('usave', model, geometry, snapshot_factor,
+                            space_order=space_order)
+        v0 = snapshot_field('vsave', model, geometry, snapshot_factor,
+                            space_order=space_order)
+    else:
+        u0 = TimeFunction(name='u0', grid=model.grid, save=geometry.nt if save
+                          else None, time_order=time_order, space_order=space_order)
+        v0 = TimeFunction(name='v0', grid=model.grid, save=geometry.nt if save
+                          else None, time_order=time_order, space_order=space_order)
 
     du = TimeFunction(name="du", grid=model.grid, save=None,
                       time_order=time_order, space_order=space_order)
@@ -706,7 +727,9 @@ def JacobianAdjOperator(model, geometry, space_order=4,
     FD_kernel = kernels[('centered', len(model.shape))]
     eqn = FD_kernel(model, du, dv, space_order, forward=False)
 
-    dm_update = Inc(dm, - (u0 * du.dt2 + v0 * dv.dt2))
+    # Only one every `snapshot_factor` time steps contributes to the gradient
+    w = snapshot_factor or 1
+    dm_update = Inc(dm, - w * (u0 * du.dt2 + v0 * dv.dt2))
 
     # Add expression for receiver injection
     rec_term = rec.inject(field=du.backward, expr=rec * dt**2 / m)
@@ -1,6 +1,7 @@
 # coding: utf-8
 from devito import Function, TimeFunction, warning, DevitoCheckpoint, CheckpointOperator
 from devito.tools import memoized_meth
+from examples.seismic import resolve_snapshot_factor, snapshot_field
 from examples.seismic.tti.operators import ForwardOperator, AdjointOperator
 from examples.seismic.tti.operators import JacobianOperator, JacobianAdjOperator
 from examples.seismic.tti.operators import particle_velocity_fields
@@ -22,13 +23,18 @@ class AnisotropicWaveSolver(object):
         receivers (SparseTimeFunction) and their position.
     space_order : int, optional
         Order of the spatial stencil discretisation. Defaults to 4.
+    snapshot_factor : int or str, optional
+        If provided, the wavefields saved by the forward modelling for the
+        gradient are subsampled in time, one every ``snapshot_factor`` time
+        steps. If 'auto', the factor is derived from the Nyquist rate of the
+        source.
 
     Notes
     -----
     space_order must be even and it is recommended to be a multiple of 4
     """
     def __init__(self, model, geometry, space_order=4, kernel='centered',
-                 **kwargs):
+                 snapshot_factor=None, **kwargs):
         self.model = model
         self.model._initialize_bcs(bcs="damp")
         self.geometry = geometry
@@ -43,6 +49,7 @@ class AnisotropicWaveSolver(object):
                     "but got %s" % space_order)
 
         self.space_order = space_order
+        self.snapshot_factor = resolve_snapshot_factor(snapshot_factor, geometry)
 
         # Cache compiler options
         self._kwargs = kwargs
@@ -56,6 +63,7 @@ class AnisotropicWaveSolver(object):
         """Cached operator for forward runs with buffered wavefield"""
         return ForwardOperator(self.model, save=save, geometry=self.geometry,
                                space_order=self.space_order, kernel=self.kernel,
+                               snapshot_factor=self.snapshot_factor if save else None,
                                **self._kwargs)
 
     @memoized_meth
@@ -75,7 +83,9 @@ class AnisotropicWaveSolver(object):
     def op_jacadj(self, save=True):
         """Cached operator for gradient runs"""
         return JacobianAdjOperator(self.model, save=save, geometry=self.geometry,
-                                   space_order=self.space_order, **self._kwargs)
+                                   space_order=self.space_order,
+                                   snapshot_factor=self.snapshot_factor if save
+                                   else None, **self._kwargs)
 
     def forward(self, src=None, rec=None, u=None, v=None, model=None,
                 save=False, **kwargs):
@@ -112,6 +122,12 @@ class AnisotropicWaveSolver(object):
         Returns
         -------
         Receiver, wavefield and performance summary.
+
+        Notes
+        -----
+        If the solver has a ``snapshot_factor`` and ``save`` is set, the returned
+        wavefields are the subsampled ``usave`` and ``vsave`` rather than ``u``
+        and ``v``.
         """
         if self.kernel == 'staggered':
             time_order = 1
@@ -126,18 +142,25 @@ class AnisotropicWaveSolver(object):
         # Create a new receiver object to store the result
         rec = rec or self.geometry.rec
 
+        snapshots = save and self.snapshot_factor
+        save_t = self.geometry.nt if save and not snapshots else None
+
         # Create the forward wavefield if not provided
         if u is None:
             u = TimeFunction(name='u', grid=self.model.grid, staggered=stagg_u,
-                             save=self.geometry.nt if save else None,
-                             time_order=time_order,
+                             save=save_t, time_order=time_order,
                              space_order=self.space_order)
         # Create the forward wavefield if not provided
         if v is None:
             v = TimeFunction(name='v', grid=self.model.grid, staggered=stagg_v,
-                             save=self.geometry.nt if save else None,
-                             time_order=time_order,
+                             save=save_t, time_order=time_order,
                              space_order=self.space_order)
+        # Create the wavefield snapshots if not provided
+        if snapshots:
+            for name in ['usave', 'vsave']:
+                kwargs[name] = kwargs.get(name) or \
+                    snapshot_field(name, self.model, self.geometry,
+                                   self.snapshot_factor, space_order=self.space_order)
 
         if self.kernel == 'staggered':
             vx, vz, vy = particle_velocity_fields(self.model, self.space_order)
@@ -154,6 +177,8 @@ class AnisotropicWaveSolver(object):
         # Execute operator and return wavefield and receiver data
         summary = self.op_fwd(save).apply(src=src, rec=rec, u=u, v=v,
                                           dt=kwargs.pop('dt', self.dt), **kwargs)
+        if snapshots:
+            return rec, kwargs['usave'], kwargs['vsave'], summary
         return rec, u, v, summary
 
     def adjoint(self, rec, srca=None, p=None, r=None, model=None,
@@ -367,6 +392,11 @@ class AnisotropicWaveSolver(object):
             wrp.apply_forward()
             summary = wrp.apply_reverse()
         else:
-            summary = self.op_jacadj().apply(rec=rec, dm=dm, u0=u0, v0=v0, du=du, dv=dv,
-                                             dt=dt, **kwargs)
+            # The forward wavefields may have been saved subsampled in time
+            if self.snapshot_factor:
+                kwargs.update({'usave': u0, 'vsave': v0})
+            else:
+                kwargs.update({'u0': u0, 'v0': v0})
+            summary = self.op_jacadj().apply(rec=rec, dm=dm, du=du, dv=dv, dt=dt,
+                                             **kwargs)
         return dm, summary
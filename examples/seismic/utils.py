@@ -1,12 +1,14 @@
 import numpy as np
 from argparse import Action, ArgumentError, ArgumentParser
 
-from devito import error, configuration, warning
+from devito import (ConditionalDimension, TimeFunction, error, configuration,
+                    warning)
 from devito.tools import Pickable
 
 from .source import *
 
-__all__ = ['AcquisitionGeometry', 'setup_geometry', 'seismic_args']
+__all__ = ['AcquisitionGeometry', 'setup_geometry', 'seismic_args',
+           'resolve_snapshot_factor', 'snapshot_field']
 
 
 def setup_geometry(model, tn, f0=0.010):
@@ -183,6 +185,63 @@ class AcquisitionGeometry(Pickable):
 sources = {'Wavelet': WaveletSource, 'Ricker': RickerSource, 'Gabor': GaborSource}
 
 
+def resolve_snapshot_factor(factor, geometry):
+    """
+    The time subsampling factor of the wavefield snapshots.
+
+    Parameters
+    ----------
+    factor : int or str
+        The subsampling factor, or 'auto' to sample at the Nyquist rate of the
+        source, whose spectrum is deemed negligible beyond three times its peak
+        frequency.
+    geometry : AcquisitionGeometry
+        The acquisition geometry, providing the peak frequency and time step.
+
+    Returns
+    -------
+    The subsampling factor, or None if the wavefield isn't to be subsampled.
+    """
+    if factor == 'auto':
+        if geometry.f0 is None:
+            raise ValueError("Cannot derive the snapshot factor without a peak "
+                             "frequency `f0`")
+        factor = int(1. / (2 * 3 * geometry.f0 * geometry.dt))
+    elif factor is not None and int(factor) < 1:
+        raise ValueError("The snapshot factor must be a positive integer")
+
+    if factor is None or int(factor) <= 1:
+        return None
+    return int(factor)
+
+
+def snapshot_field(name, model, geometry, factor, **kwargs):
+    """
+    A TimeFunction storing one every `factor` time steps of a wavefield, that is
+    ``Eq(snapshot_field(...), u)`` saves the snapshots of `u`.
+
+    Parameters
+    ----------
+    name : str
+        Name of the TimeFunction.
+    model : Model
+        Object containing the physical parameters.
+    geometry : AcquisitionGeometry
+        The acquisition geometry, providing the number of time steps.
+    factor : int
+        The subsampling factor.
+    **kwargs
+        Forwarded to TimeFunction.
+    """
+    time_sub = ConditionalDimension(name='t_sub', parent=model.grid.time_dim,
+                                    factor=factor)
+    nsnaps = (geometry.nt + factor - 1) // factor
+
+    kwargs.setdefault('time_order', 2)
+    return TimeFunction(name=name, grid=model.grid, save=nsnaps, time_dim=time_sub,
+                        **kwargs)
+
+
 def seismic_args(description):
     """
     Command line options for the seismic examples
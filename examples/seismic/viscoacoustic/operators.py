@@ -3,7 +3,7 @@ import numpy as np
 
 from devito import (Eq, Operator, VectorTimeFunction, TimeFunction, Function, NODE,
                     div, grad, solve)
-from examples.seismic import PointSource, Receiver
+from examples.seismic import PointSource, Receiver, snapshot_field
 
 
 def src_rec(p, model, geometry, **kwargs):
@@ -482,7 +482,7 @@ def maxwell(model, geometry, p, forward=True, **kwargs):
 
 
 def ForwardOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
-                    save=False, **kwargs):
+                    save=False, snapshot_factor=None, **kwargs):
     """
     Construct method for the forward modelling operator in a viscoacoustic medium.
 
@@ -507,8 +507,14 @@ def ForwardOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
     save : int or Buffer
         Saving flag, True saves all time steps, False saves three buffered
         indices (last three time steps). Defaults to False.
+    snapshot_factor : int, optional
+        If provided, the wavefield is not saved at every time step. Instead, the
+        time derivative of the pressure, which is all the gradient requires, is
+        saved one every ``snapshot_factor`` time steps into the TimeFunction
+        ``pdtsave`` created as in ``snapshot_field``.
     """
     # Create symbols for forward wavefield, particle velocity, source and receivers
+    save = save and not snapshot_factor
     save_t = geometry.nt if save else None
 
     if time_order == 1:
@@ -525,8 +531,16 @@ def ForwardOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
 
     src_term, rec_term = src_rec(p, model, geometry)
 
+    # Save the wavefield snapshots. The time derivative reads `p.forward`, so
+    # it's taken once the source has been injected into it
+    save_term = []
+    if snapshot_factor:
+        pdtsave = snapshot_field('pdtsave', model, geometry, snapshot_factor,
+                                 space_order=space_order, staggered=NODE)
+        save_term = [Eq(pdtsave, p.dt)]
+
     # Substitute spacing terms to reduce flops
-    return Operator(eqn + src_term + rec_term, subs=model.spacing_map,
+    return Operator(eqn + src_term + rec_term + save_term, subs=model.spacing_map,
                     name='Forward', **kwargs)
 
 
@@ -572,7 +586,7 @@ def AdjointOperator(model, geometry, space_order=4, kernel='SLS', time_order=2,
 
 
 def GradientOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
-                     save=True, **kwargs):
+                     save=True, snapshot_factor=None, **kwargs):
     """
     Construct a gradient operator in an acoustic media.
 
@@ -595,13 +609,23 @@ def GradientOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
         kv - Ren et al. (2014) viscoacoustic equation
         maxwell - Deng and McMechan (2007) viscoacoustic equation
         Defaults to sls 2nd order.
+    snapshot_factor : int, optional
+        If provided, the gradient is computed from the time derivative of the
+        pressure saved one every ``snapshot_factor`` time steps, as by a
+        ForwardOperator with the same ``snapshot_factor``, and is rescaled
+        accordingly.
     """
     # Gradient symbol and wavefield symbols
     save_t = geometry.nt if save else None
 
     grad = Function(name='grad', grid=model.grid)
-    p = TimeFunction(name='p', grid=model.grid, time_order=time_order,
-                     space_order=space_order, save=save_t, staggered=NODE)
+    if snapshot_factor:
+        pdt = snapshot_field('pdtsave', model, geometry, snapshot_factor,
+                             space_order=space_order, staggered=NODE)
+    else:
+        p = TimeFunction(name='p', grid=model.grid, time_order=time_order,
+                         space_order=space_order, save=save_t, staggered=NODE)
+        pdt = p.dt
     pa = TimeFunction(name='pa', grid=model.grid, time_order=time_order,
                       space_order=space_order, staggered=NODE)
 
@@ -614,10 +638,12 @@ def GradientOperator(model, geometry, space_order=4, kernel='sls', time_order=2,
     eq_kernel = kernels[kernel]
     eqn = eq_kernel(model, geometry, pa, forward=False, save=False, **kwargs)
 
+    # Only one every `snapshot_factor` time steps contributes to the gradient
+    w = snapshot_factor or 1
     if time_order == 1:
-        gradient_update = Eq(grad, grad - p.dt * pa)
+        gradient_update = Eq(grad, grad - w * pdt * pa)
     else:
-        gradient_update = Eq(grad, grad + p.dt * pa.dt)
+        gradient_update = Eq(grad, grad + w * pdt * pa.dt)
 
     # Add expression for receiver injection
     _, recterm = src_rec(pa, model, geometry, forward=False)
@@ -1,7 +1,7 @@
 from devito import (VectorTimeFunction, TimeFunction, Function, NODE,
                     DevitoCheckpoint, CheckpointOperator)
 from devito.tools import memoized_meth
-from examples.seismic import PointSource
+from examples.seismic import PointSource, resolve_snapshot_factor, snapshot_field
 from examples.seismic.viscoacoustic.operators import (
     ForwardOperator, AdjointOperator, GradientOperator, BornOperator
 )
@@ -31,9 +31,14 @@ class ViscoacousticWaveSolver(object):
                 'kv' - Ren et al. (2014) viscoacoustic equation
                 'maxwell' - Deng and McMechan (2007) viscoacoustic equation
                 Defaults to 'sls' 2nd order.
+    snapshot_factor : int or str, optional
+        If provided, the forward modelling saves for the gradient the time
+        derivative of the wavefield, subsampled in time, one every
+        ``snapshot_factor`` time steps. If 'auto', the factor is derived from the
+        Nyquist rate of the source.
     """
     def __init__(self, model, geometry, space_order=4, kernel='sls', time_order=2,
-                 **kwargs):
+                 snapshot_factor=None, **kwargs):
         self.model = model
         self.model._initialize_bcs(bcs="mask")
         self.geometry = geometry
@@ -41,6 +46,7 @@ class ViscoacousticWaveSolver(object):
         self.space_order = space_order
         self.kernel = kernel
         self.time_order = time_order
+        self.snapshot_factor = resolve_snapshot_factor(snapshot_factor, geometry)
         self._kwargs = kwargs
 
     @property
@@ -52,7 +58,9 @@ class ViscoacousticWaveSolver(object):
         """Cached operator for forward runs with buffered wavefield"""
         return ForwardOperator(self.model, save=save, geometry=self.geometry,
                                space_order=self.space_order, kernel=self.kernel,
-                               time_order=self.time_order, **self._kwargs)
+                               time_order=self.time_order,
+                               snapshot_factor=self.snapshot_factor if save else None,
+                               **self._kwargs)
 
     @memoized_meth
     def op_adj(self):
@@ -66,7 +74,9 @@ class ViscoacousticWaveSolver(object):
         """Cached operator for gradient runs"""
         return GradientOperator(self.model, save=save, geometry=self.geometry,
                                 space_order=self.space_order, kernel=self.kernel,
-                                time_order=self.time_order, **self._kwargs)
+                                time_order=self.time_order,
+                                snapshot_factor=self.snapshot_factor if save else None,
+                                **self._kwargs)
 
     @memoized_meth
     def op_born(self):
@@ -107,6 +117,11 @@ class ViscoacousticWaveSolver(object):
         Returns
         -------
         Receiver, wavefield and performance summary
+
+        Notes
+        -----
+        If the solver has a ``snapshot_factor`` and ``save`` is set, the returned
+        wavefield is the subsampled time derivative ``pdtsave`` rather than ``p``.
         """
         # Source term is read-only, so re-use the default
         src = src or self.geometry.src
@@ -115,7 +130,13 @@ class ViscoacousticWaveSolver(object):
         rec = rec or self.geometry.rec
 
         # Create all the fields v, p, r
-        save_t = src.nt if save else None
+        snapshots = save and self.snapshot_factor
+        save_t = src.nt if save and not snapshots else None
+        if snapshots:
+            kwargs['pdtsave'] = kwargs.get('pdtsave') or \
+                snapshot_field('pdtsave', self.model, self.geometry,
+                               self.snapshot_factor, space_order=self.space_order,
+                               staggered=NODE)
 
         if self.time_order == 1:
             v = v or VectorTimeFunction(name="v", grid=self.model.grid, save=save_t,
@@ -147,7 +168,7 @@ class ViscoacousticWaveSolver(object):
             # Without Memory variable
             summary = self.op_fwd(save).apply(src=src, rec=rec, p=p,
                                               dt=kwargs.pop('dt', self.dt), **kwargs)
-        return rec, p, v, summary
+        return rec, kwargs.get('pdtsave', p), v, summary
 
     def adjoint(self, rec, srca=None, va=None, pa=None, r=None, model=None, **kwargs):
         """
@@ -316,7 +337,9 @@ class ViscoacousticWaveSolver(object):
                                   time_order=self.time_order,
                                   space_order=self.space_order, staggered=NODE)
 
-            summary = self.op_grad().apply(rec=rec, grad=grad, pa=pa, p=p, r=r, dt=dt,
+            # The forward wavefield may have been saved subsampled in time
+            kwargs['pdtsave' if self.snapshot_factor else 'p'] = p
+            summary = self.op_grad().apply(rec=rec, grad=grad, pa=pa, r=r, dt=dt,
                                            **kwargs)
 
         return grad, summary
@@ -1,12 +1,16 @@
+import weakref
+
 import pytest
 import numpy as np
 from scipy.ndimage import gaussian_filter
 from scipy import misc
 
 from conftest import skipif
-from devito import ConditionalDimension, Grid, Function, TimeFunction, switchconfig
+from devito import (ConditionalDimension, Grid, Function, TimeFunction, clear_cache,
+                    switchconfig)
 from devito.builtins import (assign, norm, gaussian_smooth, initialize_function,
-                             inner, mmin, mmax, sum, sumall)
+                             inner, mmin, mmax, reduce_many, sum, sumall)
+from devito.builtins.utils import builtins_cache
 from devito.data import LEFT, RIGHT
 from devito.tools import as_tuple
 from devito.types import SubDomain, SparseTimeFunction
@@ -452,6 +456,114 @@ class TestBuiltinsResult(object):
         term2 = mmax(rec0)
         assert np.isclose(term1/term2 - 1, 0.0, rtol=0.0, atol=1e-5)
 
+    def test_reduce_many(self):
+        """
+        Test that reduce_many matches the individual reductions
+        """
+        grid = Grid((11, 11))
+
+        f = Function(name='f', grid=grid)
+        g = TimeFunction(name='g', grid=grid)
+        f.data[:] = np.random.randn(*f.shape)
+        g.data[:] = np.random.randn(*g.shape)
+
+        rec = SparseTimeFunction(name='rec', grid=grid, nt=11, npoint=5)
+        rec.data[:] = 1 + np.random.rand(*rec.shape)
+        rec.coordinates.data[:] = np.random.rand(*rec.coordinates.shape)
+
+        expected = [norm(f), inner(f, f), sumall(g), norm(g, order=1),
+                    mmin(f), mmax(g), norm(rec), sumall(rec)]
+        reductions = [('norm', f), ('inner', f, f), ('sumall', g), ('norm', g, 1),
+                      ('mmin', f), ('mmax', g), ('norm', rec), ('sumall', rec)]
+
+        assert np.allclose(reduce_many(reductions), expected, rtol=1e-5)
+
+        futures = reduce_many(reductions, asynchronous=True)
+        assert np.allclose([i.result() for i in futures], expected, rtol=1e-5)
+
+        with pytest.raises(ValueError):
+            reduce_many([('norm', f), ('norm', Function(name='h', grid=Grid((3, 3))))])
+
+    def test_reduce_many_time_ranges(self):
+        """
+        Test that reduce_many restricts the time range of buffered TimeFunctions
+        only, not that of the SparseTimeFunctions reduced alongside them
+        """
+        grid = Grid((11, 11))
+
+        g = TimeFunction(name='g', grid=grid)
+        g.data[:] = np.random.randn(*g.shape)
+        u = TimeFunction(name='u', grid=grid, time_order=2)
+        u.data[:] = np.random.randn(*u.shape)
+
+        rec = SparseTimeFunction(name='rec', grid=grid, nt=11, npoint=5)
+        rec.data[:] = 1 + np.random.rand(*rec.shape)
+        rec.coordinates.data[:] = np.random.rand(*rec.coordinates.shape)
+
+        expected = [sumall(g), norm(rec), norm(u), sumall(rec)]
+        reductions = [('sumall', g), ('norm', rec), ('norm', u), ('sumall', rec)]
+
+        assert np.allclose(reduce_many(reductions), expected, rtol=1e-5)
+
+    def test_operator_cache(self):
+        """
+        Test that the builtins reuse their Operators across Functions with the
+        same signature, and that the number of cached Operators is bounded
+        """
+        builtins_cache.clear()
+
+        grid = Grid((11, 11))
+
+        f = Function(name='f', grid=grid)
+        g = Function(name='g', grid=grid)
+        h = Function(name='h', grid=grid, dtype=np.float64)
+        f.data[:] = np.random.randn(*f.shape)
+        g.data[:] = np.random.randn(*g.shape)
+        h.data[:] = np.random.randn(*h.shape)
+
+        assert np.isclose(norm(f), np.linalg.norm(f.data), rtol=1e-5)
+        assert np.isclose(norm(g), np.linalg.norm(g.data), rtol=1e-5)
+        assert len(builtins_cache) == 1
+
+        # A different data type requires a different Operator
+        assert np.isclose(norm(h), np.linalg.norm(h.data), rtol=1e-10)
+        assert len(builtins_cache) == 2
+
+        # `inner(f, f)` and `inner(f, g)` bind a different number of Functions
+        assert np.isclose(inner(f, g), np.sum(f.data*g.data), rtol=1e-5)
+        assert np.isclose(inner(g, f), np.sum(f.data*g.data), rtol=1e-5)
+        assert np.isclose(inner(f, f), np.linalg.norm(f.data)**2, rtol=1e-5)
+        assert len(builtins_cache) == 4
+
+        # Operators over SparseFunctions aren't cached
+        rec = SparseTimeFunction(name='rec', grid=grid, nt=11, npoint=5)
+        rec.data[:] = 1.
+        rec.coordinates.data[:] = 0.5
+        assert np.isclose(sumall(rec), 55.)
+        assert len(builtins_cache) == 4
+
+        maxsize = builtins_cache.maxsize
+        try:
+            builtins_cache.maxsize = 2
+
+            assign(f, 1)
+            assign(g, 1)
+            assert len(builtins_cache) == 2
+            assert np.all(f.data == 1)
+            assert np.all(g.data == 1)
+
+            assert np.isclose(sumall(h), np.sum(h.data), rtol=1e-10)
+            assert len(builtins_cache) == 2
+        finally:
+            builtins_cache.maxsize = maxsize
+
+        # The cached Operators must not keep the user Functions alive
+        refs = [weakref.ref(i) for i in (f, g, h)]
+        del f, g, h
+        clear_cache()
+        assert all(i() is None for i in refs)
+        assert len(builtins_cache) == 2
+
     def test_issue_1860(self):
         grid = Grid(shape=(401, 301, 181))
 
@@ -8,7 +8,8 @@ import pytest
 from devito import (Grid, Function, TimeFunction, SparseFunction, SparseTimeFunction,
                     ConditionalDimension, SubDimension, Constant, Operator, Eq, Dimension,
                     DefaultDimension, _SymbolCache, clear_cache, solve, VectorFunction,
-                    TensorFunction, TensorTimeFunction, VectorTimeFunction)
+                    TensorFunction, TensorTimeFunction, VectorTimeFunction,
+                    CacheManager)
 from devito.types import (DeviceID, NThreadsBase, NPThreads, Object, LocalObject,
                           Scalar, Symbol, ThreadID)
 
@@ -608,6 +609,48 @@ class TestCaching(object):
         clear_cache()
         assert len(_SymbolCache) == cache_size - 1
 
+    def test_clear_cache_incremental(self, operate_on_empty_cache):
+        """
+        Test that `clear_cache(force=False)` evicts the dead objects without
+        wiping out the SymPy caches, and that the counters are updated.
+        """
+        grid = Grid(shape=(4, 4))
+
+        stats = CacheManager.stats()
+        f = Function(name='f', grid=grid)
+        assert CacheManager.stats()['nbytes'] == stats['nbytes'] + f.nbytes
+
+        cache_size = len(_SymbolCache)
+        s = Scalar(name='s')
+        assert len(_SymbolCache) == cache_size + 1
+
+        stats = CacheManager.stats()
+        del s
+        CacheManager.clear(force=False)
+
+        assert len(_SymbolCache) == cache_size
+        stats1 = CacheManager.stats()
+        assert stats1['evictions'] == stats['evictions'] + 1
+        assert stats1['nsympy_clears'] == stats['nsympy_clears']
+
+    def test_clear_cache_memory_budget(self, operate_on_empty_cache):
+        """
+        Test that allocating more than `gc_ths` bytes triggers garbage collection.
+        """
+        grid = Grid(shape=(4, 4))
+
+        gc_ths = CacheManager.gc_ths
+        try:
+            CacheManager.gc_ths = 10
+            CacheManager.clear(force=False)
+            ncollections = CacheManager.stats()['ncollections']
+
+            f = Function(name='f', grid=grid)
+            f.data  # Allocation calls `clear_cache(force=False)`
+            assert CacheManager.stats()['ncollections'] == ncollections + 1
+        finally:
+            CacheManager.gc_ths = gc_ths
+
     def test_sparse_function(self, operate_on_empty_cache):
         """Test caching of SparseFunctions and children objects."""
         grid = Grid(shape=(3, 3))
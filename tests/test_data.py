@@ -1,3 +1,6 @@
+from functools import partial
+import weakref
+
 import pytest
 import numpy as np
 
@@ -7,6 +10,7 @@ from devito.data import LEFT, RIGHT, Decomposition, loc_data_idx, convert_index
 from devito.tools import as_tuple
 from devito.types import Scalar
 from devito.data.allocators import ExternalAllocator
+from devito.mpi import MPI
 
 
 class TestDataBasic(object):
@@ -206,6 +210,30 @@ class TestDataBasic(object):
         sf.data[1:-1, 0] = np.arange(8)
         assert np.all(sf.data[1:-1, 0] == np.arange(8))
 
+    def test_version(self):
+        """
+        Test that writes through any view are tracked by the modification counter.
+        """
+        grid = Grid(shape=(4, 4))
+        u = Function(name='u', grid=grid)
+
+        version = u.data._version
+        assert u.data_with_halo._version is version
+        assert u.data[1:3]._version is version
+
+        value = version.value
+        u.data[1:3, 2] = 1.
+        assert version.value > value
+
+        value = version.value
+        u.data[1:3][0, 0] = 2.
+        assert version.value > value
+
+        # Reads don't count as modifications
+        value = version.value
+        assert u.data[1, 1] == 0.
+        assert version.value == value
+
 
 class TestLocDataIDX(object):
     """
@@ -1473,6 +1501,60 @@ class TestDataGather(object):
             assert ans == np.array(None)
 
 
+class TestDataSaveLoad(object):
+
+    @pytest.mark.parametrize('direct', [False, True])
+    def test_save_load(self, tmpdir, direct):
+        grid = Grid(shape=(10, 12, 14))
+        f = TimeFunction(name='f', grid=grid, space_order=2)
+        f.data[:] = np.random.rand(*f.shape)
+
+        path = str(tmpdir.join('f'))
+        f.data_save(path, direct=direct)
+
+        # Different halo sizes are irrelevant, as only the domain is stored
+        g = TimeFunction(name='g', grid=grid, space_order=4)
+        g.data_load(path)
+        assert np.all(g.data == f.data)
+
+    def test_load_mismatching_shape(self, tmpdir):
+        f = Function(name='f', grid=Grid(shape=(10, 10)))
+        path = str(tmpdir.join('f'))
+        f.data_save(path)
+
+        g = Function(name='g', grid=Grid(shape=(10, 11)))
+        with pytest.raises(ValueError):
+            g.data_load(path)
+
+    @pytest.mark.parallel(mode=4)
+    def test_save_load_redistributed(self, tmpdir):
+        """
+        Test loading sharded data onto a different decomposition and onto a
+        different number of ranks.
+        """
+        grid = Grid(shape=(10, 12))
+        f = Function(name='f', grid=grid, space_order=1)
+        dat = np.arange(120, dtype=np.float32).reshape(grid.shape)
+        f.data[:] = dat
+
+        comm = grid.distributor.comm
+        path = comm.bcast(str(tmpdir.join('f')), root=0)
+        f.data_save(path)
+
+        # Same number of ranks, different topology
+        grid1 = Grid(shape=(10, 12), topology=(4, 1))
+        g = Function(name='g', grid=grid1, space_order=2)
+        g.data_load(path)
+        x = grid1.dimensions[0]
+        assert np.all(g.data._local == dat[grid1.distributor.glb_slices[x]])
+
+        # A single rank reading all shards
+        grid2 = Grid(shape=(10, 12), comm=MPI.COMM_SELF)
+        h = Function(name='h', grid=grid2)
+        h.data_load(path)
+        assert np.all(h.data == dat)
+
+
 def test_scalar_arg_substitution():
     """
     Tests the relaxed (compared to other devito sympy subclasses)
@@ -1544,6 +1626,77 @@ def test_external_allocator():
     assert(np.array_equal(f.data, numpy_array))
 
 
+class Producer(object):
+
+    """A minimal DLPack producer, as e.g. a PyTorch CPU tensor."""
+
+    def __init__(self, export):
+        self.export = export
+
+    def __dlpack__(self, stream=None):
+        return self.export()
+
+    def __dlpack_device__(self):
+        return (1, 0)
+
+
+@pytest.mark.parametrize('region', ['domain', 'inhalo', 'outhalo', 'allocated'])
+def test_to_dlpack(region):
+    grid = Grid(shape=(4, 5))
+    f = Function(name='f', grid=grid, space_order=2)
+    f.data[:] = np.arange(20).reshape(4, 5)
+
+    view = np.from_dlpack(f)
+    assert np.all(view == f.data)
+
+    # Zero-copy, and consistent with the advertised layout
+    f._is_halo_dirty = False
+    view = np.from_dlpack(Producer(partial(f.to_dlpack, region)))
+    assert f._is_halo_dirty
+    mask = tuple(slice(i.offset, i.offset + i.size) for i in f.data_regions[region])
+    assert view.shape == f._data_allocated[mask].shape
+    assert np.all(view == f._data_allocated[mask])
+    assert np.may_share_memory(view, f._data_allocated)
+
+    # The data outlives the Function
+    ref = weakref.ref(f._data)
+    del f
+    assert ref() is not None
+    assert view.sum() == 190
+
+
+def test_from_external():
+    grid = Grid(shape=(4, 4))
+    array = np.arange(64, dtype=np.float32).reshape(8, 8)
+
+    # NumPy imports DLPack buffers as read-only unless told otherwise by the
+    # producer, so adopting them requires an explicit opt-in
+    producer = Producer(array.__dlpack__)
+    if not np.from_dlpack(producer).flags.writeable:
+        with pytest.raises(ValueError):
+            Function.from_external(producer, name='f', grid=grid, space_order=2)
+
+    f = Function.from_external(producer, name='f', grid=grid, space_order=2,
+                               writeable=True)
+
+    # The external data is adopted, without any copy
+    assert np.all(f.data == array[2:-2, 2:-2])
+    f.data[:] = -1.
+    assert np.all(array[2:-2, 2:-2] == -1.)
+    assert f._data_alignment <= 64
+    assert array.ctypes.data % f._data_alignment == 0
+
+    # The external data is kept alive
+    ref = weakref.ref(array)
+    del array
+    assert ref() is not None
+
+    # Non C-contiguous buffers can't be adopted
+    with pytest.raises(ValueError):
+        Function.from_external(np.zeros((8, 16), dtype=np.float32)[:, ::2],
+                               name='g', grid=grid, space_order=2)
+
+
 def test_boolean_masking_array():
     """
     Test truth value of array, raised in Python 3.9 (MFE for issue #1788)
@@ -2685,6 +2685,38 @@ class TestAliases(object):
         # Make sure it compiles
         op.cfunction
 
+    def test_invariants_with_free_time(self):
+        """
+        A space invariant using `time` as a free symbol, but not as an index
+        (e.g., an on-the-fly DFT), must not be lifted out of the time loop.
+        """
+        grid = Grid(shape=(4, 4))
+        x, y = grid.dimensions
+        time = grid.time_dim
+
+        fd = Dimension(name='fd')
+        freq = Function(name='freq', dimensions=(fd,), shape=(3,))
+        freq.data[:] = [1., 2., 3.]
+        uf = Function(name='uf', grid=grid, dimensions=(x, y, fd), shape=(4, 4, 3))
+        u = TimeFunction(name='u', grid=grid, save=5)
+        src = SparseTimeFunction(name='src', grid=grid, npoint=1, nt=5)
+        src.coordinates.data[:] = 0.5
+        src.data[:] = 1.
+
+        eqns = [Eq(u.forward, u + 1),
+                Inc(uf, u*cos(time*freq))]
+        eqns += src.inject(field=u.forward, expr=src)
+
+        op = Operator(eqns, opt='advanced')
+        assert_structure(op, ['t,fd', 't,x,y', 't,x,y,fd', 't,p_src'],
+                         't,fd,x,y,fd,p_src')
+
+        op.apply(time_M=3)
+
+        expected = np.sum([u.data[i, 0, 0]*np.cos(i*freq.data) for i in range(4)],
+                          axis=0)
+        assert np.allclose(uf.data[0, 0], expected, rtol=1e-5)
+
     def test_hoisting_pow_one(self):
         """
         MFE for issue #1614.
@@ -2798,7 +2830,7 @@ class TestIsoAcoustic(object):
         bns, _ = assert_blocking(op1, {'x0_blk0'})  # due to loop blocking
 
         assert summary0[('section0', None)].ops == 50
-        assert summary0[('section1', None)].ops == 148
+        assert summary0[('section1', None)].ops == 95
         assert np.isclose(summary0[('section0', None)].oi, 2.851, atol=0.001)
 
         assert summary1[('section0', None)].ops == 31
@@ -1,15 +1,20 @@
+from functools import partial
+
 import numpy as np
 import pytest
 from numpy import linalg
 
 from conftest import skipif
 from devito import Function, info, TimeFunction, Operator, Eq, smooth
+from devito.ir.iet import FindNodes, Iteration
 from devito.parameters import switchconfig
-from examples.seismic.acoustic import acoustic_setup as iso_setup
+from examples.seismic.acoustic import acoustic_setup as iso_setup, AcousticWaveSolver
 from examples.seismic.acoustic.operators import iso_stencil
-from examples.seismic import Receiver, demo_model, setup_geometry
-from examples.seismic.tti import tti_setup
-from examples.seismic.viscoacoustic import viscoacoustic_setup
+from examples.seismic import (AcquisitionGeometry, Receiver, demo_model, setup_geometry,
+                              ShotScheduler, fwi_gradient_shot)
+from examples.seismic.tti import tti_setup, AnisotropicWaveSolver
+from examples.seismic.viscoacoustic import (viscoacoustic_setup,
+                                            ViscoacousticWaveSolver)
 
 
 class TestGradient(object):
@@ -300,6 +305,235 @@ class TestGradient(object):
         assert np.isclose(p1[0], 1.0, rtol=0.1)
         assert np.isclose(p2[0], 2.0, rtol=0.1)
 
+    @pytest.mark.parametrize('shape, spacing', [((70, 80), (10., 10.))])
+    def test_gradient_dft(self, shape, spacing):
+        """
+        This test ensures that the Fourier transform of the wavefield accumulated
+        on-the-fly by the forward Operator matches the one computed from the
+        saved wavefield, and that the resulting frequency-domain gradient
+        correlates with the time-domain one.
+        """
+        wave = iso_setup(shape=shape, spacing=spacing, space_order=4, nbl=40)
+        frequencies = np.linspace(0.002, 0.03, 15)
+
+        v0 = Function(name='v0', grid=wave.model.grid, space_order=4)
+        smooth(v0, wave.model.vp)
+
+        rec = wave.forward()[0]
+
+        u0 = TimeFunction(name='u', grid=wave.model.grid, save=wave.geometry.nt,
+                          time_order=2, space_order=4)
+        rec0, (ufr, ufi, freq) = wave.forward(vp=v0, u=u0, save=True,
+                                              frequencies=frequencies)[0:2]
+        assert np.all(freq.data == frequencies.astype(freq.dtype))
+
+        # The Operator accumulates over all timesteps but the first and last one
+        times = np.arange(1, wave.geometry.nt - 1)*wave.dt
+        phase = 2*np.pi*np.outer(times, frequencies)
+        udata = np.asarray(u0.data[1:-1], dtype=np.float64)
+        expected = np.tensordot(udata, np.exp(-1j*phase), axes=(0, 0))
+        atol = 1e-5*np.abs(expected).max()
+        assert np.allclose(ufr.data, expected.real, rtol=1e-5, atol=atol)
+        assert np.allclose(ufi.data, expected.imag, rtol=1e-5, atol=atol)
+
+        residual = Receiver(name='rec', grid=wave.model.grid, data=rec0.data - rec.data,
+                            time_range=wave.geometry.time_axis,
+                            coordinates=wave.geometry.rec_positions)
+
+        grad = wave.jacobian_adjoint(residual, u0, vp=v0)[0]
+        grad_dft = Function(name='grad', grid=wave.model.grid)
+        wave.jacobian_adjoint(residual, (ufr, ufi, freq), vp=v0, grad=grad_dft)
+
+        g0 = np.asarray(grad.data).ravel()
+        g1 = np.asarray(grad_dft.data).ravel()
+        assert np.dot(g0, g1) / (np.linalg.norm(g0) * np.linalg.norm(g1)) > 0.99
+
+    @pytest.mark.parametrize('factor', [2, 4])
+    def test_gradient_snapshots(self, factor):
+        """
+        This test ensures that the gradient computed from the wavefield saved
+        one every `factor` time steps is close to the one computed from the
+        wavefield saved at every time step.
+        """
+        wave = iso_setup(shape=(70, 80), spacing=(10., 10.), space_order=4, nbl=40)
+        wave_sub = AcousticWaveSolver(wave.model, wave.geometry, space_order=4,
+                                      snapshot_factor=factor)
+        assert wave_sub.snapshot_factor == factor
+
+        v0 = Function(name='v0', grid=wave.model.grid, space_order=4)
+        smooth(v0, wave.model.vp)
+
+        rec = wave.forward()[0]
+        rec0, u0 = wave.forward(vp=v0, save=True)[0:2]
+        rec1, usave = wave_sub.forward(vp=v0, save=True)[0:2]
+
+        # Same modelling, the wavefield is just saved less often
+        assert np.allclose(rec0.data, rec1.data, atol=0, rtol=0)
+        nsnaps = (wave.geometry.nt + factor - 1) // factor
+        assert usave.shape[0] == nsnaps
+        assert np.allclose(usave.data[:-1], u0.data[::factor][:nsnaps-1],
+                           atol=0, rtol=0)
+
+        residual = Receiver(name='rec', grid=wave.model.grid, data=rec0.data - rec.data,
+                            time_range=wave.geometry.time_axis,
+                            coordinates=wave.geometry.rec_positions)
+
+        grad = wave.jacobian_adjoint(residual, u0, vp=v0)[0]
+        grad_sub = Function(name='grad', grid=wave.model.grid)
+        wave_sub.jacobian_adjoint(residual, usave, vp=v0, grad=grad_sub)
+
+        assert np.isclose(np.linalg.norm(grad_sub.data) / np.linalg.norm(grad.data),
+                          1., rtol=0.1)
+
+    @pytest.mark.parametrize('factor', [2, 4])
+    def test_gradient_snapshots_tti(self, factor):
+        """
+        This test ensures that the TTI gradient computed from the wavefields saved
+        one every `factor` time steps is close to the one computed from the
+        wavefields saved at every time step.
+        """
+        wave = tti_setup(shape=(50, 60), spacing=(10., 10.), space_order=4, nbl=10,
+                         tn=400.)
+        wave_sub = AnisotropicWaveSolver(wave.model, wave.geometry, space_order=4,
+                                         snapshot_factor=factor)
+
+        v0 = Function(name='v0', grid=wave.model.grid, space_order=4)
+        smooth(v0, wave.model.vp)
+
+        rec = wave.forward()[0]
+        rec0, u0, w0, _ = wave.forward(vp=v0, save=True)
+        rec1, usave, wsave, _ = wave_sub.forward(vp=v0, save=True)
+
+        # Same modelling, the wavefields are just saved less often
+        assert np.allclose(rec0.data, rec1.data, atol=0, rtol=0)
+        assert np.allclose(usave.data[:-1], u0.data[::factor][:usave.shape[0]-1],
+                           atol=0, rtol=0)
+        assert np.allclose(wsave.data[:-1], w0.data[::factor][:wsave.shape[0]-1],
+                           atol=0, rtol=0)
+
+        residual = Receiver(name='rec', grid=wave.model.grid, data=rec0.data - rec.data,
+                            time_range=wave.geometry.time_axis,
+                            coordinates=wave.geometry.rec_positions)
+
+        grad = wave.jacobian_adjoint(residual, u0, w0, vp=v0)[0]
+        grad_sub = Function(name='grad', grid=wave.model.grid)
+        wave_sub.jacobian_adjoint(residual, usave, wsave, vp=v0, dm=grad_sub)
+
+        error = np.linalg.norm(grad_sub.data - grad.data) / np.linalg.norm(grad.data)
+        assert error < 1e-3
+
+    @pytest.mark.parametrize('time_order', [1, 2])
+    def test_gradient_snapshots_viscoacoustic(self, time_order):
+        """
+        This test ensures that the viscoacoustic gradient computed from the time
+        derivative of the pressure, saved one every 4 time steps by the forward
+        modelling, is close to the one computed from the pressure saved at every
+        time step.
+        """
+        wave = viscoacoustic_setup(shape=(50, 60), spacing=(10., 10.), space_order=4,
+                                   nbl=40, tn=400., time_order=time_order)
+        wave_sub = ViscoacousticWaveSolver(wave.model, wave.geometry, space_order=4,
+                                           time_order=time_order, snapshot_factor=4)
+
+        v0 = Function(name='v0', grid=wave.model.grid, space_order=4)
+        smooth(v0, wave.model.vp)
+
+        rec = wave.forward()[0]
+        rec0, p0 = wave.forward(vp=v0, save=True)[0:2]
+        rec1, pdtsave = wave_sub.forward(vp=v0, save=True)[0:2]
+
+        assert pdtsave.name == 'pdtsave'
+        assert pdtsave.shape[0] == (wave.geometry.nt + 3) // 4
+        assert np.allclose(rec0.data, rec1.data, rtol=1e-5,
+                           atol=1e-5*np.abs(rec0.data).max())
+
+        residual = Receiver(name='rec', grid=wave.model.grid, data=rec0.data - rec.data,
+                            time_range=wave.geometry.time_axis,
+                            coordinates=wave.geometry.rec_positions)
+
+        grad = wave.jacobian_adjoint(residual, p0, vp=v0)[0]
+        grad_sub = wave_sub.jacobian_adjoint(residual, pdtsave, vp=v0)[0]
+
+        error = np.linalg.norm(grad_sub.data - grad.data) / np.linalg.norm(grad.data)
+        assert error < 1e-3
+        assert np.linalg.norm(grad_sub.data - grad.data) / \
+            np.linalg.norm(grad.data) < 0.1
+
+    @pytest.mark.parametrize('shape', [(60, 70)])
+    def test_batched_shots(self, shape):
+        """
+        This test ensures that modelling several shots at once, in a single
+        batched Operator, gives the same receiver data as modelling them one by
+        one, and that each source is only injected into its own shot.
+        """
+        model = demo_model('layers-isotropic', spacing=[15. for _ in shape],
+                           shape=shape, nbl=10)
+
+        nrec = 20
+        rec_coordinates = np.empty((nrec, len(shape)))
+        rec_coordinates[:, 0] = np.linspace(0., model.domain_size[0], num=nrec)
+        rec_coordinates[:, 1] = 30.
+
+        src_positions = np.empty((3, len(shape)))
+        src_positions[:, 0] = np.array([.25, .5, .75]) * model.domain_size[0]
+        src_positions[:, 1] = 30.
+
+        geometry = AcquisitionGeometry(model, rec_coordinates, src_positions[0],
+                                       t0=0., tn=300., src_type='Ricker', f0=0.010)
+        solver = AcousticWaveSolver(model, geometry, space_order=4)
+
+        rec, u, _ = solver.forward(src_positions=src_positions)
+        assert rec.data.shape == (geometry.nt, 3, nrec)
+        assert u.dimensions[-1].name == 'b'
+
+        # The injection doesn't loop over the shots, only over the sources
+        op = solver.op_fwd(nbatch=3)
+        for i in FindNodes(Iteration).visit(op):
+            if i.dim.name == 'p_src':
+                assert all(j.dim.name != 'b' for j in FindNodes(Iteration).visit(i))
+
+        for i, position in enumerate(src_positions):
+            src = geometry.src
+            src.coordinates.data[:] = position
+            rec1, _, _ = solver.forward(src=src)
+            assert np.allclose(rec.data[:, i], rec1.data, rtol=1e-5,
+                               atol=1e-5*np.abs(rec1.data).max())
+
+    def test_shot_scheduler(self):
+        """
+        This test ensures that the FWI objective and gradient computed over
+        several shots by a ShotScheduler match the ones computed serially.
+        """
+        setup = partial(iso_setup, shape=(50, 60), spacing=(10., 10.), space_order=4,
+                        nbl=10, tn=300.)
+        wave = setup()
+
+        v0 = Function(name='v0', grid=wave.model.grid, space_order=4)
+        smooth(v0, wave.model.vp)
+
+        shots = []
+        for x in np.linspace(0., wave.model.domain_size[0], num=3):
+            wave.geometry.src_positions[0, 0] = x
+            shots.append((wave.geometry.src_positions.copy(),
+                          wave.forward()[0].data.copy()))
+
+        # Serial reference
+        wave.model.update('vp', v0.data)
+        grad = Function(name='grad', grid=wave.model.grid)
+        objective = sum(fwi_gradient_shot(wave, shot, grad) for shot in shots)
+
+        with ShotScheduler(setup, nworkers=2, pin=False) as scheduler:
+            assert scheduler.nworkers == 2
+            objective1, grad1 = scheduler.run(fwi_gradient_shot, shots, vp=v0.data)
+
+            # Workers reuse their Operators across runs
+            objective2, grad2 = scheduler.run(fwi_gradient_shot, shots, vp=v0)
+
+        assert np.isclose(objective1, objective, rtol=1e-5)
+        assert np.allclose(grad1, grad.data, rtol=1e-5, atol=1e-5*np.abs(grad.data).max())
+        assert np.isclose(objective2, objective1, rtol=1e-6)
+        assert np.allclose(grad2, grad1, rtol=1e-6, atol=1e-6*np.abs(grad1).max())
+
 
 if __name__ == "__main__":
     TestGradient().test_gradientFWI(dtype=np.float32, shape=(70, 80),
@@ -7,7 +7,7 @@ from sympy import Float
 from devito import (Grid, Operator, Dimension, SparseFunction, SparseTimeFunction,
                     Function, TimeFunction, DefaultDimension, Eq,
                     PrecomputedSparseFunction, PrecomputedSparseTimeFunction,
-                    MatrixSparseTimeFunction)
+                    MatrixSparseTimeFunction, Buffer, TraceWriter, stream_apply)
 from examples.seismic import (demo_model, TimeAxis, RickerSource, Receiver,
                               AcquisitionGeometry)
 from examples.seismic.acoustic import AcousticWaveSolver
@@ -625,3 +625,224 @@ def test_sparse_first():
     op(time_M=10)
     expected = 10*11/2  # n (n+1)/2
     assert np.allclose(s.data, expected)
+
+
+def test_interpolate_buffered():
+    """
+    Test interpolation into a SparseTimeFunction with a circular time buffer.
+    """
+    grid = Grid(shape=(11, 11))
+    u = TimeFunction(name='u', grid=grid)
+
+    rec = SparseTimeFunction(name='rec', grid=grid, npoint=3, save=Buffer(4))
+    rec.coordinates.data[:] = [[.2, .2], [.5, .5], [.8, .8]]
+    assert rec.time_dim is grid.stepping_dim
+    assert rec.shape == (4, 3)
+
+    op = Operator([Eq(u.forward, u + 1)] + rec.interpolate(u))
+    op.apply(time_M=5)
+
+    # Only the last four timesteps are retained, at `time % 4`
+    assert np.allclose(rec.data, np.array([4., 5., 2., 3.])[:, None], rtol=1e-6)
+
+
+def test_precomputed_indices():
+    """
+    Test that the interpolation indices and weights of a SparseTimeFunction
+    are computed once per `apply`, outside of the time loop, and reused across
+    `apply`s as long as the coordinates don't change.
+    """
+    grid = Grid(shape=(11, 11))
+    a = unit_box(grid=grid)
+    u = TimeFunction(name='u', grid=grid)
+
+    rec = SparseTimeFunction(name='rec', grid=grid, npoint=3, nt=2)
+    rec.coordinates.data[:] = [[.25, .25], [.5, .55], [.85, .8]]
+    src = SparseTimeFunction(name='src', grid=grid, npoint=1, nt=2)
+    src.coordinates.data[:] = [[.45, .45]]
+    src.data[:] = 1.
+
+    op = Operator([Eq(u.forward, a)] + rec.interpolate(u.forward) +
+                  src.inject(u.forward, src))
+    assert 'floor' not in str(op)
+    assert rec.coordinates not in op.parameters
+
+    op.apply(time_M=0)
+    expected = np.array([.25, .5, .85])
+    assert np.allclose(rec.data[0], expected, rtol=1e-6)
+    # The injected source is spread over the four surrounding grid points
+    assert np.isclose(np.sum(u.data[1] - a.data), 1., rtol=1e-6)
+    assert np.allclose((u.data[1] - a.data)[4:6, 4:6], .25, rtol=1e-5)
+
+    # Same coordinates, same precomputed arrays
+    cached = rec._interp_cache[-1]
+    op.apply(time_M=0)
+    assert rec._interp_cache[-1] is cached
+
+    # New coordinates, recomputed arrays
+    rec.coordinates.data[0] = [.35, .35]
+    op.apply(time_M=0)
+    assert rec._interp_cache[-1] is not cached
+    assert np.isclose(rec.data[0, 0], .35, rtol=1e-6)
+
+
+def test_precomputed_indices_lazy():
+    """
+    Test that the interpolation indices and weights of a SparseTimeFunction
+    are only computed by the Operators that actually interpolate or inject.
+    """
+    grid = Grid(shape=(11, 11))
+    u = TimeFunction(name='u', grid=grid)
+
+    rec = SparseTimeFunction(name='rec', grid=grid, npoint=3, nt=2)
+    rec.coordinates.data[:] = [[.25, .25], [.5, .55], [.85, .8]]
+
+    op = Operator(Eq(rec, rec + 1))
+    assert rec._interp_gridpoints not in op.parameters
+
+    op.apply()
+    assert np.all(rec.data == 1.)
+    assert rec._interp_cache is None
+
+    u.data[:] = 2.
+    op = Operator(rec.interpolate(u, increment=True))
+    op.apply(time_M=0)
+    assert rec._interp_cache is not None
+    assert np.allclose(rec.data[0], 3., rtol=1e-6)
+
+
+@pytest.mark.parametrize('shape', [(11, 11), (9, 10, 11)])
+def test_colored_injection(shape):
+    """
+    Test that injecting one color of sparse points at a time, without atomics,
+    gives the same result as the default atomic injection.
+    """
+    grid = Grid(shape=shape)
+    npoint = 40
+
+    np.random.seed(0)
+    coordinates = np.random.rand(npoint, grid.dim)
+    # Several sparse points sharing the same grid cell
+    coordinates[npoint//2:] = coordinates[:npoint//2]
+    data = np.random.rand(3, npoint)
+
+    results = []
+    for mode in ['atomic', 'color']:
+        u = TimeFunction(name='u', grid=grid)
+        src = SparseTimeFunction(name='src', grid=grid, npoint=npoint, nt=3,
+                                 coordinates=coordinates)
+        src.data[:] = data
+
+        op = Operator([Eq(u.forward, u + 1)] +
+                      src.inject(u.forward, src * 2., mode=mode),
+                      opt=('advanced', {'openmp': True}))
+        assert ('atomic' in str(op)) == (mode == 'atomic')
+
+        op.apply(time_M=1)
+        results.append(u.data.copy())
+
+        # The colors are only computed if needed
+        assert (src._color_cache is not None) == (mode == 'color')
+
+    assert np.allclose(results[0], results[1], rtol=1e-6)
+
+    # The supports of the sparse points within a color are disjoint
+    gridpoints = np.floor(coordinates / grid.spacing).astype(np.int32)
+    args = src._interpolation_colors(gridpoints)
+    perm = args['src_cperm']
+    assert sorted(perm) == list(range(npoint))
+    for m, M in zip(args['src_cm'], args['src_cM']):
+        support = [tuple(i + j) for i in gridpoints[perm[m:M+1]]
+                   for j in src._point_support + 1]
+        assert len(support) == len(set(support))
+
+
+@pytest.mark.parametrize('data_kwarg', [False, True])
+def test_reorder(data_kwarg):
+    """
+    Test that processing the sparse points along a space-filling curve gives
+    the same results, in user order, as processing them in user order.
+    """
+    grid = Grid(shape=(11, 11))
+    npoint = 30
+
+    np.random.seed(0)
+    coordinates = np.random.rand(npoint, grid.dim)
+    data = np.random.rand(3, npoint)
+
+    results = []
+    for reorder in [False, True]:
+        a = unit_box(grid=grid)
+        u = TimeFunction(name='u', grid=grid)
+        src = SparseTimeFunction(name='src', grid=grid, npoint=npoint, nt=3,
+                                 coordinates=coordinates, reorder=reorder)
+        rec = SparseTimeFunction(name='rec', grid=grid, npoint=npoint, nt=3,
+                                 coordinates=coordinates, reorder=reorder)
+        assert rec.reorder is reorder
+        src.data[:] = data
+
+        op = Operator([Eq(u.forward, u + a)] + src.inject(u.forward, src) +
+                      rec.interpolate(u.forward))
+        if data_kwarg:
+            recdata = np.zeros(rec.shape, dtype=rec.dtype)
+            op.apply(time_M=1, rec=recdata)
+        else:
+            op.apply(time_M=1)
+            recdata = rec.data
+
+        # User-facing data and coordinates are left untouched
+        assert np.all(src.data == data.astype(src.dtype))
+        assert np.allclose(rec.coordinates.data, coordinates)
+
+        results.append((u.data.copy(), np.array(recdata)))
+
+    assert np.allclose(results[0][0], results[1][0], rtol=1e-6)
+    assert np.allclose(results[0][1], results[1][1], rtol=1e-6)
+
+
+def test_colored_injection_unsupported():
+    grid = Grid(shape=(11, 11))
+    u = TimeFunction(name='u', grid=grid)
+    src = SparseTimeFunction(name='src', grid=grid, npoint=1, nt=3)
+    sf = SparseFunction(name='sf', grid=grid, npoint=1)
+
+    with pytest.raises(ValueError):
+        src.inject(u.forward, src, mode='foo')
+    with pytest.raises(ValueError):
+        sf.inject(u, sf, mode='color')
+
+
+@pytest.mark.parametrize('order', ['time', 'trace'])
+@pytest.mark.parametrize('background', [False, True])
+def test_stream_apply(tmpdir, order, background):
+    """
+    Test streaming a buffered SparseTimeFunction to disk in chunks.
+    """
+    grid = Grid(shape=(11, 11))
+    u = TimeFunction(name='u', grid=grid)
+
+    rec = SparseTimeFunction(name='rec', grid=grid, npoint=3, save=Buffer(4))
+    rec.coordinates.data[:] = [[.2, .2], [.5, .5], [.8, .8]]
+
+    op = Operator([Eq(u.forward, u + 1)] + rec.interpolate(u))
+
+    filename = str(tmpdir.join('rec.bin'))
+    with TraceWriter(rec, filename, nt=10, order=order,
+                     background=background) as writer:
+        summaries = stream_apply(op, writer, time_M=9)
+    assert len(summaries) == 3
+
+    data = np.fromfile(filename, dtype=rec.dtype)
+    if order == 'time':
+        data = data.reshape(10, 3)
+    else:
+        data = data.reshape(3, 10).T
+    assert np.allclose(data, np.arange(10.)[:, None], rtol=1e-6)
+
+
+def test_stream_unbuffered():
+    grid = Grid(shape=(11, 11))
+    rec = SparseTimeFunction(name='rec', grid=grid, npoint=3, nt=10)
+
+    with pytest.raises(ValueError):
+        TraceWriter(rec, 'rec.bin', nt=10)
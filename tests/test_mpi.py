@@ -6,12 +6,16 @@ from conftest import skipif, _R, assert_blocking, assert_structure
 from devito import (Grid, Constant, Function, TimeFunction, SparseFunction,
                     SparseTimeFunction, Dimension, ConditionalDimension, SubDimension,
                     SubDomain, Eq, Ne, Inc, NODE, Operator, norm, inner, configuration,
-                    switchconfig, generic_derivative)
+                    switchconfig, generic_derivative, Buffer, TraceWriter,
+                    stream_apply)
+from devito.builtins import mmax, mmin, reduce_many, sumall
 from devito.data import LEFT, RIGHT
+from devito.exceptions import InvalidOperator
 from devito.ir.iet import (Call, Conditional, Iteration, FindNodes, FindSymbols,
-                           retrieve_iteration_tree)
+                           ThreadCallable, retrieve_iteration_tree)
 from devito.mpi import MPI
-from devito.mpi.routines import HaloUpdateCall, MPICall
+from devito.mpi.routines import (HaloUpdateCall, MPICall, MPIMsgDatatype,
+                                 MPIMsgPersistent)
 from examples.seismic.acoustic import acoustic_setup
 
 pytestmark = skipif(['nompi'], whole_module=True)
@@ -32,6 +36,67 @@ class TestDistributor(object):
         assert f.shape == expected[distributor.nprocs][distributor.myrank]
         assert f.size_global == 225
 
+    @pytest.mark.parallel(mode=4)
+    def test_partitioning_custom(self):
+        grid = Grid(shape=(15, 15), partitions=((4,), (10,)))
+        x, y = grid.dimensions
+        t = grid.stepping_dim
+        f = TimeFunction(name='f', grid=grid)
+
+        distributor = grid.distributor
+        assert distributor.topology == (2, 2)
+        expected = [(4, 10), (4, 5), (11, 10), (11, 5)]
+        assert f.shape[1:] == expected[distributor.myrank]
+
+        # Halo exchanges across non-uniform chunks
+        grid1 = Grid(shape=(15, 15))
+        f1 = TimeFunction(name='f', grid=grid1)
+        for i in [f, f1]:
+            i.data_with_halo[:] = 1.
+            eq = Eq(i.forward, i[t, x-1, y] + i[t, x+1, y] + i[t, x, y-1] + 1)
+            Operator(eq)(time_M=2)
+        assert np.isclose(norm(f), norm(f1), rtol=1e-6)
+
+    def test_partitioning_invalid(self):
+        with pytest.raises(ValueError):
+            Grid(shape=(15, 15), partitions=((4, 2), None))
+        with pytest.raises(ValueError):
+            Grid(shape=(15, 15), partitions=((15,), None))
+
+    def test_compute_partitions(self):
+        from devito.mpi import compute_partitions
+
+        # An expensive layer on the left of `x`
+        cost = np.ones((40, 40))
+        cost[:10] = 3.
+        topology, partitions = compute_partitions(cost, 2, topology=(2, 1))
+        assert topology == (2, 1)
+        assert partitions == ((10,), ())
+
+        # With uniform cost, the process grid with the smallest halos is selected
+        topology, partitions = compute_partitions(np.ones((40, 10)), 4)
+        assert topology == (4, 1)
+        assert partitions == ((10, 20, 30), ())
+
+    @pytest.mark.parallel(mode=4)
+    def test_glb_to_rank(self):
+        grid = Grid(shape=(4, 4))
+        distributor = grid.distributor
+
+        # Four sparse points, each with a 2x2 support
+        offsets = np.array([(0, 0), (0, 1), (1, 0), (1, 1)])
+        gridpoints = np.array([(1, 1), (0, 0), (0, 3), (3, 0)])
+        support = np.stack([gridpoints + i for i in offsets], axis=2)
+
+        # Point 0 straddles all ranks, while the support points of 2 and 3
+        # lying outside of the domain have no owner
+        assert distributor.glb_to_rank(support) == {
+            0: [0, 1],
+            1: [0, 2],
+            2: [0, 3],
+            3: [0]
+        }
+
     @pytest.mark.parallel(mode=[2, 4])
     def test_partitioning_fewer_dims(self):
         """Test domain decomposition for Functions defined over a strict subset
@@ -158,6 +223,23 @@ class TestDistributor(object):
         value = obj._arg_defaults()[obj.name]
         assert all(getattr(value._obj, k) == v for k, v in mapper.items())
 
+    @pytest.mark.parallel(mode=[4])
+    def test_graph_comm(self):
+        grid = Grid(shape=(4, 4))
+        distributor = grid.distributor
+
+        # In a 2x2 topology, each rank neighbours all others, one diagonally
+        others = sorted(set(range(4)) - {distributor.myrank})
+
+        sources, destinations, _ = distributor.graph_comm.Get_dist_neighbors()
+        assert sorted(sources) == others
+        assert sorted(destinations) == others
+
+        # The halo along a given side is received from the flipped side
+        srcsides, dstsides = distributor.neighborhood_sides
+        assert len(srcsides) == len(dstsides) == 3
+        assert {tuple(i.flip() for i in s) for s in srcsides} == set(dstsides)
+
     @pytest.mark.parallel(mode=[4])
     def test_custom_topology(self):
         grid = Grid(shape=(15, 15))
@@ -180,6 +262,27 @@ class TestDistributor(object):
         assert f2.shape == expected[distributor.myrank]
         assert f2.size_global == f.size_global
 
+    @pytest.mark.parallel(mode=[4])
+    def test_auto_topology(self):
+        grid = Grid(shape=(64, 16), topology='auto')
+        assert grid.distributor.topology == (4, 1)
+
+        grid = Grid(shape=(8, 256), topology='auto')
+        assert grid.distributor.topology == (1, 4)
+
+    def test_compute_topology(self):
+        from devito.mpi import compute_topology
+
+        # The innermost Dimension is left undecomposed
+        assert compute_topology((2000, 2000, 400), 64) == (8, 8, 1)
+        assert compute_topology((400, 400, 400), 8, simd_weight=1.) == (2, 2, 2)
+        assert compute_topology((400, 400, 400), 8, simd_weight=4.) == (4, 2, 1)
+
+        # Faces shared by processes on different nodes are kept small
+        assert compute_topology((32, 64), 4, simd_weight=1.) == (2, 2)
+        assert compute_topology((32, 64), 4, ranks_per_node=2,
+                                simd_weight=1.) == (1, 4)
+
 
 class TestFunction(object):
 
@@ -507,6 +610,93 @@ class TestSparseFunction(object):
 
         assert np.allclose(rec.coordinates.data[:], ref.coordinates.data)
 
+    @pytest.mark.parallel(mode=4)
+    def test_scatter_plan_reuse(self):
+        grid = Grid(shape=(11, 11), extent=(10., 10.))
+        coords = np.array([[2., 2.], [2., 8.], [8., 2.], [8., 8.], [5., 5.]])
+        rec = SparseTimeFunction(name='rec', grid=grid, npoint=5, nt=3,
+                                 coordinates=coords)
+        u = TimeFunction(name='u', grid=grid)
+        u.data[:] = 1.
+
+        op = Operator(rec.interpolate(u))
+
+        op.apply(time_M=1)
+        plan = rec._dist_plan_cache
+        assert plan is not None
+        assert np.all(rec.data[:2] == 1.)
+
+        # Unmodified coordinates, so the plan is reused
+        rec.data[:] = 0.
+        op.apply(time_M=1)
+        assert rec._dist_plan_cache is plan
+        assert np.all(rec.data[:2] == 1.)
+
+        # Moving the sparse points invalidates the plan
+        rec.coordinates.data[:] = coords[::-1]
+        u.data[:, :6] = 2.
+        op.apply(time_M=1)
+        assert rec._dist_plan_cache is not plan
+        expected = np.where(rec.coordinates.data._local[:, 0] < 6, 2., 1.)
+        assert np.allclose(rec.data[:2], expected)
+
+    @pytest.mark.parallel(mode=4)
+    def test_reorder(self):
+        grid = Grid(shape=(11, 11), extent=(10., 10.))
+        coords = np.array([[8., 8.], [2., 2.], [5., 5.], [2., 8.], [8., 2.],
+                           [3., 7.], [6., 1.]])
+
+        results = []
+        for reorder in [False, True]:
+            src = SparseTimeFunction(name='src', grid=grid, npoint=7, nt=3,
+                                     coordinates=coords, reorder=reorder)
+            rec = SparseTimeFunction(name='rec', grid=grid, npoint=7, nt=3,
+                                     coordinates=coords, reorder=reorder)
+
+            u = TimeFunction(name='u', grid=grid)
+            u.data[:, :6] = 2.
+            Operator(rec.interpolate(u)).apply(time_M=1)
+
+            # The points lie on the grid nodes, so they pick the nodal values,
+            # in the user-provided order regardless of the internal one
+            expected = np.where(rec.coordinates.data[:, 0] < 6, 2., 0.)
+            assert np.allclose(rec.data[:2], expected)
+
+            v = TimeFunction(name='v', grid=grid)
+            src.data[:] = 1.
+            Operator(src.inject(v.forward, src)).apply(time_M=1)
+
+            assert np.isclose(sumall(v), 14.)
+
+            results.append(np.array(v.data[:]))
+
+        assert np.allclose(results[0], results[1])
+
+    @pytest.mark.parallel(mode=4)
+    @pytest.mark.parametrize('order', ['time', 'trace'])
+    def test_stream_apply(self, tmpdir, order):
+        grid = Grid(shape=(11, 11), extent=(10., 10.))
+        coords = np.array([[2., 2.], [2., 8.], [8., 2.], [8., 8.], [5., 5.]])
+        rec = SparseTimeFunction(name='rec', grid=grid, npoint=5, coordinates=coords,
+                                 save=Buffer(3))
+        u = TimeFunction(name='u', grid=grid)
+
+        op = Operator([Eq(u.forward, u + 1)] + rec.interpolate(u))
+
+        # All ranks must write into the same file
+        comm = grid.distributor.comm
+        filename = comm.bcast(str(tmpdir.join('rec.bin')), root=0)
+        with TraceWriter(rec, filename, nt=8, order=order) as writer:
+            stream_apply(op, writer, time_M=7)
+        comm.Barrier()
+
+        data = np.fromfile(filename, dtype=rec.dtype)
+        if order == 'time':
+            data = data.reshape(8, 5)
+        else:
+            data = data.reshape(5, 8).T
+        assert np.allclose(data, np.arange(8.)[:, None], rtol=1e-6)
+
 
 class TestOperatorSimple(object):
 
@@ -573,7 +763,10 @@ class TestOperatorSimple(object):
             assert np.all(f.data_ro_domain[-1, :-time_M] == 31.)
 
     @pytest.mark.parallel(mode=[(4, 'basic'), (4, 'diag'), (4, 'overlap'),
-                                (4, 'overlap2'), (4, 'diag2'), (4, 'full')])
+                                (4, 'overlap2'), (4, 'diag2'), (4, 'full'),
+                                (4, 'persistent'), (4, 'aggregated'),
+                                (4, 'datatype'), (4, 'neighborhood'),
+                                (4, 'ineighborhood'), (4, 'progress')])
     def test_trivial_eq_2d(self):
         grid = Grid(shape=(8, 8,))
         x, y = grid.dimensions
@@ -609,7 +802,10 @@ class TestOperatorSimple(object):
             assert np.all(f.data_ro_domain[0, -1:, :-1] == side)
 
     @pytest.mark.parallel(mode=[(8, 'basic'), (8, 'diag'), (8, 'overlap'),
-                                (8, 'overlap2'), (8, 'diag2'), (8, 'full')])
+                                (8, 'overlap2'), (8, 'diag2'), (8, 'full'),
+                                (8, 'persistent'), (8, 'aggregated'),
+                                (8, 'datatype'), (8, 'neighborhood'),
+                                (8, 'ineighborhood'), (8, 'progress')])
     def test_trivial_eq_3d(self):
         grid = Grid(shape=(8, 8, 8))
         x, y, z = grid.dimensions
@@ -1264,6 +1460,35 @@ class TestCodeGeneration(object):
             # W/o OpenMP, it's a different story
             assert call._single_thread
 
+    @pytest.mark.parallel(mode=[(1, 'progress')])
+    @switchconfig(profiling='advanced1')
+    def test_progress_thread(self):
+        grid = Grid(shape=(4, 4))
+        x, y = grid.dimensions
+        t = grid.stepping_dim
+
+        f = TimeFunction(name='f', grid=grid)
+
+        eqn = Eq(f.forward, f[t, x-1, y] + f[t, x+1, y] + f[t, x, y-1] + f[t, x, y+1])
+        op = Operator(eqn)
+
+        # No pokes within the compute loops, but a helper thread testing the
+        # outstanding requests
+        assert 'pokempi0' not in op._func_table
+        progress = op._func_table['progress0'].root
+        assert isinstance(progress, ThreadCallable)
+        calls = [i.name for i in FindNodes(Call).visit(progress)]
+        assert calls == ['MPI_Test', 'MPI_Test']
+        calls = [i.name for i in FindNodes(Call).visit(op)]
+        assert 'pthread_create' in calls
+        assert 'pthread_join' in calls
+
+        summary = op.apply(time_M=2)
+
+        subsections = [i for v in summary.subsections.values() for i in v]
+        assert 'computecore0' in subsections
+        assert 'progresswait0' in subsections
+
     @pytest.mark.parallel(mode=[(1, 'diag2')])
     def test_diag2_quality(self):
         grid = Grid(shape=(10, 10, 10))
@@ -1281,6 +1506,102 @@ class TestCodeGeneration(object):
         assert calls[1].name == 'halowait0'
         assert_blocking(op, {'x0_blk0'})
 
+    @pytest.mark.parallel(mode=[(1, 'persistent')])
+    def test_persistent_quality(self):
+        grid = Grid(shape=(10, 10, 10))
+
+        f = TimeFunction(name='f', grid=grid, space_order=2)
+
+        eqn = Eq(f.forward, f.dx2 + 1.)
+
+        op = Operator(eqn)
+
+        assert len(op._func_table) == 4  # gather, scatter, haloupdate, halowait
+        calls = [i.name for i in FindNodes(Call).visit(op._func_table['haloupdate0'])]
+        assert calls.count('MPI_Start') == 2
+        assert 'MPI_Isend' not in calls
+        assert 'MPI_Irecv' not in calls
+
+        # The persistent requests and the buffers are released after each run
+        op.apply(time_M=2)
+        msg = [i for i in op.parameters if isinstance(i, MPIMsgPersistent)].pop()
+        assert msg._requests == []
+        assert msg._memfree_args == []
+
+    @pytest.mark.parallel(mode=[(4, 'aggregated')])
+    def test_aggregated(self):
+        grid = Grid(shape=(8, 8,))
+        x, y = grid.dimensions
+        t = grid.stepping_dim
+
+        f = TimeFunction(name='f', grid=grid, space_order=1)
+        g = TimeFunction(name='g', grid=grid, space_order=1)
+        f.data_with_halo[:] = 1.
+        g.data_with_halo[:] = 2.
+
+        eqns = [Eq(f.forward, f[t, x-1, y] + f[t, x+1, y] + f[t, x, y-1] + f[t, x, y+1]),
+                Eq(g.forward, g[t, x-1, y] + g[t, x+1, y] + g[t, x, y-1] + g[t, x, y+1])]
+        op = Operator(eqns)
+
+        # A single message per peer, packing both `f` and `g`
+        calls = FindNodes(Call).visit(op)
+        assert len(calls) == 2
+        assert calls[0].name == 'haloupdate0'
+        assert f in calls[0].arguments and g in calls[0].arguments
+        calls = [i.name for i in FindNodes(Call).visit(op._func_table['haloupdate0'])]
+        assert calls.count('MPI_Irecv') == 1
+        assert calls.count('MPI_Isend') == 1
+        calls = [i.name for i in FindNodes(Call).visit(op._func_table['halowait0'])]
+        assert calls.count('MPI_Waitall') == 1
+
+        op.apply(time=1)
+
+        assert np.all(f.data_ro_domain[0, 1:-1, 1:-1] == 16.)
+        assert np.all(g.data_ro_domain[0] == 2*f.data_ro_domain[0])
+
+    @pytest.mark.parallel(mode=[(1, 'datatype')])
+    def test_datatype_quality(self):
+        grid = Grid(shape=(10, 10, 10))
+
+        f = TimeFunction(name='f', grid=grid, space_order=2)
+
+        eqn = Eq(f.forward, f.dx2 + 1.)
+
+        op = Operator(eqn)
+
+        # No pack/unpack kernels
+        assert len(op._func_table) == 2  # haloupdate, halowait
+        calls = [i.name for i in FindNodes(Call).visit(op._func_table['haloupdate0'])]
+        assert calls == ['MPI_Irecv', 'MPI_Isend']
+
+        # The datatypes are built once and reused across runs
+        op.apply(time_M=2)
+        msg = [i for i in op.parameters if isinstance(i, MPIMsgDatatype)].pop()
+        datatypes = dict(msg._datatypes)
+        assert len(datatypes) > 0
+        op.apply(time_M=2)
+        assert msg._datatypes == datatypes
+
+    @pytest.mark.parallel(mode=[(1, 'neighborhood'), (1, 'ineighborhood')])
+    def test_neighborhood_quality(self):
+        grid = Grid(shape=(10, 10, 10))
+
+        f = TimeFunction(name='f', grid=grid, space_order=2)
+
+        eqn = Eq(f.forward, f.dx2 + 1.)
+
+        op = Operator(eqn)
+
+        # A single collective per halo exchange
+        calls = [i.name for i in FindNodes(Call).visit(op._func_table['haloupdate0'])]
+        if configuration['mpi'] == 'neighborhood':
+            assert calls == ['MPI_Neighbor_alltoallw']
+        else:
+            assert calls == ['MPI_Ineighbor_alltoallw']
+            calls = [i.name for i in
+                     FindNodes(Call).visit(op._func_table['halowait0'])]
+            assert calls == ['MPI_Wait']
+
     @pytest.mark.parallel(mode=[
         (1, 'basic'),
         (1, 'diag'),
@@ -1288,6 +1609,11 @@ class TestCodeGeneration(object):
         (1, 'overlap2'),
         (1, 'diag2'),
         (1, 'full'),
+        (1, 'persistent'),
+        (1, 'aggregated'),
+        (1, 'datatype'),
+        (1, 'neighborhood'),
+        (1, 'ineighborhood'),
     ])
     def test_min_code_size(self):
         grid = Grid(shape=(10, 10, 10))
@@ -1317,8 +1643,26 @@ class TestCodeGeneration(object):
             assert len(op._func_table) == 6
             assert len(calls) == 6  # haloupdateX2, compute, halowaitX2, remainder
             assert 'haloupdate1' not in op._func_table
-        elif configuration['mpi'] in ('diag2'):
+        elif configuration['mpi'] in ('diag2', 'persistent'):
+            assert len(op._func_table) == 4
+            assert len(calls) == 4
+            assert calls[0].name == 'haloupdate0'
+            assert calls[1].name == 'haloupdate0'
+        elif configuration['mpi'] in ('aggregated'):
+            assert len(calls) == 2  # haloupdate, halowait, for both `f` and `g`
+            assert calls[0].name == 'haloupdate0'
+            assert calls[1].name == 'halowait0'
+        elif configuration['mpi'] in ('neighborhood'):
+            assert len(op._func_table) == 1
+            assert len(calls) == 2
+            assert calls[0].name == 'haloupdate0'
+            assert calls[1].name == 'haloupdate0'
+        elif configuration['mpi'] in ('ineighborhood'):
             assert len(op._func_table) == 4
+            assert len(calls) == 6  # haloupdateX2, compute, halowaitX2, remainder
+            assert 'haloupdate1' not in op._func_table
+        elif configuration['mpi'] in ('datatype'):
+            assert len(op._func_table) == 2  # haloupdate, halowait
             assert len(calls) == 4
             assert calls[0].name == 'haloupdate0'
             assert calls[1].name == 'haloupdate0'
@@ -1361,8 +1705,9 @@ class TestOperatorAdvanced(object):
 
         assert np.all(f.data == 1.25)
 
+    @pytest.mark.parametrize('mode', ['atomic', 'color'])
     @pytest.mark.parallel(mode=4)
-    def test_injection_wodup_wtime(self):
+    def test_injection_wodup_wtime(self, mode):
         """
         Just like ``test_injection_wodup``, but using a SparseTimeFunction
         instead of a SparseFunction. Hence, the data scattering/gathering now
@@ -1380,7 +1725,7 @@ class TestOperatorAdvanced(object):
         sf.data[1, :] = 8.
         sf.data[2, :] = 12.
 
-        op = Operator(sf.inject(field=f, expr=sf + 1))
+        op = Operator(sf.inject(field=f, expr=sf + 1, mode=mode))
         op.apply()
 
         assert np.all(f.data[0] == 1.25)
@@ -1889,6 +2234,28 @@ class TestOperatorAdvanced(object):
 
         assert (np.isclose(norm(f), 17.24904, atol=1e-4, rtol=0))
 
+    @pytest.mark.parallel(mode=4)
+    def test_reduce_many(self):
+        grid = Grid(shape=(8, 8))
+
+        f = Function(name='f', grid=grid)
+        g = TimeFunction(name='g', grid=grid)
+        h = Function(name='h', grid=grid)
+        f.data[:] = np.arange(64).reshape((8, 8)) - 10.
+        g.data[:] = 2.
+        h.data[:] = 3.
+
+        expected = [norm(f), norm(f, order=1), inner(f, h), sumall(g),
+                    mmin(f), mmax(g)]
+        reductions = [('norm', f), ('norm', f, 1), ('inner', f, h), ('sumall', g),
+                      ('mmin', f), ('mmax', g)]
+
+        assert np.allclose(reduce_many(reductions), expected, rtol=1e-6)
+
+        futures = reduce_many(reductions, asynchronous=True)
+        assert np.allclose([i.result() for i in futures], expected, rtol=1e-6)
+        assert all(i.done() for i in futures)
+
     @pytest.mark.parallel(mode=1)
     def test_haloupdate_issue_1613(self):
         """
@@ -2272,6 +2639,47 @@ class TestOperatorAdvanced(object):
         assert np.isclose(norm(u1), 12445251.87, rtol=1e-7)
         assert np.isclose(norm(v1), 147063.38, rtol=1e-7)
 
+    @pytest.mark.parallel(mode=[(4, 'basic'), (4, 'diag2')])
+    @pytest.mark.parametrize('period', [2, 3])
+    def test_comm_avoiding(self, period):
+        grid = Grid(shape=(12, 12), dtype=np.float64)
+
+        # The halos must be `period - 1` stencil radii deeper than usual
+        u = TimeFunction(name='u', grid=grid, space_order=(2, period, period))
+        v = TimeFunction(name='v', grid=grid, space_order=2)
+        m = Function(name='m', grid=grid, space_order=(2, period, period))
+
+        m.data[:] = np.linspace(.05, .1, 12)
+        for f in (u, v):
+            f.data[0, 4:8, 5:7] = 1.
+
+        op0 = Operator(Eq(v.forward, v + m*v.laplace))
+        op1 = Operator(Eq(u.forward, u + m*u.laplace),
+                       opt=('advanced', {'mpi-ca': period}))
+
+        # The halo exchanges within the time loop are performed once every
+        # `period` time steps
+        iters = FindNodes(Iteration).visit(op1)
+        conds = FindNodes(Conditional).visit(iters[0])
+        assert len(conds) == 1
+        assert len(FindNodes(HaloUpdateCall).visit(conds[0])) == u.time_size
+
+        op0.apply(time_M=7)
+        op1.apply(time_M=7)
+
+        assert np.allclose(u.data, v.data, rtol=1e-12)
+
+    @pytest.mark.parallel(mode=4)
+    def test_comm_avoiding_shallow_halo(self):
+        grid = Grid(shape=(12, 12))
+
+        # A halo as deep as the stencil radius only, one radius short of what
+        # `mpi-ca=2` requires
+        u = TimeFunction(name='u', grid=grid, space_order=(2, 1, 1))
+
+        with pytest.raises(InvalidOperator):
+            Operator(Eq(u.forward, u + u.laplace), opt=('advanced', {'mpi-ca': 2}))
+
 
 def gen_serial_norms(shape, so):
     """
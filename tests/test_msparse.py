@@ -392,3 +392,79 @@ class TestMatrixSparseTimeFunction(object):
 
         if grid.distributor.myrank == 0:
             assert sf.data[0, 0] == -3.0  # 1 * (1 * 1) * 1 + (-1) * (2 * 2) * 1
+
+    @pytest.mark.parallel(mode=4)
+    def test_mpi_rescatter(self):
+        """
+        Test that rescattering after a change to the matrix values only reuses
+        the scatter metadata, while a change to the gridpoints rebuilds it.
+        """
+        grid = Grid(shape=(91, 91))
+        x, y = grid.dimensions
+        r = 2
+        nt = 10
+
+        m = TimeFunction(name="m", grid=grid, space_order=4, save=None, time_order=1)
+        m.data[:] = 0.0
+        m.data[:, 40, 40] = 1.0
+        m.data[:, 50, 50] = 1.0
+
+        def make_matrix(v):
+            if grid.distributor.myrank == 0:
+                return scipy.sparse.coo_matrix(np.array([[v], [-v]], dtype=np.float32))
+            else:
+                return scipy.sparse.coo_matrix((0, 0), dtype=np.float32)
+
+        sf = MatrixSparseTimeFunction(name="s", grid=grid, r=r, matrix=make_matrix(1),
+                                      nt=nt)
+
+        if grid.distributor.myrank == 0:
+            sf.gridpoints.data[:] = [[40, 40], [50, 50]]
+            for d in grid.dimensions:
+                sf.interpolation_coefficients[d].data[:] = [[1.0, 2.0], [2.0, 2.0]]
+
+        op = Operator(sf.interpolate(m))
+
+        sf.manual_scatter()
+        plan = sf._scatter_plan
+        op.apply(time_m=0, time_M=0)
+        sf.manual_gather()
+        if grid.distributor.myrank == 0:
+            assert sf.data[0, 0] == -3.0
+
+        # Same sparsity pattern, new values
+        sf.matrix = make_matrix(2)
+        sf.data[:] = 0.0
+        sf.manual_scatter()
+        assert sf._scatter_plan is plan
+        op.apply(time_m=0, time_M=0)
+        sf.manual_gather()
+        if grid.distributor.myrank == 0:
+            assert sf.data[0, 0] == -6.0
+
+        # New gridpoints
+        if grid.distributor.myrank == 0:
+            sf.gridpoints.data[1] = [45, 45]
+        sf.data[:] = 0.0
+        sf.manual_scatter()
+        assert sf._scatter_plan is not plan
+        op.apply(time_m=0, time_M=0)
+        sf.manual_gather()
+        if grid.distributor.myrank == 0:
+            assert sf.data[0, 0] == 2.0  # 2 * (1 * 1) * 1 + (-2) * (2 * 2) * 0
+
+    def test_rank_to_points(self):
+        grid = Grid(shape=(11, 11))
+        matrix = scipy.sparse.eye(3, dtype=np.float32)
+
+        sf = MatrixSparseTimeFunction(name="s", grid=grid, r=2, matrix=matrix, nt=2)
+        sf.gridpoints.data[:] = [[9, 0], [0, 0], [4, 5]]
+
+        ret = sf._rank_to_points()
+        assert len(ret) == 1
+        assert list(ret[0]) == [0, 1, 2]
+
+        # Injecting outside of the domain
+        sf.gridpoints.data[0] = [10, 0]
+        with pytest.raises(ValueError):
+            sf._rank_to_points()
@@ -764,13 +764,18 @@ class TestApplyArguments(object):
         op = Operator(s.interpolate(f))
 
         expected = {
-            's': s, 's_coords': s.coordinates,
+            's': s,
             # Default dimensions of the sparse data
             'p_s_size': 3, 'p_s_m': 0, 'p_s_M': 2,
             'd_size': 3, 'd_m': 0, 'd_M': 2,
             'time_size': 4, 'time_m': 0, 'time_M': 3,
         }
-        self.verify_arguments(op.arguments(), expected)
+        arguments = op.arguments()
+        self.verify_arguments(arguments, expected)
+
+        # The interpolation indices are precomputed from the coordinates
+        gridpoints = s._interp_gridpoints._C_as_ndarray(arguments['s_gp'])
+        assert np.all(gridpoints == np.floor(s.coordinates.data / grid.spacing))
 
     def test_override_function_size(self):
         """
@@ -993,9 +998,11 @@ class TestApplyArguments(object):
         # whether the override picks up the original coordinates or the changed ones
 
         args = op.arguments(src1=src2, time=0)
-        arg_name = src1.coordinates._arg_names[0]
-        assert(np.array_equal(src2.coordinates._C_as_ndarray(args[arg_name]),
-                              np.asarray((new_coords,))))
+        # The injection reads the grid indices precomputed from the coordinates
+        arg_name = src1._interp_gridpoints._arg_names[0]
+        assert(np.array_equal(src2._interp_gridpoints._C_as_ndarray(args[arg_name]),
+                              np.floor(np.asarray((new_coords,), dtype=src2.dtype) /
+                                       grid.spacing)))
 
     def test_override_sparse_data_default_dim(self):
         """
@@ -1017,9 +1024,11 @@ class TestApplyArguments(object):
         # whether the override picks up the original coordinates or the changed ones
 
         args = op.arguments(src1=src2, t=0)
-        arg_name = src1.coordinates._arg_names[0]
-        assert(np.array_equal(src2.coordinates._C_as_ndarray(args[arg_name]),
-                              np.asarray((new_coords,))))
+        # The injection reads the grid indices precomputed from the coordinates
+        arg_name = src1._interp_gridpoints._arg_names[0]
+        assert(np.array_equal(src2._interp_gridpoints._C_as_ndarray(args[arg_name]),
+                              np.floor(np.asarray((new_coords,), dtype=src2.dtype) /
+                                       grid.spacing)))
 
     def test_argument_derivation_order(self, nt=100):
         """ Ensure the precedence order of arguments is respected
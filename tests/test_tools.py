@@ -4,7 +4,7 @@ from sympy.abc import a, b, c, d, e
 import time
 
 from devito.tools import (UnboundedMultiTuple, ctypes_to_cstr, toposort,
-                          filter_ordered, transitive_closure)
+                          filter_ordered, transitive_closure, zorder)
 from devito.types.basic import Symbol
 
 
@@ -23,6 +23,16 @@ def test_toposort(elements, expected):
         assert expected is None
 
 
+@pytest.mark.parametrize('points, expected', [
+    ([[1, 1], [0, 0], [2, 0], [0, 1]], [1, 3, 0, 2]),
+    ([[3, 3], [2, 2], [1, 1], [0, 0]], [3, 2, 1, 0]),
+    ([[-1, 5], [-1, 4], [-2, 4]], [2, 1, 0]),
+    ([[0, 0, 1], [0, 1, 0], [1, 0, 0], [0, 0, 0]], [3, 0, 1, 2]),
+])
+def test_zorder(points, expected):
+    assert list(zorder(np.array(points))) == expected
+
+
 def test_sorting():
     key = lambda x: x
 